@@ -0,0 +1,86 @@
+"""
+Transparency analytics: quarterly trends, rolling four-quarter totals and per-year figures
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cache import list_version
+
+METRICS = ("income", "expense", "profit")
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    # Zero or missing denominators give no ratio rather than inf
+    return numerator / denominator.where(denominator != 0)
+
+def _records(frame: pd.DataFrame) -> List[dict]:
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
+
+def compute_transparansi_analytics(reports: List[dict]) -> dict:
+    """Vectorized quarterly and yearly analytics over financial report rows"""
+    if not reports:
+        return {"quarters": [], "years": []}
+    frame = (
+        pd.DataFrame(reports, columns=["period", "year", "quarter", *METRICS, "updated_at"])
+        .astype({"year": int, "quarter": int, **{m: float for m in METRICS}})
+    )
+    # A re-filed quarter keeps its most recently updated report, whatever order Mongo returned
+    frame["updated_at"] = pd.to_datetime(frame["updated_at"])
+    frame = (
+        frame.sort_values("updated_at", kind="stable", na_position="first")
+        .drop_duplicates(["year", "quarter"], keep="last")
+        .drop(columns="updated_at")
+    )
+    frame.index = pd.PeriodIndex.from_fields(year=frame["year"], quarter=frame["quarter"], freq="Q")
+    # Every quarter between the first and last report, so gaps break rolling windows and YoY
+    quarters = frame.sort_index().reindex(pd.period_range(frame.index.min(), frame.index.max(), freq="Q"))
+    values = quarters[list(METRICS)]
+
+    rolling = values.rolling(4, min_periods=4).sum()
+    yoy = _ratio(values - values.shift(4), values.shift(4).abs())
+    quarterly = pd.DataFrame({
+        "period": quarters["period"],
+        "year": quarters.index.year,
+        "quarter": quarters.index.quarter,
+        **{m: values[m] for m in METRICS},
+        "margin": _ratio(values["profit"], values["income"]),
+        **{f"{m}_yoy": yoy[m] for m in METRICS},
+        **{f"rolling_{m}": rolling[m] for m in METRICS},
+        "rolling_margin": _ratio(rolling["profit"], rolling["income"]),
+    })
+    quarterly = quarterly[quarters["income"].notna().to_numpy()]
+
+    yearly = frame.groupby("year")[list(METRICS)].sum()
+    yearly["quarters"] = frame.groupby("year").size()
+    yearly = yearly.reindex(np.arange(yearly.index.min(), yearly.index.max() + 1))
+    # Year-over-year growth only between complete years
+    complete = yearly[list(METRICS)].where(yearly["quarters"] == 4)
+    yearly_yoy = _ratio(complete - complete.shift(1), complete.shift(1).abs())
+    yearly = pd.DataFrame({
+        "year": yearly.index,
+        "quarters": yearly["quarters"],
+        **{m: yearly[m] for m in METRICS},
+        "margin": _ratio(yearly["profit"], yearly["income"]),
+        **{f"{m}_yoy": yearly_yoy[m] for m in METRICS},
+    }).dropna(subset=["quarters"])
+    yearly["quarters"] = yearly["quarters"].astype(int)
+
+    return {"quarters": _records(quarterly), "years": _records(yearly)}
+
+# Computed once per data version (report count and latest updated_at)
+_memo: Optional[Tuple[tuple, dict]] = None
+
+async def transparansi_analytics(db, version: Optional[dict] = None) -> dict:
+    """Analytics for the current reports; pass `version` when the caller already loaded it"""
+    global _memo
+    if version is None:
+        version = await list_version(db.transparansi)()
+    key = (version.get("count"), version.get("last_modified"))
+    if _memo is None or _memo[0] != key:
+        reports = await db.transparansi.find(
+            {}, {"_id": 0, "period": 1, "year": 1, "quarter": 1, "income": 1, "expense": 1, "profit": 1, "updated_at": 1}
+        ).to_list(None)
+        _memo = (key, compute_transparansi_analytics(reports))
+    return _memo[1]
@@ -0,0 +1,111 @@
+"""
+Benchmark public GET latency while logins run in parallel
+
+Run against a live server started with RATE_LIMIT=false, otherwise the
+login limiter answers most of the logins with 429 and they never reach bcrypt:
+    RATE_LIMIT=false uvicorn server:app --port 8001
+    python bench_login.py --base-url http://localhost:8001 --logins 40 --gets 400
+
+Only 200 responses are timed; every other status is counted and reported,
+and the script exits with status 1 when any request did not return 200.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class Outcome:
+    """Latencies of 200 responses plus counts of every other status or transport error"""
+
+    def __init__(self):
+        self.latencies = []
+        self.failures = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, started, response=None, error=None):
+        with self._lock:
+            if error is not None:
+                self.failures[type(error).__name__] += 1
+            elif response.status_code != 200:
+                self.failures[response.status_code] += 1
+            else:
+                self.latencies.append((time.perf_counter() - started) * 1000)
+
+def run_logins(base_url, count, username, password, outcome):
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{base_url}/api/auth/login", json={"username": username, "password": password}, timeout=30)
+            outcome.record(started, response)
+        except requests.RequestException as e:
+            outcome.record(started, error=e)
+
+def run_gets(base_url, count, path, outcome):
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            outcome.record(started, requests.get(f"{base_url}{path}", timeout=30))
+        except requests.RequestException as e:
+            outcome.record(started, error=e)
+
+def measure(args, with_logins):
+    gets, logins, threads = Outcome(), Outcome(), []
+    if with_logins:
+        per_thread = max(1, args.logins // args.login_threads)
+        for _ in range(args.login_threads):
+            threads.append(threading.Thread(
+                target=run_logins, args=(args.base_url, per_thread, args.username, args.password, logins)))
+    per_thread = max(1, args.gets // args.get_threads)
+    for _ in range(args.get_threads):
+        threads.append(threading.Thread(target=run_gets, args=(args.base_url, per_thread, args.path, gets)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return gets, logins
+
+def report(label, outcome):
+    failures = ", ".join(f"{status}={n}" for status, n in sorted(outcome.failures.items(), key=str)) or "none"
+    if not outcome.latencies:
+        print(f"{label}: no 200 responses (non-200: {failures})")
+        return
+    latencies = outcome.latencies
+    print(
+        f"{label}: n={len(latencies)} p50={statistics.median(latencies):.1f}ms "
+        f"p99={percentile(latencies, 99):.1f}ms max={max(latencies):.1f}ms non-200: {failures}"
+    )
+    if 429 in outcome.failures:
+        print(f"{label}: 429 responses mean the server's rate limiter is on; restart it with RATE_LIMIT=false")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--path", default="/api/unit-usaha")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-threads", type=int, default=8)
+    parser.add_argument("--gets", type=int, default=400)
+    parser.add_argument("--get-threads", type=int, default=8)
+    args = parser.parse_args()
+
+    baseline, _ = measure(args, with_logins=False)
+    report("GET baseline", baseline)
+    loaded, logins = measure(args, with_logins=True)
+    report("GET during logins", loaded)
+    report("Logins", logins)
+    if baseline.failures or loaded.failures or logins.failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
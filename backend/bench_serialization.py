@@ -0,0 +1,86 @@
+"""
+Microbenchmark of the fast JSON path against the model-based response path
+
+Checks that both paths render byte-identical JSON for every public list
+model, then times each one:
+    python bench_serialization.py --docs 100 --rounds 200
+"""
+import argparse
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from cache import render_json
+from fastjson import dump_docs, orjson
+from models import BusinessUnit, Document, EducationalResource, FinancialReport, News, Product
+
+def bilingual(text):
+    return {"id": f"{text} (id)", "en": f"{text} (en)"}
+
+def sample_docs(count):
+    now = datetime.utcnow()
+    return {
+        BusinessUnit: [{
+            "_id": ObjectId(), "name": bilingual(f"Unit {i}"), "category": "Retail",
+            "description": bilingual("Deskripsi unit usaha " * 5), "revenue": "Rp 450 Juta",
+            "contact": "+62 812-1111-1111", "team_size": 8, "status": "active",
+            "created_at": now, "updated_at": now,
+        } for i in range(count)],
+        Product: [{
+            "_id": ObjectId(), "name": bilingual(f"Produk {i}"), "category": "Pangan", "price": "Rp 15.000/kg",
+            "description": bilingual("Deskripsi produk " * 5), "stock_status": "Tersedia",
+            "created_at": now, "updated_at": now,
+        } for i in range(count)],
+        News: [{
+            "_id": ObjectId(), "title": bilingual(f"Berita {i}"), "excerpt": bilingual("Ringkasan " * 10),
+            "content": bilingual("Isi berita lengkap. " * 80), "category": "Kegiatan", "author": str(ObjectId()),
+            "published_at": now, "is_published": True, "created_at": now, "updated_at": now,
+        } for i in range(count)],
+        FinancialReport: [{
+            "_id": ObjectId(), "period": f"Q{i % 4 + 1} 2024", "quarter": i % 4 + 1, "year": 2024,
+            "income": 450000000, "expense": 320000000, "profit": 130000000.5, "audit_status": "audited",
+            "created_at": now, "updated_at": now,
+        } for i in range(count)],
+        EducationalResource: [{
+            "_id": ObjectId(), "title": bilingual(f"Materi {i}"), "description": bilingual("Deskripsi " * 10),
+            "content": bilingual("Isi materi. " * 80), "type": "article", "is_published": True,
+            "created_at": now, "updated_at": now,
+        } for i in range(count)],
+        Document: [{
+            "_id": ObjectId(), "title": bilingual(f"Perdes {i}"), "description": bilingual("Regulasi " * 10),
+            "year": 2024, "file_url": "/docs/perdes.pdf", "file_size": "1.2 MB", "category": "Perdes",
+            "created_at": now, "updated_at": now,
+        } for i in range(count)],
+    }
+
+def model_path(docs, model):
+    # Current path: validate into models, then render like response_model
+    return render_json([model(**{**doc, "_id": str(doc["_id"])}) for doc in docs])
+
+def timed(func, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson else 'json (stdlib)'}")
+    for model, docs in sample_docs(args.docs).items():
+        expected, fast = model_path(docs, model), dump_docs(docs, model)
+        if expected != fast:
+            raise SystemExit(f"{model.__name__}: fast path output differs from the response_model output")
+        current = timed(lambda: model_path(docs, model), args.rounds)
+        optimized = timed(lambda: dump_docs(docs, model), args.rounds)
+        print(
+            f"{model.__name__:<20} {len(fast):>8} bytes  model={current:.3f}ms  "
+            f"fast={optimized:.3f}ms  speedup={current / optimized:.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Batch create/update/delete for admin resources on top of Mongo bulk_write
+"""
+from datetime import datetime
+from typing import Callable, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+
+from models import BulkItemResult, BulkRequest, BulkResult
+
+def _object_id(value: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+async def run_bulk(
+    collection,
+    bulk: BulkRequest,
+    create_defaults: Optional[dict] = None,
+    prepare: Optional[Callable[[dict], dict]] = None,
+) -> BulkResult:
+    """Run creates, then updates, then deletes as one bulk_write with per-item results
+
+    `prepare` may add derived fields to each created document and update
+    payload; it runs in a worker thread since it may read files.
+
+    In ordered mode the first failing item stops the batch and every later
+    item is reported as skipped; unordered mode runs every valid item.
+    Updates and deletes of missing documents are reported as not_found.
+    """
+    now = datetime.utcnow()
+    results = []
+    operations = []
+    operation_results = []
+
+    target_ids = [_object_id(item.id) for item in bulk.update] + [_object_id(i) for i in bulk.delete]
+    lookup = [oid for oid in target_ids if oid is not None]
+    existing = set()
+    if lookup:
+        async for doc in collection.find({"_id": {"$in": lookup}}, {"_id": 1}):
+            existing.add(doc["_id"])
+
+    stopped = False
+
+    def add(op, item_id, operation=None, error=None, missing=False):
+        nonlocal stopped
+        result = BulkItemResult(index=len(results), op=op, id=item_id, status="ok")
+        if stopped:
+            result.status = "skipped"
+        elif error:
+            result.status, result.error = "error", error
+            stopped = bulk.ordered
+        elif missing:
+            result.status = "not_found"
+        else:
+            operations.append(operation)
+            operation_results.append(result)
+        results.append(result)
+
+    for item in bulk.create:
+        doc = item.model_dump()
+        doc.update({"_id": ObjectId(), "created_at": now, "updated_at": now, **(create_defaults or {})})
+        if prepare is not None:
+            doc = await run_in_threadpool(prepare, doc)
+        add("create", str(doc["_id"]), InsertOne(doc))
+
+    for item, oid in zip(bulk.update, target_ids[:len(bulk.update)]):
+        if oid is None:
+            add("update", item.id, error="Invalid ID")
+            continue
+        data = item.data.model_dump()
+        data["updated_at"] = now
+        if prepare is not None:
+            data = await run_in_threadpool(prepare, data)
+        add("update", item.id, UpdateOne({"_id": oid}, {"$set": data}), missing=oid not in existing)
+
+    for item_id, oid in zip(bulk.delete, target_ids[len(bulk.update):]):
+        if oid is None:
+            add("delete", item_id, error="Invalid ID")
+            continue
+        add("delete", item_id, DeleteOne({"_id": oid}), missing=oid not in existing)
+
+    if not operations:
+        return BulkResult(results=results)
+
+    try:
+        outcome = (await collection.bulk_write(operations, ordered=bulk.ordered)).bulk_api_result
+    except BulkWriteError as e:
+        outcome = e.details
+        failed = {err["index"]: err.get("errmsg", "Write error") for err in outcome.get("writeErrors", [])}
+        first_failure = min(failed) if failed else None
+        for index, result in enumerate(operation_results):
+            if index in failed:
+                result.status, result.error = "error", failed[index]
+            elif bulk.ordered and first_failure is not None and index > first_failure:
+                result.status = "skipped"
+
+    return BulkResult(
+        inserted=outcome.get("nInserted", 0),
+        modified=outcome.get("nModified", 0),
+        deleted=outcome.get("nRemoved", 0),
+        results=results,
+    )
@@ -0,0 +1,274 @@
+"""
+In-process response cache for the public read endpoints
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from compression import (
+    COMPRESSION_MIN_SIZE, choose_encoding, compress, compression_stats, encoded_etag, route_path, supported_encodings
+)
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+VersionLoader = Callable[[], Awaitable[Optional[dict]]]
+
+class CacheEntry:
+    """A serialized JSON body stored in the response cache, with its validators"""
+
+    __slots__ = ("body", "expires_at", "etag", "last_modified", "encoded")
+
+    def __init__(self, body: bytes, expires_at: float, etag: str, last_modified: Optional[datetime] = None):
+        self.body = body
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        # Compressed variants of body, filled on first request per encoding
+        self.encoded: Dict[str, bytes] = {}
+
+class ResponseCache:
+    """LRU + TTL cache of serialized JSON bodies, grouped by collection namespace"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, namespace: str) -> int:
+        """Return the invalidation counter of a namespace"""
+        return self._generations.get(namespace, 0)
+
+    def get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        """Return a fresh entry and mark it as recently used"""
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[(namespace, key)]
+            self.misses += 1
+            return None
+        self._entries.move_to_end((namespace, key))
+        self.hits += 1
+        return entry
+
+    def set(self, namespace: str, key: str, entry: CacheEntry, generation: Optional[int] = None) -> CacheEntry:
+        """Store an entry, evicting the least recently used entries when full
+
+        The entry is not stored when the namespace was invalidated after
+        `generation` was read, so a slow loader cannot resurrect stale data.
+        """
+        if generation is not None and generation != self.generation(namespace):
+            return entry
+        self._entries[(namespace, key)] = entry
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Drop every entry belonging to the given namespaces"""
+        targets = set(namespaces)
+        for namespace in targets:
+            self._generations[namespace] = self.generation(namespace) + 1
+        for cache_key in [k for k in self._entries if k[0] in targets]:
+            del self._entries[cache_key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+class TTLCache:
+    """Small bounded LRU mapping with a per-entry expiry"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[object, Tuple[float, object]]" = OrderedDict()
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard_where(self, predicate: Callable[[object], bool]) -> None:
+        """Drop every entry whose key matches the predicate"""
+        for key in [k for k in self._entries if predicate(k)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+response_cache = ResponseCache()
+
+def request_cache_key(request: Request) -> str:
+    """Build a cache key from the endpoint path and its sorted query string"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+def render_json(content) -> bytes:
+    """Serialize models the same way FastAPI renders a response_model"""
+    if isinstance(content, bytes):
+        # Already rendered by the fast JSON path
+        return content
+    return json.dumps(
+        jsonable_encoder(content, by_alias=True),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+def list_version(collection, query: Optional[dict] = None) -> VersionLoader:
+    """Version of a list endpoint: matching document count and max updated_at"""
+    async def version():
+        pipeline = [
+            {"$match": query or {}},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "last_modified": {"$max": "$updated_at"}}},
+        ]
+        result = await collection.aggregate(pipeline).to_list(1)
+        return result[0] if result else {"count": 0, "last_modified": None}
+    return version
+
+def document_version(collection, query: dict) -> VersionLoader:
+    """Version of a detail endpoint: the document's updated_at only"""
+    async def version():
+        doc = await collection.find_one(query, {"updated_at": 1})
+        if doc is None:
+            return None
+        return {"count": 1, "last_modified": doc.get("updated_at")}
+    return version
+
+def remember(version: VersionLoader) -> VersionLoader:
+    """Load a version at most once, so a loader can reuse the one cached_response fetched"""
+    loaded = []
+    async def once():
+        if not loaded:
+            loaded.append(await version())
+        return loaded[0]
+    return once
+
+def make_etag(version: dict) -> str:
+    last_modified = version.get("last_modified")
+    stamp = int(last_modified.replace(tzinfo=timezone.utc).timestamp() * 1000) if last_modified else 0
+    return f'"{version.get("count", 0)}-{stamp}"'
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, and a tag of any encoded representation validates the others
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        current = {etag} | {encoded_etag(etag, encoding) for encoding in supported_encodings()}
+        return "*" in candidates or not candidates.isdisjoint(current)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return modified <= since
+    return False
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+async def cached_response(
+    request: Request,
+    namespace: str,
+    loader: Callable[[], Awaitable[object]],
+    version: Optional[VersionLoader] = None,
+) -> Response:
+    """Serve a cached JSON body, loading and storing it on a miss
+
+    Conditional requests are answered with 304 from the cached validators,
+    or on a miss from `version` before any document is fetched.
+    """
+    key = request_cache_key(request)
+    entry = response_cache.get(namespace, key)
+    if entry is None:
+        generation = response_cache.generation(namespace)
+        etag, last_modified = None, None
+        if version is not None:
+            current = await version()
+            if current is not None:
+                etag, last_modified = make_etag(current), current.get("last_modified")
+                if is_not_modified(request, etag, last_modified):
+                    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+        body = render_json(await loader())
+        if etag is None:
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        entry = response_cache.set(
+            namespace, key,
+            CacheEntry(body, time.monotonic() + response_cache.ttl, etag, last_modified),
+            generation,
+        )
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if len(entry.body) < COMPRESSION_MIN_SIZE:
+        encoding = None
+    headers = validator_headers(encoded_etag(entry.etag, encoding) if encoding else entry.etag, entry.last_modified)
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        return Response(content=encoded_body(request, entry, encoding), media_type="application/json",
+                        headers={**headers, "Content-Encoding": encoding})
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def encoded_body(request: Request, entry: CacheEntry, encoding: str) -> bytes:
+    """Return the entry compressed with `encoding`, compressing only on first use"""
+    body = entry.encoded.get(encoding)
+    if body is not None:
+        compression_stats.record(route_path(request.scope), len(entry.body), len(body), cached=True)
+        return body
+    started = time.process_time()
+    body = entry.encoded[encoding] = compress(entry.body, encoding)
+    compression_stats.record(route_path(request.scope), len(entry.body), len(body), time.process_time() - started)
+    return body
+
+# Other in-process state derived from the public collections subscribes here
+_invalidation_listeners: List[Callable[..., None]] = []
+
+def on_invalidate(listener: Callable[..., None]) -> None:
+    """Register a callback receiving the namespaces of every invalidation"""
+    _invalidation_listeners.append(listener)
+
+def invalidate(*namespaces: str) -> None:
+    """Invalidate cached public responses after an admin write"""
+    response_cache.invalidate(*namespaces)
+    for listener in _invalidation_listeners:
+        listener(*namespaces)
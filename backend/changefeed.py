@@ -0,0 +1,127 @@
+"""
+Cross-worker cache invalidation from MongoDB change streams, with an updated_at polling fallback
+
+Every worker runs its own watcher, so an admin write handled by one worker
+invalidates the in-memory caches of all of them.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from cache import invalidate, list_version
+
+logger = logging.getLogger(__name__)
+
+# off | auto | changestream | poll; auto uses change streams where the deployment supports them
+CACHE_INVALIDATION_FEED = os.environ.get("CACHE_INVALIDATION_FEED", "off").lower()
+CACHE_INVALIDATION_POLL_INTERVAL = float(os.environ.get("CACHE_INVALIDATION_POLL_INTERVAL", "5"))  # seconds
+CACHE_INVALIDATION_RETRY_DELAY = float(os.environ.get("CACHE_INVALIDATION_RETRY_DELAY", "2"))  # seconds
+
+# Cache namespaces are named after the collections they are loaded from; "users"
+# clears the resolved-user cache in dependencies.py
+WATCHED_COLLECTIONS = (
+    "unit_usaha", "produk", "berita", "edukasi", "regulasi", "transparansi", "shu_distribution", "users",
+)
+
+CHANGE_STREAMS_UNSUPPORTED = (40573, 40324)  # standalone server; $changeStream unknown
+
+class ChangeFeed:
+    def __init__(self, collections=WATCHED_COLLECTIONS):
+        self.collections = tuple(collections)
+        self.mode: Optional[str] = None
+        self.resume_token: Optional[dict] = None
+        self._versions: Dict[str, dict] = {}
+        self._stats = {"events": 0, "invalidations": 0, "resumes": 0, "history_lost": 0, "polls": 0, "errors": 0}
+        self._last_event_at: Optional[float] = None
+
+    def _invalidate(self, *collections: str) -> None:
+        self._stats["invalidations"] += len(collections)
+        invalidate(*collections)
+
+    # Change streams
+
+    async def watch(self, db) -> None:
+        """Follow one database-level change stream, resuming after errors from the last token"""
+        pipeline = [{"$match": {"$or": [
+            {"ns.coll": {"$in": list(self.collections)}},
+            {"operationType": {"$in": ["invalidate", "dropDatabase"]}},
+        ]}}]
+        while True:
+            try:
+                async with db.watch(pipeline, resume_after=self.resume_token) as stream:
+                    async for change in stream:
+                        self._stats["events"] += 1
+                        self._last_event_at = time.monotonic()
+                        collection = change.get("ns", {}).get("coll")
+                        if change["operationType"] == "invalidate" or collection is None:
+                            # Drops and renames end the stream; start over without a token
+                            self.resume_token = None
+                            self._invalidate(*self.collections)
+                            break
+                        self.resume_token = stream.resume_token
+                        self._invalidate(collection)
+            except OperationFailure as exc:
+                if exc.code in CHANGE_STREAMS_UNSUPPORTED:
+                    raise
+                # The server refused to resume (e.g. the token fell off the oplog): events
+                # may be missing, so drop everything and start from now
+                self._stats["history_lost"] += 1
+                logger.warning("Change stream cannot resume, invalidating all watched caches: %s", exc)
+                self.resume_token = None
+                self._invalidate(*self.collections)
+            except PyMongoError as exc:
+                self._stats["errors"] += 1
+                logger.warning("Change stream interrupted, resuming: %s", exc)
+            self._stats["resumes"] += 1
+            await asyncio.sleep(CACHE_INVALIDATION_RETRY_DELAY)
+
+    # Polling fallback
+
+    async def poll_once(self, db) -> None:
+        """Invalidate collections whose document count or max updated_at changed since the last poll"""
+        versions = await asyncio.gather(*(list_version(db[name])() for name in self.collections))
+        changed = [
+            name for name, version in zip(self.collections, versions)
+            if name in self._versions and self._versions[name] != version
+        ]
+        self._versions = dict(zip(self.collections, versions))
+        self._stats["polls"] += 1
+        if changed:
+            self._stats["events"] += len(changed)
+            self._last_event_at = time.monotonic()
+            self._invalidate(*changed)
+
+    async def poll(self, db, interval: float = CACHE_INVALIDATION_POLL_INTERVAL) -> None:
+        while True:
+            try:
+                await self.poll_once(db)
+            except PyMongoError as exc:
+                self._stats["errors"] += 1
+                logger.warning("Cache invalidation poll failed: %s", exc)
+            await asyncio.sleep(interval)
+
+    async def run(self, db, mode: str = CACHE_INVALIDATION_FEED) -> None:
+        """Background task: change streams when available (or forced), otherwise polling"""
+        if mode in ("auto", "changestream"):
+            self.mode = "changestream"
+            try:
+                await self.watch(db)
+            except OperationFailure as exc:
+                if mode == "changestream":
+                    raise
+                logger.info("Change streams unavailable (%s), polling updated_at instead", exc)
+        self.mode = "poll"
+        await self.poll(db)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "change_stream": int(self.mode == "changestream"),
+            "seconds_since_event": time.monotonic() - self._last_event_at if self._last_event_at else 0.0,
+        }
+
+change_feed = ChangeFeed()
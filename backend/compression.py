@@ -0,0 +1,199 @@
+"""
+gzip/Brotli response compression with per-route metrics
+"""
+import gzip
+import os
+import time
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "500"))  # bytes
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header, preferring br"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Entity tag of the `encoding` representation; strong tags must differ between encodings"""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+class CompressionStats:
+    """Per-route bytes saved and CPU time spent compressing"""
+
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, route: str, original: int, compressed: int, cpu_seconds: float = 0.0, cached: bool = False) -> None:
+        stats = self.routes.setdefault(route, {
+            "responses": 0, "cached_responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0,
+        })
+        stats["responses"] += 1
+        stats["cached_responses"] += int(cached)
+        stats["bytes_in"] += original
+        stats["bytes_out"] += compressed
+        stats["cpu_seconds"] += cpu_seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            route: {**stats, "bytes_saved": stats["bytes_in"] - stats["bytes_out"]}
+            for route, stats in self.routes.items()
+        }
+
+compression_stats = CompressionStats()
+
+def route_path(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", scope.get("path", ""))
+
+class CompressionMiddleware:
+    """Compress eligible responses; bodies already carrying Content-Encoding pass through"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(scope, send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+class _CompressionResponder:
+    def __init__(self, scope, send, encoding: str, minimum_size: int):
+        self.scope = scope
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            )
+            return
+        if message["type"] != "http.response.body":
+            # pathsend / zerocopy bodies are never compressed
+            await self._flush_start()
+            await self.send(message)
+            return
+        if self.passthrough:
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None and not more_body:
+            # Whole body in one message
+            if len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._flush_start()
+                await self.send(message)
+                return
+            started = time.process_time()
+            compressed = compress(body, self.encoding)
+            self.cpu_seconds += time.process_time() - started
+            self._set_encoding_headers(len(compressed))
+            await self._flush_start()
+            await self.send({"type": "http.response.body", "body": compressed})
+            compression_stats.record(route_path(self.scope), len(body), len(compressed), self.cpu_seconds)
+            return
+
+        # Streaming body: compress chunk by chunk
+        if self.compressor is None:
+            self.compressor = _StreamCompressor(self.encoding)
+            self._set_encoding_headers(None)
+            await self._flush_start()
+        started = time.process_time()
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        self.cpu_seconds += time.process_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(chunk)
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if not more_body:
+            compression_stats.record(route_path(self.scope), self.bytes_in, self.bytes_out, self.cpu_seconds)
+
+    def _set_encoding_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._flush = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress, self._flush = self._compressor.compress, self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data) if data else b""
+
+    def flush(self) -> bytes:
+        return self._flush()
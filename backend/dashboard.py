@@ -0,0 +1,128 @@
+"""
+Dashboard statistics: concurrent aggregation and a background-refreshed snapshot
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_SNAPSHOT_ENABLED = os.environ.get("DASHBOARD_SNAPSHOT", "false").lower() in ("1", "true", "yes")
+DASHBOARD_REFRESH_INTERVAL = float(os.environ.get("DASHBOARD_REFRESH_INTERVAL", "60"))  # seconds
+SNAPSHOT_ID = "current"
+
+_dirty: Optional[asyncio.Event] = None
+
+def format_revenue(latest_report: Optional[dict]) -> str:
+    if not latest_report:
+        return "Rp 0"
+    return f"Rp {latest_report.get('income', 0) / 1000000:.1f} Miliar"
+
+async def _first(cursor, default: dict) -> dict:
+    result = await cursor.to_list(1)
+    return result[0] if result else default
+
+async def count_citizens(db) -> int:
+    """Villagers reached: distinct phone numbers across applications and contact messages
+
+    This scans both collections, so it only runs from the snapshot refresh.
+    """
+    citizens = db.permodalan.aggregate([
+        {"$project": {"phone": 1}},
+        {"$unionWith": {"coll": "kontak", "pipeline": [{"$project": {"phone": 1}}]}},
+        {"$group": {"_id": "$phone"}},
+        {"$count": "n"},
+    ])
+    return (await _first(citizens, {"n": 0}))["n"]
+
+async def compute_dashboard_stats(db) -> dict:
+    """Compute the indexed dashboard figures, issuing the independent queries concurrently"""
+    applications = db.permodalan.aggregate([
+        {"$match": {"status": {"$in": ["pending", "approved"]}}},
+        {"$facet": {
+            "pending": [{"$match": {"status": "pending"}}, {"$count": "n"}],
+            # Partners: distinct applicants (by phone) with an approved application
+            "partners": [{"$match": {"status": "approved"}}, {"$group": {"_id": "$phone"}}, {"$count": "n"}],
+        }},
+    ])
+    (
+        active_units,
+        total_products,
+        published_news,
+        contact_messages,
+        latest_report,
+        application_counts,
+    ) = await asyncio.gather(
+        db.unit_usaha.count_documents({"status": "active"}),
+        db.produk.count_documents({}),
+        db.berita.count_documents({"is_published": True}),
+        db.kontak.count_documents({"status": "new"}),
+        db.transparansi.find_one(sort=[("year", -1), ("quarter", -1)]),
+        _first(applications, {"pending": [], "partners": []}),
+    )
+
+    def facet_count(name):
+        bucket = application_counts.get(name) or []
+        return bucket[0]["n"] if bucket else 0
+
+    return {
+        "total_revenue": format_revenue(latest_report),
+        "active_units": active_units,
+        "partners": facet_count("partners"),
+        "pending_applications": facet_count("pending"),
+        "total_products": total_products,
+        "published_news": published_news,
+        "contact_messages": contact_messages,
+    }
+
+async def refresh_dashboard_snapshot(db) -> dict:
+    """Recompute every figure, including citizens_served, and store them as the materialized snapshot"""
+    stats, citizens_served = await asyncio.gather(compute_dashboard_stats(db), count_citizens(db))
+    stats["citizens_served"] = citizens_served
+    await db.dashboard_snapshot.replace_one(
+        {"_id": SNAPSHOT_ID},
+        {**stats, "refreshed_at": datetime.utcnow()},
+        upsert=True,
+    )
+    return stats
+
+def is_stale(snapshot: dict) -> bool:
+    refreshed_at = snapshot.get("refreshed_at")
+    return refreshed_at is None or (datetime.utcnow() - refreshed_at).total_seconds() > DASHBOARD_REFRESH_INTERVAL
+
+async def load_dashboard_stats(db) -> dict:
+    """Read the snapshot when enabled, computing it on first use
+
+    Otherwise the indexed figures are computed live and citizens_served is
+    taken from the snapshot, refreshed at most every DASHBOARD_REFRESH_INTERVAL.
+    """
+    snapshot = await db.dashboard_snapshot.find_one({"_id": SNAPSHOT_ID})
+    if DASHBOARD_SNAPSHOT_ENABLED:
+        return snapshot if snapshot is not None else await refresh_dashboard_snapshot(db)
+    if snapshot is None or is_stale(snapshot):
+        return await refresh_dashboard_snapshot(db)
+    stats = await compute_dashboard_stats(db)
+    stats["citizens_served"] = snapshot["citizens_served"]
+    return stats
+
+def mark_dashboard_dirty() -> None:
+    """Ask the background refresher to rebuild the snapshot after a write"""
+    if _dirty is not None:
+        _dirty.set()
+
+async def dashboard_refresher(db, interval: float = DASHBOARD_REFRESH_INTERVAL) -> None:
+    """Refresh the snapshot after writes and at least every `interval` seconds"""
+    global _dirty
+    _dirty = asyncio.Event()
+    while True:
+        try:
+            await asyncio.wait_for(_dirty.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        _dirty.clear()
+        try:
+            await refresh_dashboard_snapshot(db)
+        except Exception as e:
+            logger.error("Dashboard snapshot refresh failed: %s", e)
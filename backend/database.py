@@ -0,0 +1,79 @@
+"""
+MongoDB client construction from environment settings
+"""
+import os
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from metrics import mongo_command_listener
+
+def _int_env(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+def mongo_client_options() -> dict:
+    """Connection pool, timeout, read preference and compression options; unset values keep driver defaults"""
+    options = {
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE"),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE"),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS"),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS"),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "readPreference": os.environ.get("MONGO_READ_PREFERENCE"),
+        # e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+        "compressors": os.environ.get("MONGO_COMPRESSORS"),
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+def create_client(mongo_url: Optional[str] = None, **overrides) -> AsyncIOMotorClient:
+    """Build the Motor client with env-configured options and command metrics"""
+    options = {**mongo_client_options(), **overrides}
+    return AsyncIOMotorClient(
+        mongo_url or os.environ["MONGO_URL"],
+        event_listeners=[mongo_command_listener],
+        **options,
+    )
+
+# Read routing
+
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Per-router read policies as (mode, maxStalenessSeconds); "primary" is fixed for
+# auth lookups and reads that must see the caller's own writes. Shortly after a
+# cache invalidation, reads of the invalidated collections go to the primary (dependencies.read_db)
+READ_POLICIES = {
+    "primary": ("primary", None),
+    "public": (
+        os.environ.get("PUBLIC_READ_PREFERENCE", "secondaryPreferred"),
+        _int_env("PUBLIC_MAX_STALENESS_SECONDS") or 90,  # the server's minimum is 90
+    ),
+    "admin": (
+        os.environ.get("ADMIN_READ_PREFERENCE", "primary"),
+        _int_env("ADMIN_MAX_STALENESS_SECONDS"),
+    ),
+}
+
+def read_preference(mode: str, max_staleness: Optional[int] = None):
+    """Build a pymongo read preference from a mode name and optional staleness bound"""
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference {mode!r}; expected one of {', '.join(READ_PREFERENCE_MODES)}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness if max_staleness is not None else -1)
+
+def routed_databases(db: AsyncIOMotorDatabase) -> Dict[str, AsyncIOMotorDatabase]:
+    """One database handle per read policy, sharing the client's connection pool"""
+    return {
+        name: db.with_options(read_preference=read_preference(mode, max_staleness))
+        for name, (mode, max_staleness) in READ_POLICIES.items()
+    }
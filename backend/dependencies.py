@@ -1,22 +1,116 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from auth import decode_access_token
+from cache import TTLCache, on_invalidate
 from models import User, UserRole
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import os
+import time
+from typing import Dict, Set
 
 security = HTTPBearer()
 
-# Database will be imported from server.py to avoid circular imports
-db = None
+# Resolved users, keyed by (username, token issue time)
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "30"))  # seconds
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "256"))
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
 
-def set_db(database):
-    """Set the database instance"""
-    global db
-    db = database
+# Verified JWT payloads, kept until the token expires
+token_cache = TTLCache(USER_CACHE_MAX_ENTRIES, 0)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+def get_db(request: Request) -> AsyncIOMotorDatabase:
+    """Get the database opened by the app lifespan"""
+    return request.app.state.db
+
+# After a cache invalidation the refill must not come from a secondary that has not
+# replicated the write yet, so reads of the invalidated collections use the primary until
+# lagging secondaries are past the staleness bound (maxStaleness plus the driver's heartbeat)
+PRIMARY_AFTER_INVALIDATION_SECONDS = float(os.environ.get("PRIMARY_AFTER_INVALIDATION_SECONDS", "120"))
+
+# Cache namespaces built from collections of another name; any other namespace is its collection
+NAMESPACE_COLLECTIONS = {"shu_distribution": ("shu_distribution", "shu_snapshots")}
+
+# Collection -> monotonic time of its last invalidation
+_last_invalidation: Dict[str, float] = {}
+
+def _note_invalidation(*namespaces: str) -> None:
+    now = time.monotonic()
+    for namespace in namespaces:
+        for collection in NAMESPACE_COLLECTIONS.get(namespace, (namespace,)):
+            _last_invalidation[collection] = now
+
+on_invalidate(_note_invalidation)
+
+def primary_collections() -> Set[str]:
+    """Collections invalidated within the last PRIMARY_AFTER_INVALIDATION_SECONDS"""
+    since = time.monotonic() - PRIMARY_AFTER_INVALIDATION_SECONDS
+    return {collection for collection, at in _last_invalidation.items() if at > since}
+
+class RoutedDatabase:
+    """A read-policy database whose recently invalidated collections are read from the primary"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, primary: AsyncIOMotorDatabase, collections: Set[str]):
+        self._db = db
+        self._primary = primary
+        self._collections = collections
+
+    def __getattr__(self, name: str):
+        return getattr(self._primary if name in self._collections else self._db, name)
+
+    def __getitem__(self, name: str):
+        return (self._primary if name in self._collections else self._db)[name]
+
+def read_db(policy: str):
+    """Dependency factory: the database handle for a read policy in database.READ_POLICIES"""
+    def dependency(request: Request) -> AsyncIOMotorDatabase:
+        read_dbs = request.app.state.read_dbs
+        collections = primary_collections() if policy != "primary" else None
+        if not collections:
+            return read_dbs[policy]
+        return RoutedDatabase(read_dbs[policy], read_dbs["primary"], collections)
+    return dependency
+
+# Auth lookups always read from the primary
+get_primary_db = read_db("primary")
+
+def invalidate_user(username: str) -> None:
+    """Drop cached users after deactivation, a role change or a password change"""
+    user_cache.discard_where(lambda key: key[0] == username)
+
+def _drop_users(*namespaces: str) -> None:
+    # Writes to users reach every worker through the change feed (changefeed.WATCHED_COLLECTIONS)
+    if "users" in namespaces:
+        user_cache.clear()
+
+on_invalidate(_drop_users)
+
+def ensure_active(user: User) -> User:
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    return user
+
+def verify_token(token: str):
+    """Decode a JWT, memoizing the verified payload for the token's lifetime"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if payload is None:
+            return None
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            token_cache.set(token, payload, ttl)
+    return payload
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
+) -> User:
     """Get current authenticated user from JWT token"""
     token = credentials.credentials
-    payload = decode_access_token(token)
+    payload = verify_token(token)
     
     if payload is None:
         raise HTTPException(
@@ -33,6 +127,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    cache_key = (username, payload.get("iat"))
+    cached_user = user_cache.get(cache_key)
+    if cached_user is not None:
+        return ensure_active(cached_user)
+    
     user = await db.users.find_one({"username": username})
     if user is None:
         raise HTTPException(
@@ -42,7 +141,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     
     user["_id"] = str(user["_id"])
-    return User(**user)
+    user_obj = User(**user)
+    user_cache.set(cache_key, user_obj)
+    return ensure_active(user_obj)
 
 async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
     """Check if current user is admin"""
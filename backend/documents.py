@@ -0,0 +1,218 @@
+"""
+PDF document store: uploads kept by content hash, served with Range, ETag and zero-copy delivery
+"""
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+from media import MEDIA_ROOT, IMMUTABLE_CACHE_CONTROL, receive_upload
+
+DOCUMENT_MAX_UPLOAD_BYTES = int(os.environ.get("DOCUMENT_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# Internal location nginx serves DOCUMENT_ROOT from; when set, file bodies are handed to it via X-Accel-Redirect
+DOCUMENT_ACCEL_REDIRECT = os.environ.get("DOCUMENT_ACCEL_REDIRECT", "").rstrip("/")
+
+DOCUMENT_ROOT = MEDIA_ROOT / "documents"
+DOCUMENT_URL_PREFIX = "/api/dokumen"
+STREAM_CHUNK_SIZE = 256 * 1024
+LINEARIZATION_WINDOW = 1024
+
+# url field -> (bytes field, checksum field, display size field)
+DOCUMENT_FIELDS = {
+    "file_url": ("file_bytes", "file_sha256", "file_size"),
+    "pdf_url": ("pdf_bytes", "pdf_sha256", None),
+}
+
+_DOCUMENT_URL = re.compile(re.escape(DOCUMENT_URL_PREFIX) + r"/([0-9a-f]{64})\.pdf$")
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+def document_path(digest: str) -> Path:
+    return DOCUMENT_ROOT / digest[:2] / f"{digest}.pdf"
+
+def document_url(digest: str) -> str:
+    return f"{DOCUMENT_URL_PREFIX}/{digest}.pdf"
+
+def format_size(size: int) -> str:
+    """Display size in the style of the existing records ("1.2 MB")"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+# Upload
+
+def is_linearized(path: Path) -> bool:
+    """Linearized ("fast web view") PDFs can show the first page before the rest has loaded"""
+    with open(path, "rb") as handle:
+        return b"/Linearized" in handle.read(LINEARIZATION_WINDOW)
+
+async def store_document(upload: UploadFile) -> dict:
+    """Store an uploaded PDF once per content hash; returns its URL, byte size and checksum"""
+    source, digest = await receive_upload(upload, DOCUMENT_MAX_UPLOAD_BYTES)
+    try:
+        with open(source, "rb") as handle:
+            if not handle.read(1024).lstrip().startswith(b"%PDF-"):
+                raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+        target = document_path(digest)
+        deduplicated = target.exists()
+        if not deduplicated:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+        size = target.stat().st_size
+        return {
+            "sha256": digest,
+            "url": document_url(digest),
+            "bytes": size,
+            "file_size": format_size(size),
+            "linearized": is_linearized(target),
+            "deduplicated": deduplicated,
+        }
+    finally:
+        source.unlink(missing_ok=True)
+
+def with_document_metadata(doc: dict) -> dict:
+    """Fill byte sizes and checksums for PDF URLs that point at the document store"""
+    for url_field, (bytes_field, checksum_field, display_field) in DOCUMENT_FIELDS.items():
+        if url_field not in doc:
+            continue
+        match = _DOCUMENT_URL.match(doc[url_field] or "")
+        path = document_path(match.group(1)) if match else None
+        if path is None or not path.exists():
+            doc[bytes_field] = doc[checksum_field] = None
+            continue
+        size = path.stat().st_size
+        doc[bytes_field] = size
+        doc[checksum_field] = match.group(1)
+        if display_field is not None:
+            doc[display_field] = format_size(size)
+    return doc
+
+# Serving
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single byte range; None serves the whole file
+
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    Raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Syntactically invalid, so the header is ignored rather than unsatisfiable
+        return None
+    if start >= size:
+        raise ValueError
+    return start, min(int(last), size - 1) if last else size - 1
+
+class DocumentResponse(Response):
+    """A stored PDF, honouring Range, If-Range and If-None-Match
+
+    The body goes out through the server's zero-copy extension when it offers
+    one, through nginx when DOCUMENT_ACCEL_REDIRECT is set, and otherwise in
+    fixed-size chunks, so a large file is never held in memory.
+    """
+
+    media_type = "application/pdf"
+
+    def __init__(self, digest: str, request_headers: Headers, head: bool = False):
+        self.path = document_path(digest)
+        stat = self.path.stat()
+        self.size = stat.st_size
+        self.etag = f'"{digest}"'
+        self.head = head
+        self.status_code = 200
+        self.background = None
+        self.start, self.end = 0, self.size - 1
+        self.init_headers({
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+            "content-disposition": f'inline; filename="{digest[:12]}.pdf"',
+        })
+
+        if self.etag in request_headers.get("if-none-match", ""):
+            self.status_code = 304
+            self.body_length = 0
+            return
+        if_range = request_headers.get("if-range")
+        byte_range = None
+        if if_range is None or if_range == self.etag:
+            try:
+                byte_range = parse_range(request_headers.get("range"), self.size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["content-range"] = f"bytes */{self.size}"
+                self.headers["content-length"] = "0"
+                self.body_length = 0
+                return
+        if byte_range is not None:
+            self.status_code = 206
+            self.start, self.end = byte_range
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{self.size}"
+        self.body_length = self.end - self.start + 1
+        self.headers["content-length"] = str(self.body_length)
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        if DOCUMENT_ACCEL_REDIRECT and self.status_code in (200, 206):
+            # nginx applies the Range header itself and sends the file with sendfile(2)
+            del self.headers["content-length"]
+            if "content-range" in self.headers:
+                del self.headers["content-range"]
+            self.headers["x-accel-redirect"] = f"{DOCUMENT_ACCEL_REDIRECT}/{self.path.relative_to(DOCUMENT_ROOT)}"
+            await send({"type": "http.response.start", "status": 200, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head or self.body_length == 0:
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.zerocopy" in extensions:
+            with open(self.path, "rb") as handle:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": handle,
+                    "offset": self.start,
+                    "count": self.body_length,
+                })
+        elif "http.response.pathsend" in extensions and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            remaining = self.body_length
+            async with await anyio.open_file(self.path, "rb") as handle:
+                await handle.seek(self.start)
+                while remaining > 0:
+                    chunk = await handle.read(min(STREAM_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+def document_response(digest: str, request_headers: Headers, head: bool = False) -> DocumentResponse:
+    if not _DIGEST.fullmatch(digest) or not document_path(digest).is_file():
+        raise HTTPException(status_code=404, detail="Document not found")
+    return DocumentResponse(digest, request_headers, head)
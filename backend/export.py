@@ -0,0 +1,73 @@
+"""
+Streaming NDJSON/CSV export of admin collections
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List
+
+from bson import ObjectId
+
+from models import CapitalApplication, ContactMessage, FinancialReport
+
+EXPORT_BATCH_SIZE = 500
+
+# Exportable collections: response model (CSV columns) and sort order
+EXPORTS = {
+    "permodalan": {
+        "model": CapitalApplication,
+        "sort": [("submitted_at", -1), ("_id", -1)],
+    },
+    "kontak": {
+        "model": ContactMessage,
+        "sort": [("submitted_at", -1), ("_id", -1)],
+    },
+    "transparansi": {
+        "model": FinancialReport,
+        "sort": [("year", -1), ("quarter", -1)],
+    },
+}
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def export_columns(model) -> List[str]:
+    return [info.alias or name for name, info in model.model_fields.items()]
+
+# Spreadsheets evaluate cells starting with these as formulas; kontak and permodalan text is anonymous input
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, default=_default, ensure_ascii=False)
+    elif isinstance(value, (ObjectId, datetime)):
+        return _default(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+async def stream_ndjson(cursor) -> AsyncIterator[bytes]:
+    """Yield one JSON document per line, one cursor batch at a time"""
+    async for doc in cursor:
+        yield (json.dumps(doc, default=_default, ensure_ascii=False) + "\n").encode("utf-8")
+
+async def stream_csv(cursor, columns: List[str]) -> AsyncIterator[bytes]:
+    """Yield a header row followed by one CSV row per document"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for doc in cursor:
+        writer.writerow([_cell(doc.get(column)) for column in columns])
+        # Flush in ~64 KiB chunks rather than per row
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
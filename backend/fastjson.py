@@ -0,0 +1,115 @@
+"""
+Opt-in fast path that renders raw Motor documents straight to JSON bytes
+
+The output is byte-compatible with FastAPI rendering the response_model:
+fields appear in model order under their aliases, defaults are filled in,
+numbers are coerced to the declared type and enums become their values.
+Numbers of any other shape are validated by pydantic, so a value the model
+would reject (a fractional int, say) raises here too.
+"""
+import json
+import os
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from bson import ObjectId
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+FAST_JSON_ENABLED = os.environ.get("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+Converter = Callable[[Any], Any]
+Plan = List[Tuple[str, Any, Optional[Converter]]]
+
+_plans: Dict[Type[BaseModel], Plan] = {}
+
+def unwrap_optional(annotation):
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+def _scalar(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+def _number(annotation, exact: Tuple[type, ...]) -> Converter:
+    # Values of the exact types convert like pydantic; anything else goes through its validator
+    validate = TypeAdapter(annotation).validate_python
+    def convert(value):
+        if value is None:
+            return None
+        if type(value) in exact:
+            return annotation(value)
+        return validate(value)
+    return convert
+
+def _converter(annotation) -> Optional[Converter]:
+    annotation = unwrap_optional(annotation)
+    if get_origin(annotation) in (list, List):
+        (item,) = get_args(annotation) or (Any,)
+        convert_item = _converter(item)
+        if convert_item is None:
+            return None
+        return lambda value: None if value is None else [convert_item(v) for v in value]
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            nested = compile_plan(annotation)
+            return lambda value: None if value is None else apply_plan(nested, value)
+        if issubclass(annotation, Enum):
+            return _scalar
+        if annotation is float:
+            return _number(float, (float, int))
+        if annotation is int:
+            return _number(int, (int,))
+        if annotation is str:
+            return _scalar
+    return None
+
+def compile_plan(model: Type[BaseModel]) -> Plan:
+    """Precompute (key, default, converter) for every field of a model"""
+    plan = _plans.get(model)
+    if plan is None:
+        plan = []
+        for name, info in model.model_fields.items():
+            default = None if info.is_required() else _scalar(info.get_default(call_default_factory=True))
+            plan.append((info.alias or name, default, _converter(info.annotation)))
+        _plans[model] = plan
+    return plan
+
+def apply_plan(plan: Plan, doc: dict) -> dict:
+    out = {}
+    for key, default, convert in plan:
+        value = doc.get(key, default)
+        out[key] = convert(value) if convert is not None else value
+    return out
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dump_docs(docs: List[dict], model: Type[BaseModel]) -> bytes:
+    """Render a list of raw documents as the JSON of List[model]"""
+    plan = compile_plan(model)
+    return dumps([apply_plan(plan, doc) for doc in docs])
+
+def dump_doc(doc: dict, model: Type[BaseModel]) -> bytes:
+    """Render one raw document as the JSON of model"""
+    return dumps(apply_plan(compile_plan(model), doc))
@@ -0,0 +1,127 @@
+"""
+Declarative MongoDB index registry, applied idempotently at startup and from seed.py
+"""
+import logging
+import time
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Every index the routers rely on, keyed by collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "unit_usaha": [
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("revenue_idr", DESCENDING)], name="revenue_idr"),
+    ],
+    "produk": [
+        IndexModel([("price_idr", ASCENDING)], name="price_idr"),
+    ],
+    "berita": [
+        IndexModel([("is_published", ASCENDING), ("published_at", DESCENDING)], name="published_feed"),
+        IndexModel([("published_at", DESCENDING), ("_id", DESCENDING)], name="published_at_keyset"),
+    ],
+    "permodalan": [
+        IndexModel([("status", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)], name="status_submitted_at"),
+        IndexModel([("status", ASCENDING), ("loan_amount_idr", DESCENDING), ("_id", DESCENDING)], name="status_loan_amount"),
+        IndexModel([("submitted_at", DESCENDING), ("_id", DESCENDING)], name="submitted_at_keyset"),
+    ],
+    "kontak": [
+        IndexModel([("status", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)], name="status_submitted_at"),
+        IndexModel([("submitted_at", DESCENDING), ("_id", DESCENDING)], name="submitted_at_keyset"),
+    ],
+    "edukasi": [
+        IndexModel([("is_published", ASCENDING)], name="is_published"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_keyset"),
+    ],
+    "transparansi": [
+        IndexModel([("year", DESCENDING), ("quarter", DESCENDING)], name="year_quarter"),
+    ],
+    "shu_distribution": [
+        IndexModel([("year", DESCENDING)], name="year"),
+    ],
+    "shu_members": [
+        IndexModel([("year", ASCENDING), ("member_id", ASCENDING)], name="year_member_unique", unique=True),
+    ],
+    "shu_snapshots": [
+        IndexModel([("year", ASCENDING), ("version", DESCENDING)], name="year_version_unique", unique=True),
+        IndexModel([("year", ASCENDING), ("is_current", ASCENDING)], name="year_current"),
+    ],
+    "shu_allocations": [
+        IndexModel([("snapshot_id", ASCENDING), ("total", DESCENDING), ("_id", DESCENDING)], name="snapshot_total_keyset"),
+    ],
+    "regulasi": [
+        IndexModel([("year", DESCENDING)], name="year"),
+    ],
+}
+
+# Representative queries used to confirm the registry is picked up by the planner
+PROBE_QUERIES = [
+    ("users", {"username": "admin"}, None),
+    ("users", {"email": "admin@bumdesdesasale.id"}, None),
+    ("unit_usaha", {"status": "active"}, None),
+    ("berita", {"is_published": True}, [("published_at", -1)]),
+    ("permodalan", {"status": "pending"}, [("submitted_at", -1), ("_id", -1)]),
+    ("permodalan", {"status": "pending", "loan_amount_idr": {"$gte": 10000000}}, [("loan_amount_idr", -1), ("_id", -1)]),
+    ("produk", {"price_idr": {"$gte": 10000, "$lte": 100000}}, [("price_idr", 1)]),
+    ("kontak", {"status": "new"}, [("submitted_at", -1), ("_id", -1)]),
+    ("edukasi", {"is_published": True}, None),
+    ("transparansi", {}, [("year", -1), ("quarter", -1)]),
+    ("shu_distribution", {}, [("year", -1)]),
+    ("regulasi", {}, [("year", -1)]),
+]
+
+async def ensure_indexes(db) -> List[dict]:
+    """Create every registered index; existing indexes with the same spec are a no-op"""
+    report = []
+    for collection, indexes in INDEXES.items():
+        started = time.perf_counter()
+        try:
+            names = await db[collection].create_indexes(indexes)
+            error = None
+        except OperationFailure as e:
+            # e.g. duplicate usernames blocking a unique index; keep the app running
+            names, error = [], str(e)
+            logger.error("Index build failed on %s: %s", collection, e)
+        report.append({
+            "collection": collection,
+            "indexes": names,
+            "seconds": round(time.perf_counter() - started, 4),
+            "error": error,
+        })
+    for entry in report:
+        logger.info("Indexes on %s: %s (%.4fs)", entry["collection"], entry["indexes"], entry["seconds"])
+    return report
+
+def _winning_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _winning_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _winning_stages(child)
+    return [s for s in stages if s]
+
+async def explain_queries(db) -> List[dict]:
+    """Report the winning plan stages of the probe queries"""
+    report = []
+    for collection, query, sort in PROBE_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = await cursor.explain()
+        stages = _winning_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "collection": collection,
+            "query": query,
+            "sort": sort,
+            "stages": stages,
+            "uses_index": "IXSCAN" in stages,
+        })
+        logger.info("%s %s sort=%s -> %s", collection, query, sort, " <- ".join(stages))
+    return report
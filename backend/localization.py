@@ -0,0 +1,102 @@
+"""
+Language projection and summary shapes for BilingualText responses
+"""
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, create_model
+
+from fastjson import FAST_JSON_ENABLED, dump_doc, dump_docs, unwrap_optional
+from models import BilingualText, Language, ListView
+
+# BilingualText fields per public collection
+BILINGUAL_FIELDS = {
+    "unit_usaha": ["name", "description"],
+    "produk": ["name", "description"],
+    "berita": ["title", "excerpt", "content"],
+    "edukasi": ["title", "description", "content"],
+    "regulasi": ["title", "description"],
+}
+
+# Fields dropped from the summary list shape
+SUMMARY_EXCLUDED_FIELDS = ["content"]
+
+def shape_projection(collection: str, lang: Optional[Language], view: ListView = ListView.FULL) -> Optional[dict]:
+    """Mongo exclusion projection for the requested language and view, or None for the full shape"""
+    projection = {}
+    if lang is not None:
+        for field in BILINGUAL_FIELDS[collection]:
+            for other in Language:
+                if other != lang:
+                    projection[f"{field}.{other.value}"] = 0
+    if view == ListView.SUMMARY:
+        for field in SUMMARY_EXCLUDED_FIELDS:
+            if field in BILINGUAL_FIELDS[collection]:
+                projection[field] = 0
+                # An exclusion on a parent path conflicts with its sub-paths
+                for key in [k for k in projection if k.startswith(f"{field}.")]:
+                    del projection[key]
+    return projection or None
+
+def localize_doc(doc: dict, collection: str, lang: Optional[Language]) -> dict:
+    """Replace each projected BilingualText object with the plain string of `lang`"""
+    if lang is not None:
+        for field in BILINGUAL_FIELDS[collection]:
+            value = doc.get(field)
+            if isinstance(value, dict):
+                doc[field] = value.get(lang.value)
+    return doc
+
+# Response models
+
+_shape_models: Dict[Tuple[type, bool, bool], Type[BaseModel]] = {}
+
+def shape_model(model: Type[BaseModel], lang: Optional[Language], view: ListView = ListView.FULL) -> Type[BaseModel]:
+    """The response model for a language and view
+
+    With `lang`, every BilingualText field becomes a plain string; the summary
+    view drops SUMMARY_EXCLUDED_FIELDS. Defaults, aliases and field order are
+    kept, so the projected shapes render like the full model.
+    """
+    localized, summary = lang is not None, view == ListView.SUMMARY
+    if not localized and not summary:
+        return model
+    key = (model, localized, summary)
+    shaped = _shape_models.get(key)
+    if shaped is None:
+        fields = {}
+        for name, info in model.model_fields.items():
+            bilingual = unwrap_optional(info.annotation) is BilingualText
+            if summary and bilingual and name in SUMMARY_EXCLUDED_FIELDS:
+                continue
+            annotation = info.annotation
+            if localized and bilingual:
+                annotation = Optional[str] if annotation is not BilingualText else str
+            fields[name] = (annotation, info)
+        suffix = ("Localized" if localized else "") + ("Summary" if summary else "")
+        shaped = create_model(f"{model.__name__}{suffix}", __config__=model.model_config, **fields)
+        _shape_models[key] = shaped
+    return shaped
+
+def response_shapes(model: Type[BaseModel]):
+    """Every shape a `lang`/`view` endpoint may return, for its OpenAPI response_model"""
+    return Union[tuple(
+        shape_model(model, lang, view) for lang in (None, Language.ID) for view in ListView
+    )]
+
+# Rendering
+
+def shape_doc(doc: dict, model, collection: str, lang: Optional[Language], view: ListView = ListView.FULL):
+    """Render one document in the shape for `lang` and `view`: fast JSON bytes or a model instance"""
+    shaped = shape_model(model, lang, view)
+    localize_doc(doc, collection, lang)
+    if FAST_JSON_ENABLED:
+        return dump_doc(doc, shaped)
+    doc["_id"] = str(doc["_id"])
+    return shaped(**doc)
+
+def shape_docs(docs: List[dict], model, collection: str, lang: Optional[Language], view: ListView = ListView.FULL):
+    """Render a list of documents, see shape_doc"""
+    if FAST_JSON_ENABLED:
+        shaped = shape_model(model, lang, view)
+        return dump_docs([localize_doc(doc, collection, lang) for doc in docs], shaped)
+    return [shape_doc(doc, model, collection, lang, view) for doc in docs]
@@ -0,0 +1,230 @@
+"""
+Image uploads: streamed to disk, stored by content hash, rendered into responsive WebP/AVIF variants
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.staticfiles import StaticFiles
+
+from workers import WorkerPool
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is only needed for uploads; serving stored variants works without it
+    Image = None
+
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", Path(__file__).parent / "media"))
+MEDIA_URL_PREFIX = os.environ.get("MEDIA_URL_PREFIX", "/media")
+IMAGE_ROOT = MEDIA_ROOT / "images"
+IMAGE_URL_PREFIX = f"{MEDIA_URL_PREFIX}/images"
+IMAGE_WIDTHS = tuple(int(w) for w in os.environ.get("IMAGE_WIDTHS", "320,640,1024,1600").split(","))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", "75"))
+IMAGE_MAX_UPLOAD_BYTES = int(os.environ.get("IMAGE_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ACCEPTED_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "png"}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+_IMAGE_URL = re.compile(re.escape(IMAGE_URL_PREFIX) + r"/[0-9a-f]{2}/([0-9a-f]{64})/")
+
+image_pool = WorkerPool(IMAGE_WORKERS, "images")
+
+def modern_formats() -> List[str]:
+    """Next-generation formats this Pillow build can encode, best first"""
+    if Image is None:
+        return []
+    return [name for name in ("avif", "webp") if features.check(name)]
+
+def image_dir(digest: str) -> Path:
+    return IMAGE_ROOT / digest[:2] / digest
+
+def image_url(digest: str, filename: str) -> str:
+    return f"{IMAGE_URL_PREFIX}/{digest[:2]}/{digest}/{filename}"
+
+# Upload
+
+async def receive_upload(upload: UploadFile, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> Tuple[Path, str]:
+    """Copy an upload to a temporary file in chunks while hashing it; returns (path, sha256)"""
+    (MEDIA_ROOT / "tmp").mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(dir=MEDIA_ROOT / "tmp", delete=False)
+    try:
+        with handle:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail="Upload is too large")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+    return Path(handle.name), digest.hexdigest()
+
+def render_variants(source: Path, digest: str) -> dict:
+    """Decode, orient and resize one image into every width and format; runs in the image pool
+
+    Variants are written to a scratch directory that is renamed into place,
+    so a hash directory is either complete or absent.
+    """
+    target = image_dir(digest)
+    scratch = Path(tempfile.mkdtemp(dir=MEDIA_ROOT / "tmp"))
+    try:
+        with Image.open(source) as image:
+            original_format = ACCEPTED_FORMATS.get(image.format)
+            if original_format is None:
+                raise ValueError(f"Unsupported image format {image.format}")
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ("RGBA", "LA", "P") and original_format != "jpg"
+            image = image.convert("RGBA" if has_alpha else "RGB")
+            fallback = "png" if has_alpha else "jpg"
+            width, height = image.size
+
+            variants = []
+            widths = sorted({w for w in IMAGE_WIDTHS if w < width} | {min(width, max(IMAGE_WIDTHS))})
+            for variant_width in widths:
+                resized = image if variant_width == width else image.resize(
+                    (variant_width, max(1, round(height * variant_width / width))), Image.LANCZOS
+                )
+                for fmt in modern_formats() + [fallback]:
+                    filename = f"{variant_width}.{fmt}"
+                    resized.save(scratch / filename, **_save_options(fmt))
+                    variants.append({
+                        "width": variant_width,
+                        "height": resized.size[1],
+                        "format": fmt,
+                        "url": image_url(digest, filename),
+                        "bytes": (scratch / filename).stat().st_size,
+                    })
+    except ValueError:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    except (OSError, Image.DecompressionBombError):
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise ValueError("Invalid or unreadable image file")
+
+    manifest = build_manifest(digest, width, height, fallback, variants)
+    (scratch / "manifest.json").write_text(json.dumps(manifest))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(scratch, target)
+    except OSError:
+        # Same image rendered concurrently; keep the first copy
+        shutil.rmtree(scratch, ignore_errors=True)
+    return manifest
+
+def _save_options(fmt: str) -> dict:
+    if fmt == "jpg":
+        return {"format": "JPEG", "quality": IMAGE_QUALITY, "optimize": True, "progressive": True}
+    if fmt == "png":
+        return {"format": "PNG", "optimize": True}
+    return {"format": fmt.upper(), "quality": IMAGE_QUALITY}
+
+def build_manifest(digest: str, width: int, height: int, fallback: str, variants: List[dict]) -> dict:
+    srcset: Dict[str, str] = {}
+    for variant in variants:
+        entry = f"{variant['url']} {variant['width']}w"
+        srcset[variant["format"]] = f"{srcset[variant['format']]}, {entry}" if variant["format"] in srcset else entry
+    largest = max(v["width"] for v in variants)
+    return {
+        "hash": digest,
+        "url": image_url(digest, f"{largest}.{fallback}"),
+        "width": width,
+        "height": height,
+        "variants": variants,
+        "srcset": srcset,
+        "types": {fmt: MIME_TYPES[fmt] for fmt in srcset},
+    }
+
+def load_manifest(digest: str) -> Optional[dict]:
+    """Read a stored manifest; blocking, so call it from a worker thread"""
+    path = image_dir(digest) / "manifest.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+async def store_image(upload: UploadFile) -> dict:
+    """Store an uploaded image once per content hash and return its manifest"""
+    if Image is None:
+        raise HTTPException(status_code=503, detail="Image processing is not available")
+    source, digest = await receive_upload(upload)
+    try:
+        manifest = await run_in_threadpool(load_manifest, digest)
+        deduplicated = manifest is not None
+        if manifest is None:
+            manifest = await image_pool.run(render_variants, source, digest)
+        return {**manifest, "deduplicated": deduplicated}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        source.unlink(missing_ok=True)
+
+def with_image_metadata(doc: dict) -> dict:
+    """Attach the manifest of an uploaded image referenced by image_url; reads from disk"""
+    url = doc.get("image_url")
+    if "image_url" in doc:
+        match = _IMAGE_URL.match(url or "")
+        doc["image"] = load_manifest(match.group(1)) if match else None
+    return doc
+
+class UploadLimitMiddleware:
+    """Refuse upload bodies over their route's limit before they are parsed or spooled
+
+    A declared Content-Length over the limit is answered with 413 before any
+    byte is read; otherwise the body is counted as it streams in and cut off
+    once it passes the limit. `limits` maps request paths to file size limits.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = {path: limit + MULTIPART_OVERHEAD_BYTES for path, limit in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        declared = Headers(scope=scope).get("content-length", "")
+        if declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": "Upload is too large"}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this surfaces as a 413
+                    raise HTTPException(status_code=413, detail="Upload is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+# Serving
+
+class ImmutableStaticFiles(StaticFiles):
+    """Content-addressed files never change, so clients may cache them for a year"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,188 @@
+"""
+Prometheus-style metrics: HTTP request histograms, in-flight gauge and MongoDB command timings
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in items)
+    return "{" + ",".join(escaped) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help, self.type = name, help, "counter"
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(labels)} {value}"
+
+class Gauge(Counter):
+    def __init__(self, name: str, help: str, collect: Optional[Callable[[], Dict[Labels, float]]] = None):
+        super().__init__(name, help)
+        self.type = "gauge"
+        self._collect = collect
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        if self._collect is not None:
+            self._values = self._collect()
+        return super().samples()
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.type = name, help, "histogram"
+        self.buckets = buckets
+        self._values: Dict[Labels, List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket{_format_labels(labels, ('le', str(bound)))} {count}"
+            yield f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(labels)} {series[-1]}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status"))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method, route template and status"))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed"))
+mongo_commands_total = registry.register(Counter(
+    "mongo_commands_total", "MongoDB commands by collection, command and outcome"))
+mongo_command_duration_seconds = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection and command",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+
+def register_stats(name: str, help: str, stats: Callable[[], Dict[str, float]], label: str = "stat") -> Gauge:
+    """Expose a component's numeric stats() dictionary as a labelled gauge"""
+    def collect():
+        return {
+            ((label, key),): float(value)
+            for key, value in stats().items()
+            if isinstance(value, (int, float))
+        }
+    return registry.register(Gauge(name, help, collect))
+
+class MetricsMiddleware:
+    """Record count, latency and in-flight requests per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        method = scope["method"]
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            labels = {"method": method, "route": route, "status": str(status_code)}
+            http_requests_total.inc(**labels)
+            http_request_duration_seconds.observe(elapsed, **labels)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Time every MongoDB command per collection and operation"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[str, str, float, str], None]] = []
+
+    def on_command(self, callback: Callable[[str, str, float, str], None]) -> None:
+        """Register a callback receiving (collection, command, seconds, outcome) for every command"""
+        self._callbacks.append(callback)
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore names its collection separately; admin commands have none
+            collection = event.command.get("collection", "")
+        with self._lock:
+            self._pending[self._key(event)] = (collection, event.command_name)
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            collection, command = self._pending.pop(self._key(event), ("", event.command_name))
+        seconds = event.duration_micros / 1e6
+        mongo_commands_total.inc(collection=collection, command=command, outcome=outcome)
+        mongo_command_duration_seconds.observe(seconds, collection=collection, command=command)
+        for callback in self._callbacks:
+            callback(collection, command, seconds, outcome)
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+mongo_command_listener = MongoCommandListener()
@@ -0,0 +1,34 @@
+"""
+Backfill integer rupiah fields (price_idr, revenue_idr, loan_amount_idr) from the display strings
+
+Streams each collection and writes in batches; safe to re-run:
+    python migrate_money.py --batch-size 500 [--force]
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from database import create_client
+from money import migrate_money_fields
+
+async def main(batch_size: int, force: bool):
+    client = create_client()
+    try:
+        report = await migrate_money_fields(client[os.environ['DB_NAME']], batch_size, force)
+    finally:
+        client.close()
+    for collection, counts in report.items():
+        print(f"{collection:<12} scanned={counts['scanned']} updated={counts['updated']} unparsed={counts['unparsed']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--force", action="store_true", help="re-parse documents that already have the field")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.force))
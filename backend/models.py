@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Any, Generic, TypeVar
 from datetime import datetime
 from enum import Enum
 
@@ -33,6 +33,14 @@ class ResourceType(str, Enum):
     GUIDE = "guide"
     TRAINING = "training"
 
+class Language(str, Enum):
+    ID = "id"
+    EN = "en"
+
+class ListView(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
 class BilingualText(BaseModel):
     id: str
     en: str
@@ -81,6 +89,7 @@ class BusinessUnitCreate(BusinessUnitBase):
 
 class BusinessUnit(BusinessUnitBase):
     id: str = Field(alias="_id")
+    revenue_idr: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -88,6 +97,34 @@ class BusinessUnit(BusinessUnitBase):
         populate_by_name = True
 
 # Product Models
+# Image Models
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    format: str
+    url: str
+    bytes: int
+
+class ImageAsset(BaseModel):
+    hash: str
+    url: str
+    width: int
+    height: int
+    variants: List[ImageVariant]
+    srcset: Dict[str, str]  # format -> "url 320w, url 640w, ..."
+    types: Dict[str, str]  # format -> MIME type, for <source type=...>
+
+class ImageUpload(ImageAsset):
+    deduplicated: bool = False
+
+class DocumentUpload(BaseModel):
+    sha256: str
+    url: str
+    bytes: int
+    file_size: str
+    linearized: bool  # "fast web view": the first page renders before the whole file arrives
+    deduplicated: bool = False
+
 class ProductBase(BaseModel):
     name: BilingualText
     category: str
@@ -101,6 +138,8 @@ class ProductCreate(ProductBase):
 
 class Product(ProductBase):
     id: str = Field(alias="_id")
+    price_idr: Optional[int] = None
+    image: Optional[ImageAsset] = None
     created_at: datetime
     updated_at: datetime
 
@@ -125,6 +164,7 @@ class CapitalApplicationUpdate(BaseModel):
 
 class CapitalApplication(CapitalApplicationBase):
     id: str = Field(alias="_id")
+    loan_amount_idr: Optional[int] = None
     status: ApplicationStatus = ApplicationStatus.PENDING
     submitted_at: datetime
     reviewed_at: Optional[datetime] = None
@@ -148,6 +188,7 @@ class NewsCreate(NewsBase):
 
 class News(NewsBase):
     id: str = Field(alias="_id")
+    image: Optional[ImageAsset] = None
     author: str
     published_at: datetime
     created_at: datetime
@@ -172,12 +213,46 @@ class FinancialReportCreate(FinancialReportBase):
 
 class FinancialReport(FinancialReportBase):
     id: str = Field(alias="_id")
+    pdf_bytes: Optional[int] = None
+    pdf_sha256: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         populate_by_name = True
 
+# Financial Analytics Models
+class QuarterAnalytics(BaseModel):
+    period: Optional[str] = None
+    year: int
+    quarter: int
+    income: float
+    expense: float
+    profit: float
+    margin: Optional[float] = None
+    income_yoy: Optional[float] = None
+    expense_yoy: Optional[float] = None
+    profit_yoy: Optional[float] = None
+    rolling_income: Optional[float] = None
+    rolling_expense: Optional[float] = None
+    rolling_profit: Optional[float] = None
+    rolling_margin: Optional[float] = None
+
+class YearAnalytics(BaseModel):
+    year: int
+    quarters: int
+    income: float
+    expense: float
+    profit: float
+    margin: Optional[float] = None
+    income_yoy: Optional[float] = None
+    expense_yoy: Optional[float] = None
+    profit_yoy: Optional[float] = None
+
+class TransparansiAnalytics(BaseModel):
+    quarters: List[QuarterAnalytics]
+    years: List[YearAnalytics]
+
 # SHU Distribution Models
 class SHUDistributionBase(BaseModel):
     year: int
@@ -197,6 +272,56 @@ class SHUDistribution(SHUDistributionBase):
     class Config:
         populate_by_name = True
 
+# SHU Calculation Models
+class SHUMemberBase(BaseModel):
+    member_id: str
+    name: str
+    year: int
+    capital: float = 0
+    transactions: float = 0
+
+class SHUMemberCreate(SHUMemberBase):
+    pass
+
+class SHUCalculationRequest(BaseModel):
+    year: int
+    reserve_pct: Optional[float] = None
+    member_pct: Optional[float] = None
+    village_pct: Optional[float] = None
+    capital_service_pct: Optional[float] = None
+    distribution_date: Optional[datetime] = None
+
+class SHUSnapshot(BaseModel):
+    id: str = Field(alias="_id")
+    year: int
+    version: int
+    profit: float
+    reserve_pct: float
+    member_pct: float
+    village_pct: float
+    capital_service_pct: float
+    reserve_amount: int
+    member_amount: int
+    village_amount: int
+    capital_service_amount: int
+    transaction_service_amount: int
+    member_count: int
+    per_member: float
+    is_current: bool
+    calculated_at: datetime
+
+    class Config:
+        populate_by_name = True
+
+class SHUMemberAllocation(BaseModel):
+    member_id: str
+    name: Optional[str] = None
+    capital: float
+    transactions: float
+    capital_service: int
+    transaction_service: int
+    total: int
+
 # Contact Message Models
 class ContactMessageBase(BaseModel):
     name: str
@@ -247,7 +372,7 @@ class DocumentBase(BaseModel):
     description: BilingualText
     year: int
     file_url: str
-    file_size: str
+    file_size: Optional[str] = None  # filled from the stored file for uploaded PDFs
     category: str
 
 class DocumentCreate(DocumentBase):
@@ -255,6 +380,8 @@ class DocumentCreate(DocumentBase):
 
 class Document(DocumentBase):
     id: str = Field(alias="_id")
+    file_bytes: Optional[int] = None
+    file_sha256: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -270,4 +397,50 @@ class DashboardStats(BaseModel):
     pending_applications: int
     total_products: int
     published_news: int
-    contact_messages: int
\ No newline at end of file
+    contact_messages: int
+
+# Search Models
+class SearchHit(BaseModel):
+    collection: str
+    id: str
+    title: BilingualText
+    score: float
+    highlight: str
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    page: int
+    limit: int
+    hits: List[SearchHit]
+
+# Pagination Models
+class Page(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+# Bulk Operation Models
+T = TypeVar("T")
+
+class BulkUpdateItem(BaseModel, Generic[T]):
+    id: str
+    data: T
+
+class BulkRequest(BaseModel, Generic[T]):
+    ordered: bool = True
+    create: List[T] = []
+    update: List[BulkUpdateItem[T]] = []
+    delete: List[str] = []
+
+class BulkItemResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    inserted: int = 0
+    modified: int = 0
+    deleted: int = 0
+    results: List[BulkItemResult]
@@ -0,0 +1,91 @@
+"""
+Integer-rupiah companions for free-form money strings ("Rp 450 Juta", "Rp 15.000/kg")
+"""
+import logging
+import re
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# collection -> (display string field, integer rupiah field)
+MONEY_FIELDS: Dict[str, Tuple[str, str]] = {
+    "produk": ("price", "price_idr"),
+    "unit_usaha": ("revenue", "revenue_idr"),
+    "permodalan": ("loan_amount", "loan_amount_idr"),
+}
+
+MULTIPLIERS = {
+    "rb": 10 ** 3, "ribu": 10 ** 3, "k": 10 ** 3,
+    "jt": 10 ** 6, "juta": 10 ** 6,
+    "m": 10 ** 9, "miliar": 10 ** 9, "milyar": 10 ** 9,
+    "t": 10 ** 12, "triliun": 10 ** 12,
+}
+
+_AMOUNT = re.compile(r"(\d[\d.,]*)\s*([a-z]+)?")
+
+def parse_rupiah(text: Optional[str]) -> Optional[int]:
+    """Whole rupiah from a display string; the first amount wins ("Rp 10-50 Juta" -> 10 Juta)
+
+    A dot followed by groups of exactly three digits is a thousands separator
+    ("Rp 2.500 Juta") and a comma is the decimal mark ("Rp 1,5 Juta"); any
+    other single dot is read as a decimal point ("Rp 1.5 Juta").
+    Returns None when no amount is found.
+    """
+    if not text:
+        return None
+    cleaned = text.lower().replace("rp", " ", 1)
+    match = _AMOUNT.search(cleaned)
+    if match is None:
+        return None
+    number, unit = match.group(1).rstrip(".,"), match.group(2)
+    multiplier = MULTIPLIERS.get(unit or "")
+    if multiplier is None and "-" in cleaned[match.end():match.end() + 2]:
+        # "Rp 10-50 Juta": the unit belongs to the whole range
+        following = _AMOUNT.search(cleaned, match.end())
+        multiplier = MULTIPLIERS.get(following.group(2) or "") if following else None
+    integer, _, decimals = number.partition(",")
+    groups = integer.split(".")
+    if len(groups) == 2 and len(groups[1]) != 3 and not decimals:
+        integer, decimals = groups
+    else:
+        integer = "".join(groups)
+    value = float(f"{integer}.{decimals.replace('.', '').replace(',', '') or 0}")
+    return int(round(value * (multiplier or 1)))
+
+def with_money_fields(collection: str, doc: dict) -> dict:
+    """Set the integer rupiah field when the document carries its display string"""
+    fields = MONEY_FIELDS.get(collection)
+    if fields is not None and fields[0] in doc:
+        doc[fields[1]] = parse_rupiah(doc[fields[0]])
+    return doc
+
+async def migrate_money_fields(db, batch_size: int = 500, force: bool = False) -> Dict[str, dict]:
+    """Backfill integer rupiah fields, streaming each collection and writing in batches
+
+    Only documents missing the field are touched unless `force` is set;
+    returns per-collection counts of updated and unparseable documents.
+    """
+    report = {}
+    for collection, (source, target) in MONEY_FIELDS.items():
+        query = {source: {"$exists": True}}
+        if not force:
+            query[target] = {"$exists": False}
+        counts = {"scanned": 0, "updated": 0, "unparsed": 0}
+        operations = []
+        cursor = db[collection].find(query, {source: 1}).batch_size(batch_size)
+        async for doc in cursor:
+            counts["scanned"] += 1
+            amount = parse_rupiah(doc.get(source))
+            if amount is None:
+                counts["unparsed"] += 1
+                logger.warning("%s %s: cannot parse %s %r", collection, doc["_id"], source, doc.get(source))
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {target: amount}}))
+            if len(operations) >= batch_size:
+                counts["updated"] += (await db[collection].bulk_write(operations, ordered=False)).modified_count
+                operations = []
+        if operations:
+            counts["updated"] += (await db[collection].bulk_write(operations, ordered=False)).modified_count
+        report[collection] = counts
+    return report
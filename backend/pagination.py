@@ -0,0 +1,110 @@
+"""
+Keyset pagination, filtering and projection helpers for admin list endpoints
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(doc: dict, sort_field: str) -> str:
+    """Encode the (sort value, _id) position of a document as an opaque cursor"""
+    value = doc.get(sort_field)
+    payload = {
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "id": str(doc["_id"]),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        value = payload["v"]
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value, ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def build_query(
+    equals: Optional[Dict[str, Any]] = None,
+    date_field: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+) -> dict:
+    """Build a Mongo filter from equality filters and inclusive ranges, skipping unset values"""
+    query = {}
+    for field, value in (equals or {}).items():
+        if value is not None:
+            query[field] = getattr(value, "value", value)
+    bounds = dict(ranges or {})
+    if date_field:
+        bounds[date_field] = (date_from, date_to)
+    for field, (low, high) in bounds.items():
+        if low is None and high is None:
+            continue
+        query[field] = {}
+        if low is not None:
+            query[field]["$gte"] = low
+        if high is not None:
+            query[field]["$lte"] = high
+    return query
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel], sort_field: str) -> Optional[dict]:
+    """Turn a comma-separated field list into a Mongo projection"""
+    if not fields:
+        return None
+    allowed = {info.alias or name for name, info in model.model_fields.items()}
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f.split(".")[0] not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    projection = {f: 1 for f in requested}
+    # The sort key is always needed to build the next cursor
+    projection[sort_field] = 1
+    return projection
+
+def keyset_filter(sort_field: str, value: Any, last_id: ObjectId) -> dict:
+    """Documents after (value, last_id) in (sort_field, _id) descending order"""
+    if value is None:
+        # Already among the null/missing tail, which only _id orders
+        return {sort_field: None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "_id": {"$lt": last_id}},
+        # $lt never matches null or missing values, which come after every value
+        {sort_field: None},
+    ]}
+
+async def paginate(
+    collection,
+    query: dict,
+    sort_field: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    projection: Optional[dict] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page sorted by (sort_field, _id) descending, returning the docs and the next cursor
+
+    Documents whose sort field is null or missing sort last and are paged by _id alone.
+    """
+    if after:
+        value, last_id = decode_cursor(after)
+        keyset = keyset_filter(sort_field, value, last_id)
+        query = {"$and": [query, keyset]} if query else keyset
+    cursor = collection.find(query, projection).sort([(sort_field, -1), ("_id", -1)]).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
@@ -0,0 +1,93 @@
+"""
+Per-request MongoDB query recording, budgets and repeated-query (N+1) detection
+"""
+import logging
+import os
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_ENABLED = os.environ.get("QUERY_BUDGET", "false").lower() in ("1", "true", "yes")
+QUERY_BUDGET_MAX_COMMANDS = int(os.environ.get("QUERY_BUDGET_MAX_COMMANDS", "8"))
+QUERY_BUDGET_MAX_MS = float(os.environ.get("QUERY_BUDGET_MAX_MS", "200"))
+# The same (collection, command) issued this many times in one request is reported as a likely N+1
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.environ.get("QUERY_BUDGET_REPEAT_THRESHOLD", "5"))
+
+class RequestQueries:
+    """Mongo commands issued while serving one request"""
+
+    def __init__(self):
+        self.commands: List[Tuple[str, str, float, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, collection: str, command: str, seconds: float, outcome: str) -> None:
+        # Motor runs commands on executor threads with the request's context copied
+        with self._lock:
+            self.commands.append((collection, command, seconds, outcome))
+
+    @property
+    def total_ms(self) -> float:
+        return sum(c[2] for c in self.commands) * 1000
+
+    def repeated(self) -> List[Tuple[Tuple[str, str], int]]:
+        counts = Counter((c[0], c[1]) for c in self.commands)
+        return [(key, n) for key, n in counts.most_common() if n >= QUERY_BUDGET_REPEAT_THRESHOLD]
+
+    def over_budget(self) -> bool:
+        return len(self.commands) > QUERY_BUDGET_MAX_COMMANDS or self.total_ms > QUERY_BUDGET_MAX_MS
+
+    def summary(self) -> str:
+        return f"commands={len(self.commands)}; time_ms={self.total_ms:.1f}; over_budget={int(self.over_budget())}"
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+def record_command(collection: str, command: str, seconds: float, outcome: str) -> None:
+    """CommandListener callback: attribute the command to the current request, if any"""
+    queries = _current.get()
+    if queries is not None:
+        queries.record(collection, command, seconds, outcome)
+
+class QueryBudgetMiddleware:
+    """Record every Mongo command per request, report it in headers and log budget overruns"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries = RequestQueries()
+        token = _current.set(queries)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Budget"] = queries.summary()
+                headers.append("Server-Timing", f'mongo;dur={queries.total_ms:.1f};desc="{len(queries.commands)} commands"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._report(scope, queries)
+
+    @staticmethod
+    def _report(scope, queries: RequestQueries) -> None:
+        repeated = queries.repeated()
+        if not queries.over_budget() and not repeated:
+            return
+        route = getattr(scope.get("route"), "path", scope.get("path", ""))
+        timings = ", ".join(f"{c[1]} {c[0]} {c[2] * 1000:.1f}ms" for c in queries.commands)
+        logger.warning(
+            "Query budget exceeded on %s %s: %s [%s]",
+            scope.get("method"), route, queries.summary(), timings,
+        )
+        for (collection, command), count in repeated:
+            logger.warning("Possible N+1 on %s %s: %s %s issued %d times", scope.get("method"), route, command, collection, count)
@@ -0,0 +1,207 @@
+"""
+Token-bucket rate limiting per client IP and route for anonymous write endpoints
+"""
+import logging
+import math
+import os
+import time
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from metrics import Counter, registry
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Redis is optional; the in-memory backend is always available
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_KEY_PREFIX = os.environ.get("RATE_LIMIT_KEY_PREFIX", "ratelimit:")
+# Number of reverse proxies in front of the app that append to X-Forwarded-For. Entries to
+# the left of those are client-supplied, so the key is the one the outermost proxy added;
+# 0 ignores the header. RATE_LIMIT_TRUST_PROXY=true is shorthand for a single proxy.
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+RATE_LIMIT_TRUSTED_HOPS = int(os.environ.get("RATE_LIMIT_TRUSTED_HOPS", "1" if RATE_LIMIT_TRUST_PROXY else "0"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+
+class RateLimitRule:
+    """Bucket of `capacity` requests refilled evenly over `period` seconds"""
+
+    def __init__(self, name: str, capacity: int, period: float):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period  # tokens per second
+
+    @classmethod
+    def from_env(cls, name: str, default: str) -> "RateLimitRule":
+        # "<requests>/<seconds>", e.g. "10/60"
+        capacity, _, period = os.environ.get(f"RATE_LIMIT_{name.upper()}", default).partition("/")
+        return cls(name, int(capacity), float(period or 60))
+
+    @property
+    def policy(self) -> str:
+        return f"{self.capacity};w={int(self.period)}"
+
+RATE_LIMIT_RULES = {
+    rule.name: rule for rule in (
+        RateLimitRule.from_env("login", "10/60"),
+        RateLimitRule.from_env("register", "5/3600"),
+        RateLimitRule.from_env("permodalan", "5/3600"),
+        RateLimitRule.from_env("kontak", "10/3600"),
+    )
+}
+RATE_LIMIT_MAX_PERIOD = max(rule.period for rule in RATE_LIMIT_RULES.values())
+
+# Backends: take one token and return (allowed, tokens left)
+
+class MemoryBackend:
+    """Buckets in process memory; limits are per worker process"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated_at)
+
+    async def take(self, key: str, rule: RateLimitRule, now: float) -> Tuple[bool, float]:
+        tokens, updated_at = self._buckets.get(key, (rule.capacity, now))
+        tokens = min(rule.capacity, tokens + (now - updated_at) * rule.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            self._prune(now)
+        self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle long enough to have refilled completely carry no state
+        full = [
+            key for key, (tokens, updated_at) in self._buckets.items()
+            if now - updated_at >= RATE_LIMIT_MAX_PERIOD
+        ]
+        for key in full or list(self._buckets)[: len(self._buckets) // 10 or 1]:
+            del self._buckets[key]
+
+    async def close(self) -> None:
+        self._buckets.clear()
+
+# Atomic refill-and-take; the hash expires once the bucket would be full again
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBackend:
+    """Buckets shared by all workers in any Redis-protocol server; fails open if it is unreachable"""
+
+    def __init__(self, client=None, url: str = RATE_LIMIT_REDIS_URL, prefix: str = RATE_LIMIT_KEY_PREFIX):
+        if client is None:
+            if redis_asyncio is None:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package")
+            client = redis_asyncio.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rule: RateLimitRule, now: float) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = await self._script(keys=[self.prefix + key], args=[rule.capacity, rule.rate, now])
+        except Exception as exc:
+            logger.warning("Rate limit backend unavailable, allowing request: %s", exc)
+            return True, rule.capacity
+        return bool(int(allowed)), float(tokens)
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "redis":
+        return RedisBackend()
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}; expected memory or redis")
+
+rate_limited_total = registry.register(Counter(
+    "rate_limited_requests_total", "Requests rejected by the rate limiter per rule"))
+
+# Limiter
+
+def client_ip(request: Request, trusted_hops: int = RATE_LIMIT_TRUSTED_HOPS) -> str:
+    """The address the outermost trusted proxy saw, or the socket peer without proxies"""
+    if trusted_hops > 0:
+        forwarded = [entry.strip() for entry in ",".join(request.headers.getlist("x-forwarded-for")).split(",")]
+        forwarded = [entry for entry in forwarded if entry]
+        if len(forwarded) >= trusted_hops:
+            return forwarded[-trusted_hops]
+    return request.client.host if request.client else "unknown"
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    def use(self, backend) -> None:
+        """Swap the backend, e.g. for a local Redis stub"""
+        self._backend = backend
+
+    async def check(self, rule: RateLimitRule, client: str) -> Dict[str, str]:
+        """Take a token for `client` under `rule`; raise 429 when the bucket is empty"""
+        allowed, tokens = await self.backend.take(f"{rule.name}:{client}", rule, time.time())
+        remaining = int(tokens)
+        # Seconds until the next token when empty, otherwise until the bucket is full again
+        missing = 1 - tokens if not allowed else rule.capacity - tokens
+        headers = {
+            "RateLimit-Limit": str(rule.capacity),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(math.ceil(missing / rule.rate)),
+            "RateLimit-Policy": rule.policy,
+        }
+        if not allowed:
+            rate_limited_total.inc(rule=rule.name)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={**headers, "Retry-After": headers["RateLimit-Reset"]},
+            )
+        return headers
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+
+rate_limiter = RateLimiter()
+
+def rate_limit(rule_name: str):
+    """Route dependency enforcing a rule from RATE_LIMIT_RULES per client IP"""
+    rule = RATE_LIMIT_RULES[rule_name]
+
+    async def dependency(request: Request, response: Response) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        headers = await rate_limiter.check(rule, client_ip(request))
+        response.headers.update(headers)
+    return dependency
@@ -1,201 +1,301 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from models import (
-    User, DashboardStats,
+    User, DashboardStats, Page, BulkRequest, BulkResult, ImageUpload, DocumentUpload,
     BusinessUnitCreate, BusinessUnit,
     ProductCreate, Product,
     CapitalApplication, CapitalApplicationUpdate, ApplicationStatus,
     NewsCreate, News,
-    FinancialReportCreate, FinancialReport,
+    FinancialReportCreate, FinancialReport, AuditStatus,
     SHUDistributionCreate, SHUDistribution,
+    SHUMemberCreate, SHUCalculationRequest, SHUSnapshot, SHUMemberAllocation,
     ContactMessage, ContactMessageReply, MessageStatus,
-    EducationalResourceCreate, EducationalResource,
+    EducationalResourceCreate, EducationalResource, ResourceType,
     DocumentCreate, Document
 )
-from dependencies import get_current_admin, db
+from dependencies import get_current_admin, read_db
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from cache import invalidate
+from dashboard import load_dashboard_stats, mark_dashboard_dirty
+from compression import compression_stats
+from bulk import run_bulk
+from shu import allocation_policy, calculate_shu
+from money import with_money_fields
+from media import store_image, with_image_metadata
+from documents import store_document, with_document_metadata
+from export import EXPORTS, EXPORT_BATCH_SIZE, export_columns, stream_csv, stream_ndjson
+from pagination import build_query, parse_fields, paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from datetime import datetime
-from typing import List
+from typing import Optional
 from bson import ObjectId
+from pymongo import ReturnDocument
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+# Admin pages read their own writes, so this policy defaults to the primary (ADMIN_READ_PREFERENCE)
+get_admin_db = read_db("admin")
+
 # Helper function
 def serialize_doc(doc):
     if doc and "_id" in doc:
         doc["_id"] = str(doc["_id"])
     return doc
 
+def page_items(docs, model, projection):
+    """Validate full documents through the model; return projected documents as-is"""
+    if projection:
+        return [serialize_doc(doc) for doc in docs]
+    return [model(**serialize_doc(doc)).model_dump(by_alias=True) for doc in docs]
+
+# Media Uploads
+@router.post("/media/images", response_model=ImageUpload)
+async def upload_image(file: UploadFile = File(...), current_user: User = Depends(get_current_admin)):
+    """Upload an image; returns its responsive variants to use as image_url and srcset"""
+    return ImageUpload(**await store_image(file))
+
+@router.post("/media/documents", response_model=DocumentUpload)
+async def upload_document(file: UploadFile = File(...), current_user: User = Depends(get_current_admin)):
+    """Upload a PDF; returns its URL, byte size and checksum to use as file_url or pdf_url"""
+    return DocumentUpload(**await store_document(file))
+
 # Dashboard Routes
 @router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(current_user: User = Depends(get_current_admin)):
+async def get_dashboard_stats(current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Get dashboard statistics"""
-    # Count active business units
-    active_units = await db.unit_usaha.count_documents({"status": "active"})
-    
-    # Count total products
-    total_products = await db.produk.count_documents({})
-    
-    # Count pending applications
-    pending_applications = await db.permodalan.count_documents({"status": "pending"})
-    
-    # Count published news
-    published_news = await db.berita.count_documents({"is_published": True})
-    
-    # Count new contact messages
-    contact_messages = await db.kontak.count_documents({"status": "new"})
-    
-    # Calculate total revenue from latest financial report
-    latest_report = await db.transparansi.find_one(sort=[("year", -1), ("quarter", -1)])
-    total_revenue = f"Rp {latest_report.get('income', 0) / 1000000:.1f} Miliar" if latest_report else "Rp 0"
-    
-    return DashboardStats(
-        total_revenue=total_revenue,
-        active_units=active_units,
-        partners=45,  # Static for now
-        citizens_served=850,  # Static for now
-        pending_applications=pending_applications,
-        total_products=total_products,
-        published_news=published_news,
-        contact_messages=contact_messages
-    )
+    return DashboardStats(**await load_dashboard_stats(db))
+
+@router.get("/stats/compression")
+async def get_compression_stats(current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Get per-route compression savings and CPU time"""
+    return compression_stats.snapshot()
 
 # Business Units Management
 @router.post("/unit-usaha", response_model=BusinessUnit)
-async def create_business_unit(unit: BusinessUnitCreate, current_user: User = Depends(get_current_admin)):
+async def create_business_unit(unit: BusinessUnitCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create new business unit"""
-    unit_dict = unit.model_dump()
+    unit_dict = with_money_fields("unit_usaha", unit.model_dump())
     unit_dict["created_at"] = datetime.utcnow()
     unit_dict["updated_at"] = datetime.utcnow()
     
     result = await db.unit_usaha.insert_one(unit_dict)
     unit_dict["_id"] = str(result.inserted_id)
     
+    invalidate("unit_usaha")
+    
+    mark_dashboard_dirty()
     return BusinessUnit(**unit_dict)
 
+@router.post("/unit-usaha/bulk", response_model=BulkResult)
+async def bulk_business_units(bulk: BulkRequest[BusinessUnitCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete business units in one request"""
+    result = await run_bulk(db.unit_usaha, bulk, prepare=lambda doc: with_money_fields("unit_usaha", doc))
+    invalidate("unit_usaha")
+    mark_dashboard_dirty()
+    return result
+
 @router.put("/unit-usaha/{unit_id}", response_model=BusinessUnit)
-async def update_business_unit(unit_id: str, unit: BusinessUnitCreate, current_user: User = Depends(get_current_admin)):
+async def update_business_unit(unit_id: str, unit: BusinessUnitCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Update business unit"""
     try:
-        unit_dict = unit.model_dump()
+        unit_dict = with_money_fields("unit_usaha", unit.model_dump())
         unit_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.unit_usaha.update_one(
+        updated_unit = await db.unit_usaha.find_one_and_update(
             {"_id": ObjectId(unit_id)},
-            {"$set": unit_dict}
+            {"$set": unit_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_unit is None:
             raise HTTPException(status_code=404, detail="Business unit not found")
         
-        updated_unit = await db.unit_usaha.find_one({"_id": ObjectId(unit_id)})
+        invalidate("unit_usaha")
+        mark_dashboard_dirty()
         return BusinessUnit(**serialize_doc(updated_unit))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/unit-usaha/{unit_id}")
-async def delete_business_unit(unit_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_business_unit(unit_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Delete business unit"""
     try:
         result = await db.unit_usaha.delete_one({"_id": ObjectId(unit_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Business unit not found")
+        invalidate("unit_usaha")
+        mark_dashboard_dirty()
         return {"message": "Business unit deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Products Management
 @router.post("/produk", response_model=Product)
-async def create_product(product: ProductCreate, current_user: User = Depends(get_current_admin)):
+async def create_product(product: ProductCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create new product"""
-    product_dict = product.model_dump()
+    product_dict = await run_in_threadpool(with_image_metadata, with_money_fields("produk", product.model_dump()))
     product_dict["created_at"] = datetime.utcnow()
     product_dict["updated_at"] = datetime.utcnow()
     
     result = await db.produk.insert_one(product_dict)
     product_dict["_id"] = str(result.inserted_id)
     
+    invalidate("produk")
+    
+    mark_dashboard_dirty()
     return Product(**product_dict)
 
+@router.post("/produk/bulk", response_model=BulkResult)
+async def bulk_products(bulk: BulkRequest[ProductCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete products in one request"""
+    result = await run_bulk(db.produk, bulk, prepare=lambda doc: with_image_metadata(with_money_fields("produk", doc)))
+    invalidate("produk")
+    mark_dashboard_dirty()
+    return result
+
 @router.put("/produk/{product_id}", response_model=Product)
-async def update_product(product_id: str, product: ProductCreate, current_user: User = Depends(get_current_admin)):
+async def update_product(product_id: str, product: ProductCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Update product"""
     try:
-        product_dict = product.model_dump()
+        product_dict = await run_in_threadpool(with_image_metadata, with_money_fields("produk", product.model_dump()))
         product_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.produk.update_one(
+        updated_product = await db.produk.find_one_and_update(
             {"_id": ObjectId(product_id)},
-            {"$set": product_dict}
+            {"$set": product_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_product is None:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        updated_product = await db.produk.find_one({"_id": ObjectId(product_id)})
+        invalidate("produk")
+        mark_dashboard_dirty()
         return Product(**serialize_doc(updated_product))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/produk/{product_id}")
-async def delete_product(product_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_product(product_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Delete product"""
     try:
         result = await db.produk.delete_one({"_id": ObjectId(product_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Product not found")
+        invalidate("produk")
+        mark_dashboard_dirty()
         return {"message": "Product deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Capital Applications Management
-@router.get("/permodalan", response_model=List[CapitalApplication])
-async def get_all_applications(current_user: User = Depends(get_current_admin)):
-    """Get all capital applications"""
-    applications = await db.permodalan.find().sort("submitted_at", -1).to_list(1000)
-    return [CapitalApplication(**serialize_doc(app)) for app in applications]
+@router.get("/permodalan", response_model=Page)
+async def get_all_applications(
+    status: Optional[ApplicationStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_loan: Optional[int] = Query(None, ge=0),
+    max_loan: Optional[int] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Get capital applications, newest first, one page at a time"""
+    query = build_query(
+        {"status": status}, "submitted_at", date_from, date_to,
+        ranges={"loan_amount_idr": (min_loan, max_loan)},
+    )
+    projection = parse_fields(fields, CapitalApplication, "submitted_at")
+    applications, next_cursor = await paginate(db.permodalan, query, "submitted_at", limit, after, projection)
+    return Page(items=page_items(applications, CapitalApplication, projection), next_cursor=next_cursor)
+
+@router.get("/permodalan/queue", response_model=Page)
+async def get_review_queue(
+    status: ApplicationStatus = ApplicationStatus.PENDING,
+    min_loan: Optional[int] = Query(None, ge=0),
+    max_loan: Optional[int] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Get the review queue, largest loans first, one page at a time"""
+    query = build_query({"status": status}, ranges={"loan_amount_idr": (min_loan, max_loan)})
+    projection = parse_fields(fields, CapitalApplication, "loan_amount_idr")
+    applications, next_cursor = await paginate(db.permodalan, query, "loan_amount_idr", limit, after, projection)
+    return Page(items=page_items(applications, CapitalApplication, projection), next_cursor=next_cursor)
 
 @router.get("/permodalan/{application_id}", response_model=CapitalApplication)
-async def get_application(application_id: str, current_user: User = Depends(get_current_admin)):
+async def get_application(application_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Get single application"""
     try:
         app = await db.permodalan.find_one({"_id": ObjectId(application_id)})
         if not app:
             raise HTTPException(status_code=404, detail="Application not found")
         return CapitalApplication(**serialize_doc(app))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/permodalan/{application_id}/approve", response_model=CapitalApplication)
-async def approve_application(application_id: str, update: CapitalApplicationUpdate, current_user: User = Depends(get_current_admin)):
+async def approve_application(application_id: str, update: CapitalApplicationUpdate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Approve or reject application"""
     try:
         update_dict = update.model_dump()
         update_dict["reviewed_at"] = datetime.utcnow()
         update_dict["reviewed_by"] = current_user.id
         
-        result = await db.permodalan.update_one(
+        updated_app = await db.permodalan.find_one_and_update(
             {"_id": ObjectId(application_id)},
-            {"$set": update_dict}
+            {"$set": update_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_app is None:
             raise HTTPException(status_code=404, detail="Application not found")
         
-        updated_app = await db.permodalan.find_one({"_id": ObjectId(application_id)})
+        mark_dashboard_dirty()
         return CapitalApplication(**serialize_doc(updated_app))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # News Management
-@router.get("/berita/all", response_model=List[News])
-async def get_all_news(current_user: User = Depends(get_current_admin)):
-    """Get all news (including unpublished)"""
-    news_list = await db.berita.find().sort("published_at", -1).to_list(1000)
-    return [News(**serialize_doc(news)) for news in news_list]
+@router.get("/berita/all", response_model=Page)
+async def get_all_news(
+    category: Optional[str] = None,
+    is_published: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Get news (including unpublished), newest first, one page at a time"""
+    query = build_query({"category": category, "is_published": is_published}, "published_at", date_from, date_to)
+    projection = parse_fields(fields, News, "published_at")
+    news_list, next_cursor = await paginate(db.berita, query, "published_at", limit, after, projection)
+    return Page(items=page_items(news_list, News, projection), next_cursor=next_cursor)
 
 @router.post("/berita", response_model=News)
-async def create_news(news: NewsCreate, current_user: User = Depends(get_current_admin)):
+async def create_news(news: NewsCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create new news article"""
-    news_dict = news.model_dump()
+    news_dict = await run_in_threadpool(with_image_metadata, news.model_dump())
     news_dict["author"] = current_user.id
     news_dict["published_at"] = datetime.utcnow()
     news_dict["created_at"] = datetime.utcnow()
@@ -204,74 +304,110 @@ async def create_news(news: NewsCreate, current_user: User = Depends(get_current
     result = await db.berita.insert_one(news_dict)
     news_dict["_id"] = str(result.inserted_id)
     
+    invalidate("berita")
+    
+    mark_dashboard_dirty()
     return News(**news_dict)
 
+@router.post("/berita/bulk", response_model=BulkResult)
+async def bulk_news(bulk: BulkRequest[NewsCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete news articles in one request"""
+    result = await run_bulk(
+        db.berita, bulk, {"author": current_user.id, "published_at": datetime.utcnow()}, prepare=with_image_metadata
+    )
+    invalidate("berita")
+    mark_dashboard_dirty()
+    return result
+
 @router.put("/berita/{news_id}", response_model=News)
-async def update_news(news_id: str, news: NewsCreate, current_user: User = Depends(get_current_admin)):
+async def update_news(news_id: str, news: NewsCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Update news article"""
     try:
-        news_dict = news.model_dump()
+        news_dict = await run_in_threadpool(with_image_metadata, news.model_dump())
         news_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.berita.update_one(
+        updated_news = await db.berita.find_one_and_update(
             {"_id": ObjectId(news_id)},
-            {"$set": news_dict}
+            {"$set": news_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_news is None:
             raise HTTPException(status_code=404, detail="News article not found")
         
-        updated_news = await db.berita.find_one({"_id": ObjectId(news_id)})
+        invalidate("berita")
+        mark_dashboard_dirty()
         return News(**serialize_doc(updated_news))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/berita/{news_id}")
-async def delete_news(news_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_news(news_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Delete news article"""
     try:
         result = await db.berita.delete_one({"_id": ObjectId(news_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="News article not found")
+        invalidate("berita")
+        mark_dashboard_dirty()
         return {"message": "News article deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Financial Reports Management
 @router.post("/transparansi/reports", response_model=FinancialReport)
-async def create_financial_report(report: FinancialReportCreate, current_user: User = Depends(get_current_admin)):
+async def create_financial_report(report: FinancialReportCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create financial report"""
-    report_dict = report.model_dump()
+    report_dict = with_document_metadata(report.model_dump())
     report_dict["created_at"] = datetime.utcnow()
     report_dict["updated_at"] = datetime.utcnow()
     
     result = await db.transparansi.insert_one(report_dict)
     report_dict["_id"] = str(result.inserted_id)
     
+    invalidate("transparansi")
+    
+    mark_dashboard_dirty()
     return FinancialReport(**report_dict)
 
+@router.post("/transparansi/reports/bulk", response_model=BulkResult)
+async def bulk_financial_reports(bulk: BulkRequest[FinancialReportCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete financial reports in one request"""
+    result = await run_bulk(db.transparansi, bulk, prepare=with_document_metadata)
+    invalidate("transparansi")
+    mark_dashboard_dirty()
+    return result
+
 @router.put("/transparansi/reports/{report_id}", response_model=FinancialReport)
-async def update_financial_report(report_id: str, report: FinancialReportCreate, current_user: User = Depends(get_current_admin)):
+async def update_financial_report(report_id: str, report: FinancialReportCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Update financial report"""
     try:
-        report_dict = report.model_dump()
+        report_dict = with_document_metadata(report.model_dump())
         report_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.transparansi.update_one(
+        updated_report = await db.transparansi.find_one_and_update(
             {"_id": ObjectId(report_id)},
-            {"$set": report_dict}
+            {"$set": report_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_report is None:
             raise HTTPException(status_code=404, detail="Report not found")
         
-        updated_report = await db.transparansi.find_one({"_id": ObjectId(report_id)})
+        invalidate("transparansi")
+        mark_dashboard_dirty()
         return FinancialReport(**serialize_doc(updated_report))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/transparansi/shu", response_model=SHUDistribution)
-async def create_shu_distribution(shu: SHUDistributionCreate, current_user: User = Depends(get_current_admin)):
+async def create_shu_distribution(shu: SHUDistributionCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create SHU distribution"""
     shu_dict = shu.model_dump()
     shu_dict["created_at"] = datetime.utcnow()
@@ -280,17 +416,77 @@ async def create_shu_distribution(shu: SHUDistributionCreate, current_user: User
     result = await db.shu_distribution.insert_one(shu_dict)
     shu_dict["_id"] = str(result.inserted_id)
     
+    invalidate("shu_distribution")
     return SHUDistribution(**shu_dict)
 
+@router.post("/transparansi/shu/bulk", response_model=BulkResult)
+async def bulk_shu_distributions(bulk: BulkRequest[SHUDistributionCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete SHU distributions in one request"""
+    result = await run_bulk(db.shu_distribution, bulk)
+    invalidate("shu_distribution")
+    return result
+
+@router.post("/transparansi/shu/members/bulk", response_model=BulkResult)
+async def bulk_shu_members(bulk: BulkRequest[SHUMemberCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete member ledger rows used by the SHU calculation"""
+    return await run_bulk(db.shu_members, bulk)
+
+@router.post("/transparansi/shu/calculate", response_model=SHUSnapshot)
+async def calculate_shu_distribution(calculation: SHUCalculationRequest, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Calculate the year's SHU from its reports and member ledger as a new snapshot version"""
+    try:
+        policy = allocation_policy(
+            calculation.reserve_pct, calculation.member_pct, calculation.village_pct, calculation.capital_service_pct
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        snapshot = await calculate_shu(db, calculation.year, policy, current_user.id, calculation.distribution_date)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    invalidate("shu_distribution")
+    return SHUSnapshot(**serialize_doc(snapshot))
+
+@router.get("/transparansi/shu/snapshots/{snapshot_id}/allocations", response_model=Page)
+async def get_shu_allocations(
+    snapshot_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Get a snapshot's per-member allocations, largest first, one page at a time"""
+    try:
+        query = {"snapshot_id": ObjectId(snapshot_id)}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid snapshot ID")
+    allocations, next_cursor = await paginate(db.shu_allocations, query, "total", limit, after)
+    items = [SHUMemberAllocation(**doc).model_dump() for doc in allocations]
+    return Page(items=items, next_cursor=next_cursor)
+
 # Contact Messages Management
-@router.get("/kontak", response_model=List[ContactMessage])
-async def get_all_messages(current_user: User = Depends(get_current_admin)):
-    """Get all contact messages"""
-    messages = await db.kontak.find().sort("submitted_at", -1).to_list(1000)
-    return [ContactMessage(**serialize_doc(msg)) for msg in messages]
+@router.get("/kontak", response_model=Page)
+async def get_all_messages(
+    status: Optional[MessageStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Get contact messages, newest first, one page at a time"""
+    query = build_query({"status": status}, "submitted_at", date_from, date_to)
+    projection = parse_fields(fields, ContactMessage, "submitted_at")
+    messages, next_cursor = await paginate(db.kontak, query, "submitted_at", limit, after, projection)
+    return Page(items=page_items(messages, ContactMessage, projection), next_cursor=next_cursor)
 
 @router.put("/kontak/{message_id}/reply", response_model=ContactMessage)
-async def reply_to_message(message_id: str, reply: ContactMessageReply, current_user: User = Depends(get_current_admin)):
+async def reply_to_message(message_id: str, reply: ContactMessageReply, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Reply to contact message"""
     try:
         update_dict = {
@@ -299,21 +495,24 @@ async def reply_to_message(message_id: str, reply: ContactMessageReply, current_
             "status": MessageStatus.REPLIED
         }
         
-        result = await db.kontak.update_one(
+        updated_msg = await db.kontak.find_one_and_update(
             {"_id": ObjectId(message_id)},
-            {"$set": update_dict}
+            {"$set": update_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_msg is None:
             raise HTTPException(status_code=404, detail="Message not found")
         
-        updated_msg = await db.kontak.find_one({"_id": ObjectId(message_id)})
+        mark_dashboard_dirty()
         return ContactMessage(**serialize_doc(updated_msg))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/kontak/{message_id}/archive")
-async def archive_message(message_id: str, current_user: User = Depends(get_current_admin)):
+async def archive_message(message_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Archive contact message"""
     try:
         result = await db.kontak.update_one(
@@ -324,19 +523,34 @@ async def archive_message(message_id: str, current_user: User = Depends(get_curr
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Message not found")
         
+        mark_dashboard_dirty()
         return {"message": "Message archived successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Educational Resources Management
-@router.get("/edukasi/all", response_model=List[EducationalResource])
-async def get_all_resources(current_user: User = Depends(get_current_admin)):
-    """Get all educational resources"""
-    resources = await db.edukasi.find().to_list(1000)
-    return [EducationalResource(**serialize_doc(resource)) for resource in resources]
+@router.get("/edukasi/all", response_model=Page)
+async def get_all_resources(
+    type: Optional[ResourceType] = None,
+    is_published: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Get educational resources, newest first, one page at a time"""
+    query = build_query({"type": type, "is_published": is_published}, "created_at", date_from, date_to)
+    projection = parse_fields(fields, EducationalResource, "created_at")
+    resources, next_cursor = await paginate(db.edukasi, query, "created_at", limit, after, projection)
+    return Page(items=page_items(resources, EducationalResource, projection), next_cursor=next_cursor)
 
 @router.post("/edukasi", response_model=EducationalResource)
-async def create_educational_resource(resource: EducationalResourceCreate, current_user: User = Depends(get_current_admin)):
+async def create_educational_resource(resource: EducationalResourceCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create educational resource"""
     resource_dict = resource.model_dump()
     resource_dict["created_at"] = datetime.utcnow()
@@ -345,79 +559,167 @@ async def create_educational_resource(resource: EducationalResourceCreate, curre
     result = await db.edukasi.insert_one(resource_dict)
     resource_dict["_id"] = str(result.inserted_id)
     
+    invalidate("edukasi")
     return EducationalResource(**resource_dict)
 
+@router.post("/edukasi/bulk", response_model=BulkResult)
+async def bulk_educational_resources(bulk: BulkRequest[EducationalResourceCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete educational resources in one request"""
+    result = await run_bulk(db.edukasi, bulk)
+    invalidate("edukasi")
+    return result
+
 @router.put("/edukasi/{resource_id}", response_model=EducationalResource)
-async def update_educational_resource(resource_id: str, resource: EducationalResourceCreate, current_user: User = Depends(get_current_admin)):
+async def update_educational_resource(resource_id: str, resource: EducationalResourceCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Update educational resource"""
     try:
         resource_dict = resource.model_dump()
         resource_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.edukasi.update_one(
+        updated_resource = await db.edukasi.find_one_and_update(
             {"_id": ObjectId(resource_id)},
-            {"$set": resource_dict}
+            {"$set": resource_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_resource is None:
             raise HTTPException(status_code=404, detail="Resource not found")
         
-        updated_resource = await db.edukasi.find_one({"_id": ObjectId(resource_id)})
+        invalidate("edukasi")
         return EducationalResource(**serialize_doc(updated_resource))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/edukasi/{resource_id}")
-async def delete_educational_resource(resource_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_educational_resource(resource_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Delete educational resource"""
     try:
         result = await db.edukasi.delete_one({"_id": ObjectId(resource_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Resource not found")
+        invalidate("edukasi")
         return {"message": "Resource deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Documents Management
 @router.post("/regulasi", response_model=Document)
-async def create_document(document: DocumentCreate, current_user: User = Depends(get_current_admin)):
+async def create_document(document: DocumentCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Create document"""
-    doc_dict = document.model_dump()
+    doc_dict = with_document_metadata(document.model_dump())
     doc_dict["created_at"] = datetime.utcnow()
     doc_dict["updated_at"] = datetime.utcnow()
     
     result = await db.regulasi.insert_one(doc_dict)
     doc_dict["_id"] = str(result.inserted_id)
     
+    invalidate("regulasi")
     return Document(**doc_dict)
 
+@router.post("/regulasi/bulk", response_model=BulkResult)
+async def bulk_documents(bulk: BulkRequest[DocumentCreate], current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
+    """Create, update and delete documents in one request"""
+    result = await run_bulk(db.regulasi, bulk, prepare=with_document_metadata)
+    invalidate("regulasi")
+    return result
+
 @router.put("/regulasi/{document_id}", response_model=Document)
-async def update_document(document_id: str, document: DocumentCreate, current_user: User = Depends(get_current_admin)):
+async def update_document(document_id: str, document: DocumentCreate, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Update document"""
     try:
-        doc_dict = document.model_dump()
+        doc_dict = with_document_metadata(document.model_dump())
         doc_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.regulasi.update_one(
+        updated_doc = await db.regulasi.find_one_and_update(
             {"_id": ObjectId(document_id)},
-            {"$set": doc_dict}
+            {"$set": doc_dict},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated_doc is None:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        updated_doc = await db.regulasi.find_one({"_id": ObjectId(document_id)})
+        invalidate("regulasi")
         return Document(**serialize_doc(updated_doc))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/regulasi/{document_id}")
-async def delete_document(document_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_document(document_id: str, current_user: User = Depends(get_current_admin), db: AsyncIOMotorDatabase = Depends(get_admin_db)):
     """Delete document"""
     try:
         result = await db.regulasi.delete_one({"_id": ObjectId(document_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Document not found")
+        invalidate("regulasi")
         return {"message": "Document deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+# Data Export
+ExportFormat = Query("ndjson", pattern="^(ndjson|csv)$")
+
+def export_response(db: AsyncIOMotorDatabase, collection: str, query: dict, format: str) -> StreamingResponse:
+    """Stream a collection as NDJSON or CSV without loading it into memory"""
+    config = EXPORTS[collection]
+    cursor = db[collection].find(query).sort(config["sort"]).batch_size(EXPORT_BATCH_SIZE)
+    
+    filename = f"{collection}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "csv":
+        body = stream_csv(cursor, export_columns(config["model"]))
+        return StreamingResponse(body, media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(stream_ndjson(cursor), media_type="application/x-ndjson", headers=headers)
+
+@router.get("/export/permodalan")
+async def export_applications(
+    format: str = ExportFormat,
+    status: Optional[ApplicationStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_loan: Optional[int] = Query(None, ge=0),
+    max_loan: Optional[int] = Query(None, ge=0),
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Export capital applications with the same filters as the list endpoint"""
+    query = build_query(
+        {"status": status}, "submitted_at", date_from, date_to,
+        ranges={"loan_amount_idr": (min_loan, max_loan)},
+    )
+    return export_response(db, "permodalan", query, format)
+
+@router.get("/export/kontak")
+async def export_messages(
+    format: str = ExportFormat,
+    status: Optional[MessageStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Export contact messages with the same filters as the list endpoint"""
+    query = build_query({"status": status}, "submitted_at", date_from, date_to)
+    return export_response(db, "kontak", query, format)
+
+@router.get("/export/transparansi")
+async def export_financial_reports(
+    format: str = ExportFormat,
+    status: Optional[AuditStatus] = None,
+    year: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_admin_db)
+):
+    """Export financial reports, filtered by audit status, year and creation date"""
+    query = build_query({"audit_status": status, "year": year}, "created_at", date_from, date_to)
+    return export_response(db, "transparansi", query, format)
@@ -1,19 +1,35 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query
 from models import (
-    UserCreate, UserLogin, Token, User, UserRole,
+    UserCreate, UserLogin, Token, User,
     CapitalApplicationCreate, CapitalApplication,
     ContactMessageCreate, ContactMessage,
-    BusinessUnit, Product, News, FinancialReport, SHUDistribution,
-    EducationalResource, Document
+    BusinessUnit, Product, News, FinancialReport, SHUDistribution, SHUSnapshot, TransparansiAnalytics,
+    EducationalResource, Document, SearchHit, SearchResults,
+    Language, ListView
 )
-from auth import verify_password, get_password_hash, create_access_token
-from dependencies import db
+from auth import verify_password_async, get_password_hash_async, create_access_token
+from dependencies import get_db, get_primary_db, read_db
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from cache import cached_response, list_version, document_version, remember
+from dashboard import mark_dashboard_dirty
+from ratelimit import rate_limit
+from writebehind import write_behind, WRITE_BEHIND_ENABLED
+from search import search_index, SEARCH_SOURCES
+from analytics import transparansi_analytics
+from money import with_money_fields
+from documents import document_response
+from pagination import build_query
+from localization import response_shapes, shape_projection, shape_doc, shape_docs
+from fastjson import FAST_JSON_ENABLED, dump_docs
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from bson import ObjectId
 
 router = APIRouter(prefix="/api", tags=["public"])
 
+# Public content reads may be served by secondaries (PUBLIC_READ_PREFERENCE)
+get_read_db = read_db("public")
+
 # Helper function to convert ObjectId to string
 def serialize_doc(doc):
     if doc and "_id" in doc:
@@ -21,26 +37,28 @@ def serialize_doc(doc):
     return doc
 
 # Authentication Routes
-@router.post("/auth/register", response_model=User)
-async def register(user_data: UserCreate):
+@router.post("/auth/register", response_model=User, dependencies=[Depends(rate_limit("register"))])
+async def register(user_data: UserCreate, db: AsyncIOMotorDatabase = Depends(get_primary_db)):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = await db.users.find_one({"username": user_data.username})
-    if existing_user:
+    # Check if username or email already exists in one round trip
+    existing_user = await db.users.find_one(
+        {"$or": [{"username": user_data.username}, {"email": user_data.email}]},
+        {"username": 1, "email": 1}
+    )
+    if existing_user and existing_user.get("username") == user_data.username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
-    existing_email = await db.users.find_one({"email": user_data.email})
-    if existing_email:
+    if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Create user document
     user_dict = user_data.model_dump(exclude={"password"})
@@ -54,12 +72,12 @@ async def register(user_data: UserCreate):
     
     return User(**user_dict)
 
-@router.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin):
+@router.post("/auth/login", response_model=Token, dependencies=[Depends(rate_limit("login"))])
+async def login(user_credentials: UserLogin, db: AsyncIOMotorDatabase = Depends(get_primary_db)):
     """Login and get access token"""
     user = await db.users.find_one({"username": user_credentials.username})
     
-    if not user or not verify_password(user_credentials.password, user["password"]):
+    if not user or not await verify_password_async(user_credentials.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -81,130 +99,256 @@ async def login(user_credentials: UserLogin):
     return Token(access_token=access_token, user=user_obj)
 
 # Business Units Routes
-@router.get("/unit-usaha", response_model=List[BusinessUnit])
-async def get_business_units():
+@router.get("/unit-usaha", response_model=List[response_shapes(BusinessUnit)])
+async def get_business_units(request: Request, lang: Optional[Language] = None, view: ListView = ListView.FULL, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get all active business units"""
-    units = await db.unit_usaha.find({"status": "active"}).to_list(100)
-    return [BusinessUnit(**serialize_doc(unit)) for unit in units]
+    projection = shape_projection("unit_usaha", lang, view)
+    async def load():
+        units = await db.unit_usaha.find({"status": "active"}, projection).to_list(100)
+        return shape_docs(units, BusinessUnit, "unit_usaha", lang, view)
+    return await cached_response(request, "unit_usaha", load, list_version(db.unit_usaha, {"status": "active"}))
 
-@router.get("/unit-usaha/{unit_id}", response_model=BusinessUnit)
-async def get_business_unit(unit_id: str):
+@router.get("/unit-usaha/{unit_id}", response_model=response_shapes(BusinessUnit))
+async def get_business_unit(unit_id: str, request: Request, lang: Optional[Language] = None, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get single business unit"""
     try:
-        unit = await db.unit_usaha.find_one({"_id": ObjectId(unit_id)})
-        if not unit:
-            raise HTTPException(status_code=404, detail="Business unit not found")
-        return BusinessUnit(**serialize_doc(unit))
+        query = {"_id": ObjectId(unit_id)}
+        projection = shape_projection("unit_usaha", lang)
+        async def load():
+            unit = await db.unit_usaha.find_one(query, projection)
+            if not unit:
+                raise HTTPException(status_code=404, detail="Business unit not found")
+            return shape_doc(unit, BusinessUnit, "unit_usaha", lang)
+        return await cached_response(request, "unit_usaha", load, document_version(db.unit_usaha, query))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid unit ID")
 
 # Products Routes
-@router.get("/produk", response_model=List[Product])
-async def get_products():
-    """Get all products"""
-    products = await db.produk.find().to_list(100)
-    return [Product(**serialize_doc(product)) for product in products]
-
-@router.get("/produk/{product_id}", response_model=Product)
-async def get_product(product_id: str):
+@router.get("/produk", response_model=List[response_shapes(Product)])
+async def get_products(
+    request: Request,
+    lang: Optional[Language] = None,
+    view: ListView = ListView.FULL,
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    db: AsyncIOMotorDatabase = Depends(get_read_db)
+):
+    """Get all products, optionally within a price band (whole rupiah), cheapest first when filtered"""
+    projection = shape_projection("produk", lang, view)
+    query = build_query(ranges={"price_idr": (min_price, max_price)})
+    async def load():
+        cursor = db.produk.find(query, projection)
+        if query:
+            cursor = cursor.sort("price_idr", 1)
+        products = await cursor.to_list(100)
+        return shape_docs(products, Product, "produk", lang, view)
+    return await cached_response(request, "produk", load, list_version(db.produk, query))
+
+@router.get("/produk/{product_id}", response_model=response_shapes(Product))
+async def get_product(product_id: str, request: Request, lang: Optional[Language] = None, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get single product"""
     try:
-        product = await db.produk.find_one({"_id": ObjectId(product_id)})
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-        return Product(**serialize_doc(product))
+        query = {"_id": ObjectId(product_id)}
+        projection = shape_projection("produk", lang)
+        async def load():
+            product = await db.produk.find_one(query, projection)
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+            return shape_doc(product, Product, "produk", lang)
+        return await cached_response(request, "produk", load, document_version(db.produk, query))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
 # Capital Application Routes
-@router.post("/permodalan/apply", response_model=CapitalApplication)
-async def submit_capital_application(application: CapitalApplicationCreate):
+@router.post("/permodalan/apply", response_model=CapitalApplication, dependencies=[Depends(rate_limit("permodalan"))])
+async def submit_capital_application(application: CapitalApplicationCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     """Submit capital application"""
-    app_dict = application.model_dump()
+    app_dict = with_money_fields("permodalan", application.model_dump())
     app_dict["status"] = "pending"
     app_dict["submitted_at"] = datetime.utcnow()
     
+    if WRITE_BEHIND_ENABLED:
+        app_dict["_id"] = str(await write_behind.enqueue("permodalan", app_dict))
+        return CapitalApplication(**app_dict)
+    
     result = await db.permodalan.insert_one(app_dict)
     app_dict["_id"] = str(result.inserted_id)
     
+    mark_dashboard_dirty()
     return CapitalApplication(**app_dict)
 
 @router.get("/permodalan/status/{application_id}", response_model=CapitalApplication)
-async def get_application_status(application_id: str):
+async def get_application_status(application_id: str, db: AsyncIOMotorDatabase = Depends(get_primary_db)):
     """Check application status"""
     try:
-        app = await db.permodalan.find_one({"_id": ObjectId(application_id)})
+        app_id = ObjectId(application_id)
+        app = write_behind.pending_document("permodalan", app_id) or await db.permodalan.find_one({"_id": app_id})
         if not app:
             raise HTTPException(status_code=404, detail="Application not found")
         return CapitalApplication(**serialize_doc(app))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid application ID")
 
 # News Routes
-@router.get("/berita", response_model=List[News])
-async def get_news():
+@router.get("/berita", response_model=List[response_shapes(News)])
+async def get_news(request: Request, lang: Optional[Language] = None, view: ListView = ListView.FULL, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get all published news"""
-    news_list = await db.berita.find({"is_published": True}).sort("published_at", -1).to_list(100)
-    return [News(**serialize_doc(news)) for news in news_list]
+    projection = shape_projection("berita", lang, view)
+    async def load():
+        news_list = await db.berita.find({"is_published": True}, projection).sort("published_at", -1).to_list(100)
+        return shape_docs(news_list, News, "berita", lang, view)
+    return await cached_response(request, "berita", load, list_version(db.berita, {"is_published": True}))
 
-@router.get("/berita/{news_id}", response_model=News)
-async def get_news_article(news_id: str):
+@router.get("/berita/{news_id}", response_model=response_shapes(News))
+async def get_news_article(news_id: str, request: Request, lang: Optional[Language] = None, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get single news article"""
     try:
-        news = await db.berita.find_one({"_id": ObjectId(news_id), "is_published": True})
-        if not news:
-            raise HTTPException(status_code=404, detail="News article not found")
-        return News(**serialize_doc(news))
+        query = {"_id": ObjectId(news_id), "is_published": True}
+        projection = shape_projection("berita", lang)
+        async def load():
+            news = await db.berita.find_one(query, projection)
+            if not news:
+                raise HTTPException(status_code=404, detail="News article not found")
+            return shape_doc(news, News, "berita", lang)
+        return await cached_response(request, "berita", load, document_version(db.berita, query))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid news ID")
 
 # Financial Reports Routes
 @router.get("/transparansi/reports", response_model=List[FinancialReport])
-async def get_financial_reports():
+async def get_financial_reports(request: Request, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get all financial reports"""
-    reports = await db.transparansi.find().sort("year", -1).sort("quarter", -1).to_list(100)
-    return [FinancialReport(**serialize_doc(report)) for report in reports]
+    async def load():
+        reports = await db.transparansi.find().sort("year", -1).sort("quarter", -1).to_list(100)
+        if FAST_JSON_ENABLED:
+            return dump_docs(reports, FinancialReport)
+        return [FinancialReport(**serialize_doc(report)) for report in reports]
+    return await cached_response(request, "transparansi", load, list_version(db.transparansi))
+
+@router.get("/transparansi/analytics", response_model=TransparansiAnalytics)
+async def get_financial_analytics(request: Request, db: AsyncIOMotorDatabase = Depends(get_read_db)):
+    """Get quarterly trends, rolling four-quarter totals and per-year figures"""
+    version = remember(list_version(db.transparansi))
+    async def load():
+        return await transparansi_analytics(db, await version())
+    return await cached_response(request, "transparansi", load, version)
 
 @router.get("/transparansi/shu", response_model=List[SHUDistribution])
-async def get_shu_distribution():
+async def get_shu_distribution(request: Request, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get SHU distribution data"""
-    shu_list = await db.shu_distribution.find().sort("year", -1).to_list(100)
-    return [SHUDistribution(**serialize_doc(shu)) for shu in shu_list]
+    async def load():
+        shu_list = await db.shu_distribution.find().sort("year", -1).to_list(100)
+        if FAST_JSON_ENABLED:
+            return dump_docs(shu_list, SHUDistribution)
+        return [SHUDistribution(**serialize_doc(shu)) for shu in shu_list]
+    return await cached_response(request, "shu_distribution", load, list_version(db.shu_distribution))
+
+@router.get("/transparansi/shu/{year}", response_model=SHUSnapshot)
+async def get_shu_snapshot(year: int, request: Request, db: AsyncIOMotorDatabase = Depends(get_read_db)):
+    """Get the year's current SHU calculation"""
+    query = {"year": year, "is_current": True}
+    async def load():
+        snapshot = await db.shu_snapshots.find_one(query, sort=[("version", -1)])
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="SHU calculation not found")
+        return SHUSnapshot(**serialize_doc(snapshot))
+    return await cached_response(request, "shu_distribution", load, document_version(db.shu_snapshots, query))
 
 # Contact Routes
-@router.post("/kontak/send", response_model=ContactMessage)
-async def send_contact_message(message: ContactMessageCreate):
+@router.post("/kontak/send", response_model=ContactMessage, dependencies=[Depends(rate_limit("kontak"))])
+async def send_contact_message(message: ContactMessageCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     """Send contact message"""
     msg_dict = message.model_dump()
     msg_dict["status"] = "new"
     msg_dict["submitted_at"] = datetime.utcnow()
     
+    if WRITE_BEHIND_ENABLED:
+        msg_dict["_id"] = str(await write_behind.enqueue("kontak", msg_dict))
+        return ContactMessage(**msg_dict)
+    
     result = await db.kontak.insert_one(msg_dict)
     msg_dict["_id"] = str(result.inserted_id)
     
+    mark_dashboard_dirty()
     return ContactMessage(**msg_dict)
 
 # Educational Resources Routes
-@router.get("/edukasi", response_model=List[EducationalResource])
-async def get_educational_resources():
+@router.get("/edukasi", response_model=List[response_shapes(EducationalResource)])
+async def get_educational_resources(request: Request, lang: Optional[Language] = None, view: ListView = ListView.FULL, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get all published educational resources"""
-    resources = await db.edukasi.find({"is_published": True}).to_list(100)
-    return [EducationalResource(**serialize_doc(resource)) for resource in resources]
+    projection = shape_projection("edukasi", lang, view)
+    async def load():
+        resources = await db.edukasi.find({"is_published": True}, projection).to_list(100)
+        return shape_docs(resources, EducationalResource, "edukasi", lang, view)
+    return await cached_response(request, "edukasi", load, list_version(db.edukasi, {"is_published": True}))
 
-@router.get("/edukasi/{resource_id}", response_model=EducationalResource)
-async def get_educational_resource(resource_id: str):
+@router.get("/edukasi/{resource_id}", response_model=response_shapes(EducationalResource))
+async def get_educational_resource(resource_id: str, request: Request, lang: Optional[Language] = None, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get single educational resource"""
     try:
-        resource = await db.edukasi.find_one({"_id": ObjectId(resource_id), "is_published": True})
-        if not resource:
-            raise HTTPException(status_code=404, detail="Resource not found")
-        return EducationalResource(**serialize_doc(resource))
+        query = {"_id": ObjectId(resource_id), "is_published": True}
+        projection = shape_projection("edukasi", lang)
+        async def load():
+            resource = await db.edukasi.find_one(query, projection)
+            if not resource:
+                raise HTTPException(status_code=404, detail="Resource not found")
+            return shape_doc(resource, EducationalResource, "edukasi", lang)
+        return await cached_response(request, "edukasi", load, document_version(db.edukasi, query))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid resource ID")
 
 # Documents Routes
-@router.get("/regulasi", response_model=List[Document])
-async def get_documents():
+@router.get("/regulasi", response_model=List[response_shapes(Document)])
+async def get_documents(request: Request, lang: Optional[Language] = None, view: ListView = ListView.FULL, db: AsyncIOMotorDatabase = Depends(get_read_db)):
     """Get all documents"""
-    documents = await db.regulasi.find().sort("year", -1).to_list(100)
-    return [Document(**serialize_doc(doc)) for doc in documents]
\ No newline at end of file
+    projection = shape_projection("regulasi", lang, view)
+    async def load():
+        documents = await db.regulasi.find({}, projection).sort("year", -1).to_list(100)
+        return shape_docs(documents, Document, "regulasi", lang, view)
+    return await cached_response(request, "regulasi", load, list_version(db.regulasi))
+
+@router.api_route("/dokumen/{digest}.pdf", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_document_file(digest: str, request: Request):
+    """Serve a stored PDF; byte ranges let viewers load it page by page and resume downloads"""
+    return document_response(digest, request.headers, head=request.method == "HEAD")
+
+# Search Routes
+@router.get("/search", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    lang: Optional[Language] = None,
+    collections: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncIOMotorDatabase = Depends(get_read_db)
+):
+    """Search published news, products, education and regulation documents"""
+    selected = [c.strip() for c in collections.split(",")] if collections else None
+    if selected and any(c not in SEARCH_SOURCES for c in selected):
+        raise HTTPException(status_code=400, detail="Unknown collection")
+    
+    await search_index.refresh(db)
+    lang_code = lang.value if lang else None
+    ranked = search_index.search(q, lang_code, selected)
+    start = (page - 1) * limit
+    hits = [
+        SearchHit(
+            collection=key[0],
+            id=key[1],
+            title=search_index.title(key),
+            score=round(score, 4),
+            highlight=search_index.hit_highlight(key, terms, lang_code),
+        )
+        for key, score, terms in ranked[start:start + limit]
+    ]
+    return SearchResults(query=q, total=len(ranked), page=page, limit=limit, hits=hits)
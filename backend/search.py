@@ -0,0 +1,163 @@
+"""
+In-process inverted index over the bilingual public content
+"""
+import asyncio
+import html
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from cache import on_invalidate
+
+LANGUAGES = ("id", "en")
+
+# Searchable collections: filter for public visibility and weighted BilingualText fields
+SEARCH_SOURCES = {
+    "berita": {"filter": {"is_published": True}, "fields": {"title": 3.0, "excerpt": 2.0, "content": 1.0}},
+    "produk": {"filter": {}, "fields": {"name": 3.0, "description": 1.5}},
+    "edukasi": {"filter": {"is_published": True}, "fields": {"title": 3.0, "description": 2.0, "content": 1.0}},
+    "regulasi": {"filter": {}, "fields": {"title": 3.0, "description": 1.5}},
+}
+
+# Per-language weight multipliers, Indonesian content is the primary source
+LANGUAGE_WEIGHTS = {"id": 1.0, "en": 0.9}
+
+STOPWORDS = {
+    "id": {"dan", "yang", "di", "ke", "dari", "untuk", "dengan", "ini", "itu", "dalam", "pada", "atau", "oleh", "para", "akan"},
+    "en": {"the", "and", "of", "to", "in", "for", "a", "an", "on", "with", "by", "is", "are", "from", "at"},
+}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+DocKey = Tuple[str, str]
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def tokenize(text: str, lang: Optional[str] = None) -> List[str]:
+    stopwords = STOPWORDS.get(lang, set()) if lang else STOPWORDS["id"] | STOPWORDS["en"]
+    return [t for t in TOKEN_RE.findall(normalize(text)) if len(t) > 1 and t not in stopwords]
+
+def highlight(text: str, terms: Set[str], width: int = 160) -> str:
+    """Return an HTML-escaped snippet around the first matching term with matches wrapped in <mark>"""
+    matches = [m for m in TOKEN_RE.finditer(text) if normalize(m.group()) in terms]
+    if not matches:
+        return html.escape(text[:width])
+    start = max(0, matches[0].start() - width // 4)
+    end = min(len(text), start + width)
+    snippet, offset = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        snippet.append(html.escape(text[offset:m.start()]))
+        snippet.append(f"<mark>{html.escape(m.group())}</mark>")
+        offset = m.end()
+    snippet.append(html.escape(text[offset:end]))
+    return ("…" if start > 0 else "") + "".join(snippet) + ("…" if end < len(text) else "")
+
+class SearchIndex:
+    """Weighted term postings per language, rebuilt per collection after writes"""
+
+    def __init__(self):
+        # postings[lang][term][doc_key] = weighted term frequency
+        self.postings: Dict[str, Dict[str, Dict[DocKey, float]]] = {lang: defaultdict(dict) for lang in LANGUAGES}
+        self.documents: Dict[DocKey, dict] = {}
+        self._doc_terms: Dict[DocKey, Dict[str, Set[str]]] = {}
+        self._stale: Set[str] = set(SEARCH_SOURCES)
+        self._lock = asyncio.Lock()
+
+    def mark_stale(self, *collections: str) -> None:
+        self._stale.update(c for c in collections if c in SEARCH_SOURCES)
+
+    def _remove(self, key: DocKey) -> None:
+        for lang, terms in self._doc_terms.pop(key, {}).items():
+            for term in terms:
+                postings = self.postings[lang].get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self.postings[lang][term]
+        self.documents.pop(key, None)
+
+    def add(self, collection: str, doc: dict) -> None:
+        key = (collection, str(doc["_id"]))
+        self._remove(key)
+        terms_by_lang: Dict[str, Set[str]] = {lang: set() for lang in LANGUAGES}
+        for field, weight in SEARCH_SOURCES[collection]["fields"].items():
+            value = doc.get(field) or {}
+            for lang in LANGUAGES:
+                for token in tokenize(value.get(lang, ""), lang):
+                    postings = self.postings[lang][token]
+                    postings[key] = postings.get(key, 0.0) + weight * LANGUAGE_WEIGHTS[lang]
+                    terms_by_lang[lang].add(token)
+        self._doc_terms[key] = terms_by_lang
+        self.documents[key] = doc
+
+    async def _reload(self, db, collection: str) -> None:
+        for key in [k for k in self.documents if k[0] == collection]:
+            self._remove(key)
+        source = SEARCH_SOURCES[collection]
+        projection = {field: 1 for field in source["fields"]}
+        async for doc in db[collection].find(source["filter"], projection):
+            self.add(collection, doc)
+
+    async def refresh(self, db) -> None:
+        """Reload every collection invalidated since the last search"""
+        if not self._stale and not self._lock.locked():
+            return
+        async with self._lock:
+            while self._stale:
+                # Popped first so an invalidation during the reload marks it stale again
+                collection = self._stale.pop()
+                try:
+                    await self._reload(db, collection)
+                except BaseException:
+                    self._stale.add(collection)
+                    raise
+
+    def search(
+        self,
+        query: str,
+        lang: Optional[str] = None,
+        collections: Optional[List[str]] = None,
+    ) -> List[Tuple[DocKey, float, Set[str]]]:
+        """Rank documents by summed tf-idf over the query terms"""
+        languages = [lang] if lang in LANGUAGES else list(LANGUAGES)
+        total = max(1, len(self.documents))
+        scores: Dict[DocKey, float] = defaultdict(float)
+        matched: Dict[DocKey, Set[str]] = defaultdict(set)
+        for term in set(tokenize(query)):
+            for language in languages:
+                postings = self.postings[language].get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for key, weight in postings.items():
+                    if collections and key[0] not in collections:
+                        continue
+                    scores[key] += weight * idf
+                    matched[key].add(term)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [(key, score, matched[key]) for key, score in ranked]
+
+    def hit_highlight(self, key: DocKey, terms: Set[str], lang: Optional[str] = None) -> str:
+        """Snippet from the highest-weighted field that contains a matching term"""
+        doc = self.documents[key]
+        fields = sorted(SEARCH_SOURCES[key[0]]["fields"].items(), key=lambda item: item[1], reverse=True)
+        languages = [lang] if lang in LANGUAGES else list(LANGUAGES)
+        for field, _ in fields:
+            for language in languages:
+                text = (doc.get(field) or {}).get(language, "")
+                if any(token in terms for token in tokenize(text, language)):
+                    return highlight(text, terms)
+        return ""
+
+    def title(self, key: DocKey) -> dict:
+        doc = self.documents[key]
+        return doc.get("title") or doc.get("name") or {"id": "", "en": ""}
+
+search_index = SearchIndex()
+on_invalidate(search_index.mark_stale)
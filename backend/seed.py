@@ -2,8 +2,6 @@
 Seed script to populate database with initial data
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-from auth import get_password_hash
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -12,9 +10,13 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+from auth import get_password_hash
+from database import create_client
+from indexes import ensure_indexes, explain_queries
+from money import migrate_money_fields
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = create_client()
 db = client[os.environ['DB_NAME']]
 
 async def seed_database():
@@ -305,6 +307,21 @@ async def seed_database():
     else:
         print(f"⚠️  {news_count} news articles already exist")
     
+    # Integer rupiah fields for seeded price/revenue strings
+    for collection, counts in (await migrate_money_fields(db)).items():
+        print(f"✅ {collection}: {counts['updated']} money fields set, {counts['unparsed']} unparsed")
+    
+    # Ensure indexes and report which probe queries use them
+    print("\nEnsuring indexes...")
+    for entry in await ensure_indexes(db):
+        if entry["error"]:
+            print(f"❌ {entry['collection']}: {entry['error']}")
+        else:
+            print(f"✅ {entry['collection']}: {', '.join(entry['indexes'])} ({entry['seconds']:.4f}s)")
+    for probe in await explain_queries(db):
+        marker = "✅ IXSCAN" if probe["uses_index"] else "⚠️  COLLSCAN"
+        print(f"{marker} {probe['collection']} {probe['query']} sort={probe['sort']}")
+    
     print("\n✅ Database seeding completed successfully!")
     print("\n📝 Admin credentials:")
     print("   Username: admin")
@@ -1,38 +1,96 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
 from pathlib import Path
-import dependencies
+
+# Load .env before importing modules that read their settings at import time
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from database import create_client, routed_databases
+from indexes import ensure_indexes
+from dashboard import dashboard_refresher, DASHBOARD_SNAPSHOT_ENABLED
+from auth import password_hash_pool
+from ratelimit import rate_limiter
+from writebehind import write_behind, WRITE_BEHIND_ENABLED
+from changefeed import change_feed, CACHE_INVALIDATION_FEED
+from media import ImmutableStaticFiles, IMAGE_MAX_UPLOAD_BYTES, IMAGE_ROOT, IMAGE_URL_PREFIX, UploadLimitMiddleware, image_pool
+from documents import DOCUMENT_MAX_UPLOAD_BYTES
+from compression import CompressionMiddleware, compression_stats
+from cache import response_cache
+from metrics import (
+    MetricsMiddleware, Gauge, mongo_command_listener, register_stats, registry
+)
+from querybudget import QueryBudgetMiddleware, QUERY_BUDGET_ENABLED, record_command
 
 # Import routes
 from routes_public import router as public_router
 from routes_admin import router as admin_router
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+logger = logging.getLogger(__name__)
 
-# Set database in dependencies
-dependencies.set_db(db)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the MongoDB client, warm it up and run background tasks for the app's lifetime"""
+    client = create_client()
+    db = client[os.environ['DB_NAME']]
+    # Warm-up ping: establishes the first pooled connection before traffic arrives
+    await client.admin.command("ping")
+    app.state.client = client
+    app.state.db = db
+    app.state.read_dbs = routed_databases(db)
+    
+    await ensure_indexes(db)
+    
+    background_tasks = []
+    if DASHBOARD_SNAPSHOT_ENABLED:
+        background_tasks.append(asyncio.create_task(dashboard_refresher(db)))
+    if CACHE_INVALIDATION_FEED != "off":
+        background_tasks.append(asyncio.create_task(change_feed.run(db)))
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.start(db)
+    
+    try:
+        yield
+    finally:
+        if WRITE_BEHIND_ENABLED:
+            await write_behind.stop()
+        for task in background_tasks:
+            task.cancel()
+        password_hash_pool.shutdown()
+        image_pool.shutdown()
+        await rate_limiter.close()
+        client.close()
 
 # Create the main app
 app = FastAPI(
     title="BUMDes Desa Sale API",
     description="API for BUMDes Desa Sale Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Include routers
 app.include_router(public_router)
 app.include_router(admin_router)
 
+# Uploaded images, content-addressed and cacheable forever; the rest of MEDIA_ROOT (upload scratch, PDFs) stays private
+app.mount(IMAGE_URL_PREFIX, ImmutableStaticFiles(directory=IMAGE_ROOT, check_dir=False), name="media")
+
+# Oversized uploads are refused before FastAPI parses and spools the multipart body
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/api/admin/media/images": IMAGE_MAX_UPLOAD_BYTES,
+    "/api/admin/media/documents": DOCUMENT_MAX_UPLOAD_BYTES,
+})
+
+# Compression middleware (cached public responses arrive precompressed)
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -42,12 +100,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request Mongo query budget (development and production toggle)
+if QUERY_BUDGET_ENABLED:
+    mongo_command_listener.on_command(record_command)
+    app.add_middleware(QueryBudgetMiddleware)
+
+# Metrics middleware (outermost, so it times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
 
 @app.get("/")
 async def root():
@@ -57,6 +122,21 @@ async def root():
         "status": "running"
     }
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Metrics
+register_stats("response_cache", "Public response cache entries, hits and misses", response_cache.stats)
+register_stats("password_hash_pool", "bcrypt worker pool queue depth and timings", password_hash_pool.stats)
+register_stats("cache_invalidation_feed", "Change stream / polling cache invalidation events and resumes", change_feed.stats)
+register_stats("image_pool", "Image resize worker pool queue depth and timings", image_pool.stats)
+register_stats("write_behind", "Write-behind queue depth, flushes and backpressure", write_behind.stats)
+registry.register(Gauge(
+    "compression_route", "Compression bytes and CPU time per route",
+    lambda: {
+        (("route", route), ("stat", stat)): float(value)
+        for route, stats in compression_stats.snapshot().items()
+        for stat, value in stats.items()
+    },
+))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
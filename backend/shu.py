@@ -0,0 +1,206 @@
+"""
+SHU (Sisa Hasil Usaha) calculation: split a year's profit and allocate the member share over the ledger
+"""
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+# Default split of the year's profit, in percent; must add up to 100
+SHU_RESERVE_PCT = float(os.environ.get("SHU_RESERVE_PCT", "20"))
+SHU_MEMBER_PCT = float(os.environ.get("SHU_MEMBER_PCT", "40"))
+SHU_VILLAGE_PCT = float(os.environ.get("SHU_VILLAGE_PCT", "40"))
+# Part of the member share paid on capital (jasa modal); the rest follows transactions (jasa usaha)
+SHU_CAPITAL_SERVICE_PCT = float(os.environ.get("SHU_CAPITAL_SERVICE_PCT", "40"))
+
+ALLOCATION_INSERT_BATCH = 1000
+SNAPSHOT_INSERT_ATTEMPTS = 5
+
+def allocation_policy(
+    reserve_pct: Optional[float] = None,
+    member_pct: Optional[float] = None,
+    village_pct: Optional[float] = None,
+    capital_service_pct: Optional[float] = None,
+) -> Dict[str, float]:
+    """Fill unset percentages from the defaults and validate the split"""
+    policy = {
+        "reserve_pct": SHU_RESERVE_PCT if reserve_pct is None else reserve_pct,
+        "member_pct": SHU_MEMBER_PCT if member_pct is None else member_pct,
+        "village_pct": SHU_VILLAGE_PCT if village_pct is None else village_pct,
+        "capital_service_pct": SHU_CAPITAL_SERVICE_PCT if capital_service_pct is None else capital_service_pct,
+    }
+    if any(not 0 <= value <= 100 for value in policy.values()):
+        raise ValueError("Allocation percentages must be between 0 and 100")
+    if abs(policy["reserve_pct"] + policy["member_pct"] + policy["village_pct"] - 100) > 1e-9:
+        raise ValueError("reserve_pct, member_pct and village_pct must add up to 100")
+    return policy
+
+def apportion(total: int, weights: np.ndarray) -> np.ndarray:
+    """Split `total` whole rupiah proportionally to `weights`, summing exactly to `total`
+
+    Shares are floored and the leftover rupiah go to the largest remainders.
+    """
+    weight_sum = weights.sum()
+    if total <= 0 or weight_sum <= 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    exact = weights * (total / weight_sum)
+    shares = np.floor(exact).astype(np.int64)
+    leftover = int(total - shares.sum())
+    if leftover:
+        shares[np.argsort(shares - exact, kind="stable")[:leftover]] += 1
+    return shares
+
+def compute_shu(profit: float, members: List[dict], policy: Dict[str, float]) -> dict:
+    """Split the profit and allocate the member share per member with vectorized arithmetic
+
+    `members` are ledger rows with `capital` and `transactions`; returns the
+    summary figures and one allocation row per member, in whole rupiah.
+    Reserve, member and village amounts always add up to the distributable
+    profit; raises ValueError when a member share has nobody to go to.
+    """
+    distributable = max(int(round(profit)), 0)
+    reserve, member, village = apportion(distributable, np.array([
+        policy["reserve_pct"], policy["member_pct"], policy["village_pct"],
+    ]))
+    capital = np.fromiter((m.get("capital") or 0 for m in members), dtype=np.float64, count=len(members))
+    transactions = np.fromiter((m.get("transactions") or 0 for m in members), dtype=np.float64, count=len(members))
+    has_capital, has_transactions = capital.sum() > 0, transactions.sum() > 0
+    if member and not has_capital and not has_transactions:
+        raise ValueError("The member ledger has no capital or transactions to allocate the member share over")
+    if not has_capital:
+        # A basis nobody holds cannot carry its part, so the other takes the whole member share
+        capital_service, transaction_service = 0, int(member)
+    elif not has_transactions:
+        capital_service, transaction_service = int(member), 0
+    else:
+        capital_service, transaction_service = apportion(int(member), np.array([
+            policy["capital_service_pct"], 100 - policy["capital_service_pct"],
+        ]))
+    capital_shares = apportion(int(capital_service), capital)
+    transaction_shares = apportion(int(transaction_service), transactions)
+    totals = capital_shares + transaction_shares
+
+    allocations = [
+        {
+            "member_id": m["member_id"],
+            "name": m.get("name"),
+            "capital": float(capital[i]),
+            "transactions": float(transactions[i]),
+            "capital_service": int(capital_shares[i]),
+            "transaction_service": int(transaction_shares[i]),
+            "total": int(totals[i]),
+        }
+        for i, m in enumerate(members)
+    ]
+    return {
+        "profit": float(profit),
+        **policy,
+        "reserve_amount": int(reserve),
+        "member_amount": int(totals.sum()),
+        "village_amount": int(village),
+        "capital_service_amount": int(capital_shares.sum()),
+        "transaction_service_amount": int(transaction_shares.sum()),
+        "member_count": len(members),
+        "per_member": float(totals.mean()) if len(members) else 0.0,
+        "allocations": allocations,
+    }
+
+async def year_profit(db, year: int) -> Optional[float]:
+    result = await db.transparansi.aggregate([
+        {"$match": {"year": year}},
+        {"$group": {"_id": None, "profit": {"$sum": "$profit"}, "reports": {"$sum": 1}}},
+    ]).to_list(1)
+    return result[0]["profit"] if result and result[0]["reports"] else None
+
+async def _insert_next_version(db, snapshot: dict) -> ObjectId:
+    """Insert `snapshot` as the year's next version, retrying when a concurrent calculation takes it"""
+    for _ in range(SNAPSHOT_INSERT_ATTEMPTS):
+        latest = await db.shu_snapshots.find_one({"year": snapshot["year"]}, {"version": 1}, sort=[("version", -1)])
+        snapshot["version"] = (latest["version"] + 1) if latest else 1
+        snapshot.pop("_id", None)
+        try:
+            return (await db.shu_snapshots.insert_one(snapshot)).inserted_id
+        except DuplicateKeyError:
+            continue
+    raise RuntimeError(f"Could not allocate an SHU snapshot version for {snapshot['year']}")
+
+async def calculate_shu(db, year: int, policy: Dict[str, float], calculated_by: str,
+                        distribution_date: Optional[datetime] = None) -> dict:
+    """Compute the year's SHU and store it as the next snapshot version
+
+    The snapshot is written as not current, its per-member rows go to
+    shu_allocations, and only then is it made the year's current one; the
+    public shu_distribution row is upserted last.
+    Raises LookupError when the year has no financial reports and
+    ValueError when its member ledger cannot take the member share.
+    """
+    profit = await year_profit(db, year)
+    if profit is None:
+        raise LookupError(f"No financial reports for {year}")
+    members = await db.shu_members.find(
+        {"year": year}, {"_id": 0, "member_id": 1, "name": 1, "capital": 1, "transactions": 1}
+    ).sort("member_id", 1).to_list(None)
+    result = compute_shu(profit, members, policy)
+    allocations = result.pop("allocations")
+
+    now = datetime.utcnow()
+    snapshot = {
+        "year": year,
+        **result,
+        "is_current": False,
+        "calculated_by": calculated_by,
+        "calculated_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    snapshot_id = await _insert_next_version(db, snapshot)
+    try:
+        for i in range(0, len(allocations), ALLOCATION_INSERT_BATCH):
+            await db.shu_allocations.insert_many([
+                {**row, "snapshot_id": snapshot_id, "year": year}
+                for row in allocations[i:i + ALLOCATION_INSERT_BATCH]
+            ], ordered=False)
+    except PyMongoError:
+        # The snapshot never became current; drop it and its partial allocations
+        await db.shu_allocations.delete_many({"snapshot_id": snapshot_id})
+        await db.shu_snapshots.delete_one({"_id": snapshot_id})
+        raise
+
+    # Make the complete snapshot current, then retire older ones. Readers take the highest
+    # current version, so the brief overlap between the two writes is harmless.
+    await db.shu_snapshots.bulk_write([
+        UpdateOne({"_id": snapshot_id}, {"$set": {"is_current": True, "updated_at": now}}),
+        UpdateMany(
+            {"year": year, "is_current": True, "version": {"$lt": snapshot["version"]}},
+            {"$set": {"is_current": False, "updated_at": now}},
+        ),
+    ], ordered=True)
+    snapshot["_id"] = snapshot_id
+    newer = await db.shu_snapshots.find_one(
+        {"year": year, "is_current": True, "version": {"$gt": snapshot["version"]}}, {"_id": 1}
+    )
+    if newer is not None:
+        # A concurrent calculation finished with a later version; it stays current
+        await db.shu_snapshots.update_one({"_id": snapshot_id}, {"$set": {"is_current": False}})
+        return snapshot
+    snapshot["is_current"] = True
+
+    await db.shu_distribution.update_one(
+        {"year": year},
+        {
+            "$set": {
+                "total_amount": float(result["member_amount"]),
+                "member_count": result["member_count"],
+                "per_member": result["per_member"],
+                "distribution_date": distribution_date or now,
+                "updated_at": now,
+            },
+            "$setOnInsert": {"created_at": now},
+        },
+        upsert=True,
+    )
+    return snapshot
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import analytics
+from analytics import compute_transparansi_analytics, transparansi_analytics
+
+def report(year, quarter, income, expense, updated_at=None):
+    return {
+        "period": f"Q{quarter} {year}", "year": year, "quarter": quarter,
+        "income": income, "expense": expense, "profit": income - expense, "updated_at": updated_at,
+    }
+
+def by_period(rows):
+    return {(row["year"], row["quarter"]): row for row in rows}
+
+def test_empty_reports():
+    assert compute_transparansi_analytics([]) == {"quarters": [], "years": []}
+
+def test_rolling_totals_and_year_over_year():
+    reports = [report(2023, q, 100.0, 60.0) for q in range(1, 5)] + [report(2024, 1, 150.0, 90.0)]
+    result = compute_transparansi_analytics(reports)
+    quarters = by_period(result["quarters"])
+
+    assert quarters[(2023, 3)]["rolling_income"] is None
+    assert quarters[(2023, 4)]["rolling_income"] == 400.0
+    assert quarters[(2024, 1)]["rolling_income"] == 450.0
+    assert quarters[(2024, 1)]["income_yoy"] == pytest.approx(0.5)
+    assert quarters[(2023, 4)]["income_yoy"] is None
+    assert quarters[(2023, 1)]["margin"] == pytest.approx(0.4)
+
+def test_missing_quarter_nulls_rolling_figures_and_yearly_growth():
+    # Q3 2023 was never reported
+    reports = [report(2023, q, 100.0, 50.0) for q in (1, 2, 4)] + [report(2024, q, 200.0, 100.0) for q in range(1, 5)]
+    result = compute_transparansi_analytics(reports)
+    quarters = by_period(result["quarters"])
+
+    assert (2023, 3) not in quarters
+    # Every window containing the gap is incomplete
+    assert quarters[(2023, 4)]["rolling_profit"] is None
+    assert quarters[(2024, 2)]["rolling_profit"] is None
+    assert quarters[(2024, 3)]["rolling_profit"] == 350.0  # 2023 Q4 + 2024 Q1-Q3
+    assert quarters[(2024, 4)]["rolling_profit"] == 400.0
+
+    years = {row["year"]: row for row in result["years"]}
+    assert years[2023]["quarters"] == 3
+    assert years[2023]["income"] == 300.0
+    # Growth is only reported between complete years
+    assert years[2024]["income_yoy"] is None
+
+def test_zero_income_gives_no_margin_and_duplicates_keep_latest():
+    reports = [report(2024, 1, 0.0, 10.0), report(2024, 2, 50.0, 10.0), report(2024, 2, 80.0, 20.0)]
+    quarters = by_period(compute_transparansi_analytics(reports)["quarters"])
+
+    assert quarters[(2024, 1)]["margin"] is None
+    assert quarters[(2024, 2)]["income"] == 80.0
+
+def test_duplicates_keep_the_latest_update_regardless_of_order():
+    reports = [
+        report(2024, 2, 80.0, 20.0, updated_at=datetime(2024, 7, 1)),
+        report(2024, 2, 95.0, 20.0, updated_at=datetime(2024, 8, 1)),
+        report(2024, 2, 50.0, 10.0, updated_at=datetime(2024, 6, 1)),
+        report(2024, 3, 70.0, 10.0),
+    ]
+    quarters = by_period(compute_transparansi_analytics(reports)["quarters"])
+    assert quarters[(2024, 2)]["income"] == 95.0
+    assert quarters[(2024, 3)]["income"] == 70.0
+
+def test_a_passed_version_is_not_reloaded(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["koperasi"]
+    asyncio.run(db.transparansi.insert_one(report(2024, 1, 100.0, 40.0, updated_at=datetime(2024, 4, 1))))
+    monkeypatch.setattr(analytics, "_memo", None)
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("version loaded twice")
+    monkeypatch.setattr(analytics, "list_version", unexpected)
+    version = {"count": 1, "last_modified": datetime(2024, 4, 1)}
+    result = asyncio.run(transparansi_analytics(db, version))
+    assert result["quarters"][0]["income"] == 100.0
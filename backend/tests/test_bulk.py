@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pydantic import BaseModel
+
+from bulk import run_bulk
+from models import BulkRequest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+class Item(BaseModel):
+    code: str
+    price: int = 0
+
+@pytest.fixture
+def collection():
+    collection = mongomock_motor.AsyncMongoMockClient()["koperasi"]["items"]
+    asyncio.run(collection.create_index("code", unique=True))
+    return collection
+
+def run(collection, **request):
+    return asyncio.run(run_bulk(collection, BulkRequest[Item](**request)))
+
+def statuses(result):
+    return [(r.op, r.status) for r in result.results]
+
+def test_creates_updates_and_deletes_in_one_batch(collection):
+    kept = asyncio.run(collection.insert_one({"code": "A", "price": 1})).inserted_id
+    gone = asyncio.run(collection.insert_one({"code": "B", "price": 1})).inserted_id
+    result = run(
+        collection,
+        create=[{"code": "C"}],
+        update=[{"id": str(kept), "data": {"code": "A", "price": 5}}],
+        delete=[str(gone)],
+    )
+    assert statuses(result) == [("create", "ok"), ("update", "ok"), ("delete", "ok")]
+    assert (result.inserted, result.modified, result.deleted) == (1, 1, 1)
+    assert asyncio.run(collection.find_one({"_id": kept}))["price"] == 5
+    assert asyncio.run(collection.count_documents({})) == 2
+
+def test_missing_documents_are_reported_as_not_found(collection):
+    missing = str(ObjectId())
+    result = run(collection, update=[{"id": missing, "data": {"code": "X"}}], delete=[missing])
+    assert statuses(result) == [("update", "not_found"), ("delete", "not_found")]
+    assert result.modified == result.deleted == 0
+    assert asyncio.run(collection.count_documents({})) == 0
+
+def test_ordered_batch_stops_at_an_invalid_id(collection):
+    result = run(collection, update=[{"id": "not-an-id", "data": {"code": "X"}}], delete=[str(ObjectId())])
+    assert statuses(result) == [("update", "error"), ("delete", "skipped")]
+    assert result.results[0].error == "Invalid ID"
+
+def test_unordered_batch_runs_past_an_invalid_id(collection):
+    existing = asyncio.run(collection.insert_one({"code": "A"})).inserted_id
+    result = run(collection, ordered=False, update=[{"id": "not-an-id", "data": {"code": "X"}}], delete=[str(existing)])
+    assert statuses(result) == [("update", "error"), ("delete", "ok")]
+    assert result.deleted == 1
+
+def test_ordered_write_error_skips_the_rest(collection):
+    asyncio.run(collection.insert_one({"code": "A"}))
+    result = run(collection, create=[{"code": "B"}, {"code": "A"}, {"code": "C"}])
+    assert statuses(result) == [("create", "ok"), ("create", "error"), ("create", "skipped")]
+    assert "duplicate" in result.results[1].error.lower()
+    assert result.inserted == 1
+    assert asyncio.run(collection.count_documents({"code": "C"})) == 0
+
+def test_unordered_write_error_fails_only_its_item(collection):
+    asyncio.run(collection.insert_one({"code": "A"}))
+    result = run(collection, ordered=False, create=[{"code": "B"}, {"code": "A"}, {"code": "C"}])
+    assert statuses(result) == [("create", "ok"), ("create", "error"), ("create", "ok")]
+    assert result.inserted == 2
+    assert asyncio.run(collection.count_documents({"code": "C"})) == 1
+
+def test_prepare_applies_to_creates_and_updates(collection):
+    existing = asyncio.run(collection.insert_one({"code": "A"})).inserted_id
+
+    def prepare(doc):
+        return {**doc, "code": doc["code"].lower()}
+    run_result = asyncio.run(run_bulk(
+        collection,
+        BulkRequest[Item](create=[{"code": "B"}], update=[{"id": str(existing), "data": {"code": "Z"}}]),
+        prepare=prepare,
+    ))
+    assert statuses(run_result) == [("create", "ok"), ("update", "ok")]
+    codes = sorted(doc["code"] for doc in asyncio.run(collection.find().to_list(None)))
+    assert codes == ["b", "z"]
@@ -0,0 +1,181 @@
+import asyncio
+import gzip
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache
+import server
+from cache import CacheEntry, ResponseCache, document_version, invalidate, list_version, make_etag, remember
+from compression import encoded_etag
+from dependencies import get_current_admin
+from models import User, UserRole
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+def entry(body: bytes = b"[]", ttl: float = 60) -> CacheEntry:
+    return CacheEntry(body, cache.time.monotonic() + ttl, '"v1"')
+
+# ResponseCache
+
+def test_evicts_least_recently_used():
+    responses = ResponseCache(max_entries=2, ttl=60)
+    responses.set("berita", "a", entry())
+    responses.set("berita", "b", entry())
+    responses.get("berita", "a")
+    responses.set("berita", "c", entry())
+    assert responses.get("berita", "b") is None
+    assert responses.get("berita", "a") is not None
+    assert responses.stats() == {"entries": 2, "hits": 2, "misses": 1}
+
+def test_expired_entries_are_misses():
+    responses = ResponseCache(ttl=60)
+    responses.set("berita", "a", entry(ttl=-1))
+    assert responses.get("berita", "a") is None
+    assert responses.stats()["entries"] == 0
+
+def test_invalidation_drops_only_its_namespace():
+    responses = ResponseCache(ttl=60)
+    responses.set("berita", "a", entry())
+    responses.set("produk", "a", entry())
+    responses.invalidate("berita")
+    assert responses.get("berita", "a") is None
+    assert responses.get("produk", "a") is not None
+
+def test_a_load_that_raced_an_invalidation_is_not_stored():
+    responses = ResponseCache(ttl=60)
+    generation = responses.generation("berita")
+    responses.invalidate("berita")
+    responses.set("berita", "a", entry(), generation)
+    assert responses.get("berita", "a") is None
+    responses.set("berita", "a", entry(), responses.generation("berita"))
+    assert responses.get("berita", "a") is not None
+
+# Versions
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()["koperasi"]
+
+def test_list_version_counts_matches_and_takes_the_latest_update(db):
+    asyncio.run(db.berita.insert_many([
+        {"is_published": True, "updated_at": datetime(2024, 5, 1)},
+        {"is_published": True, "updated_at": datetime(2024, 6, 1)},
+        {"is_published": False, "updated_at": datetime(2024, 7, 1)},
+    ]))
+    version = asyncio.run(list_version(db.berita, {"is_published": True})())
+    assert (version["count"], version["last_modified"]) == (2, datetime(2024, 6, 1))
+    empty = asyncio.run(list_version(db.produk)())
+    assert (empty["count"], empty["last_modified"]) == (0, None)
+
+def test_document_version_is_none_for_a_missing_document(db):
+    result = asyncio.run(db.berita.insert_one({"updated_at": datetime(2024, 5, 1)}))
+    version = asyncio.run(document_version(db.berita, {"_id": result.inserted_id})())
+    assert version == {"count": 1, "last_modified": datetime(2024, 5, 1)}
+    assert asyncio.run(document_version(db.berita, {"_id": "missing"})()) is None
+
+def test_etag_changes_with_count_and_timestamp():
+    base = make_etag({"count": 2, "last_modified": datetime(2024, 6, 1)})
+    assert base != make_etag({"count": 3, "last_modified": datetime(2024, 6, 1)})
+    assert base != make_etag({"count": 2, "last_modified": datetime(2024, 6, 2)})
+
+def test_remember_loads_once():
+    calls = []
+    async def version():
+        calls.append(1)
+        return {"count": len(calls)}
+    once = remember(version)
+
+    async def run():
+        return await once(), await once()
+    assert asyncio.run(run()) == ({"count": 1}, {"count": 1})
+
+# cached_response through the app
+
+def product(name: str, updated_at: datetime) -> dict:
+    return {
+        "name": {"id": name, "en": name}, "category": "makanan", "price": "Rp 15.000",
+        "description": {"id": "Camilan " * 80, "en": "Snack " * 80},
+        "created_at": datetime(2024, 1, 1), "updated_at": updated_at,
+    }
+
+@pytest.fixture
+def client(db):
+    admin = User(
+        _id="65f000000000000000000001", username="admin", email="admin@example.com", full_name="Admin",
+        phone="0811", role=UserRole.ADMIN, created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1),
+    )
+    server.app.state.db = db
+    server.app.state.read_dbs = {"primary": db, "public": db, "admin": db}
+    server.app.dependency_overrides[get_current_admin] = lambda: admin
+    cache.response_cache.clear()
+    yield TestClient(server.app)
+    server.app.dependency_overrides.clear()
+    cache.response_cache.clear()
+
+def test_repeat_requests_are_served_from_the_cache(client, db):
+    asyncio.run(db.produk.insert_one(product("Keripik", datetime(2024, 5, 1))))
+    first = client.get("/api/produk", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    hits = cache.response_cache.hits
+    second = client.get("/api/produk", headers={"Accept-Encoding": "identity"})
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert cache.response_cache.hits == hits + 1
+
+def test_if_none_match_answers_304_on_hit_and_miss(client, db):
+    asyncio.run(db.produk.insert_one(product("Keripik", datetime(2024, 5, 1))))
+    etag = client.get("/api/produk", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    assert client.get("/api/produk", headers={"If-None-Match": etag}).status_code == 304
+    cache.response_cache.clear()
+    # On a miss the version alone settles the request
+    response = client.get("/api/produk", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+def test_compressed_bodies_carry_an_encoding_specific_etag(client, db):
+    asyncio.run(db.produk.insert_one(product("Keripik", datetime(2024, 5, 1))))
+    plain = client.get("/api/produk", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/api/produk", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == encoded_etag(plain.headers["etag"], "gzip")
+    assert compressed.headers["etag"] != plain.headers["etag"]
+    assert compressed.content == plain.content  # httpx decodes the gzip body
+    # Either tag validates the cached representation
+    for etag in (plain.headers["etag"], compressed.headers["etag"]):
+        response = client.get("/api/produk", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        assert response.status_code == 304
+        assert response.headers["etag"] == compressed.headers["etag"]
+
+def test_a_put_invalidates_the_cached_list_and_its_etag(client, db):
+    result = asyncio.run(db.produk.insert_one(product("Keripik", datetime(2024, 5, 1))))
+    before = client.get("/api/produk", headers={"Accept-Encoding": "identity"})
+    update = product("Keripik Pedas", datetime(2024, 5, 1))
+    for field in ("created_at", "updated_at"):
+        update.pop(field)
+    assert client.put(f"/api/admin/produk/{result.inserted_id}", json=update).status_code == 200
+    after = client.get("/api/produk", headers={"Accept-Encoding": "identity", "If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()[0]["name"]["id"] == "Keripik Pedas"
+    assert after.headers["etag"] != before.headers["etag"]
+
+@pytest.mark.parametrize("path", ["/api/produk/{}", "/api/berita/{}", "/api/unit-usaha/{}"])
+def test_detail_routes_tell_missing_from_invalid_ids(client, path):
+    assert client.get(path.format("65f0000000000000000000ff")).status_code == 404
+    assert client.get(path.format("not-an-id")).status_code == 400
+
+def test_admin_delete_of_a_missing_document_is_404(client):
+    assert client.delete("/api/admin/produk/65f0000000000000000000ff").status_code == 404
+
+def test_invalidate_notifies_listeners(monkeypatch):
+    seen = []
+    monkeypatch.setattr(cache, "_invalidation_listeners", [lambda *namespaces: seen.append(namespaces)])
+    invalidate("berita", "produk")
+    assert seen == [("berita", "produk")]
+
+def test_gzip_entry_is_compressed_once(client, db):
+    asyncio.run(db.produk.insert_one(product("Keripik", datetime(2024, 5, 1))))
+    client.get("/api/produk", headers={"Accept-Encoding": "gzip"})
+    cached = next(iter(cache.response_cache._entries.values()))
+    assert gzip.decompress(cached.encoded["gzip"]) == cached.body
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import changefeed
+from changefeed import ChangeFeed
+
+class Stop(BaseException):
+    """Ends the otherwise endless watch loop once the scripted streams run out"""
+
+class FakeStream:
+    def __init__(self, changes, error=None):
+        self.changes, self.error = changes, error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for change in self.changes:
+            self.resume_token = change.get("_id")
+            yield change
+        if self.error is not None:
+            raise self.error
+
+class FakeDB:
+    """db.watch() returns the next scripted stream; an exception in the script is raised instead"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.resume_tokens = []
+
+    def watch(self, pipeline, resume_after=None):
+        self.resume_tokens.append(resume_after)
+        if not self.script:
+            raise Stop
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+def change(collection, token):
+    return {"_id": {"_data": token}, "operationType": "update", "ns": {"db": "koperasi", "coll": collection}}
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    calls = []
+    monkeypatch.setattr(changefeed, "invalidate", lambda *namespaces: calls.append(namespaces))
+    monkeypatch.setattr(changefeed, "CACHE_INVALIDATION_RETRY_DELAY", 0)
+    return calls
+
+def watch(feed, db):
+    with pytest.raises(Stop):
+        asyncio.run(feed.watch(db))
+
+def test_events_invalidate_their_collection_and_resume_from_the_last_token(invalidated):
+    feed = ChangeFeed(("produk", "berita"))
+    db = FakeDB(
+        FakeStream([change("produk", "t1"), change("berita", "t2")], error=AutoReconnect("primary stepped down")),
+        FakeStream([change("produk", "t3")]),
+    )
+    watch(feed, db)
+    assert invalidated == [("produk",), ("berita",), ("produk",)]
+    assert db.resume_tokens == [None, {"_data": "t2"}, {"_data": "t3"}]
+    stats = feed.stats()
+    assert (stats["events"], stats["errors"], stats["resumes"]) == (3, 1, 2)
+
+def test_lost_history_invalidates_everything_and_starts_from_now(invalidated):
+    feed = ChangeFeed(("produk", "berita"))
+    feed.resume_token = {"_data": "expired"}
+    db = FakeDB(OperationFailure("resume point no longer in the oplog", code=286), FakeStream([]))
+    watch(feed, db)
+    assert invalidated == [("produk", "berita")]
+    assert db.resume_tokens[:2] == [{"_data": "expired"}, None]
+    assert feed.stats()["history_lost"] == 1
+
+def test_invalidate_event_restarts_without_a_token(invalidated):
+    feed = ChangeFeed(("produk", "berita"))
+    db = FakeDB(
+        FakeStream([change("produk", "t1"), {"_id": {"_data": "t2"}, "operationType": "invalidate"}]),
+        FakeStream([]),
+    )
+    watch(feed, db)
+    assert invalidated == [("produk",), ("produk", "berita")]
+    assert db.resume_tokens[1] is None
+
+def test_auto_mode_falls_back_to_polling_without_change_streams(invalidated, monkeypatch):
+    feed = ChangeFeed(("produk",))
+    polled = []
+
+    async def poll(db, interval=None):
+        polled.append(db)
+    monkeypatch.setattr(feed, "poll", poll)
+    db = FakeDB(OperationFailure("The $changeStream stage is only supported on replica sets", code=40573))
+    asyncio.run(feed.run(db, mode="auto"))
+    assert feed.mode == "poll"
+    assert polled == [db]
+    assert feed.stats()["change_stream"] == 0
+
+def test_forced_change_streams_surface_the_error(invalidated):
+    db = FakeDB(OperationFailure("The $changeStream stage is only supported on replica sets", code=40573))
+    with pytest.raises(OperationFailure):
+        asyncio.run(ChangeFeed(("produk",)).run(db, mode="changestream"))
+
+def test_polling_invalidates_only_changed_collections(invalidated):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["koperasi"]
+    feed = ChangeFeed(("produk", "berita"))
+
+    async def scenario():
+        await db.produk.insert_one({"updated_at": datetime(2024, 5, 1)})
+        await feed.poll_once(db)  # baseline only
+        await db.produk.insert_one({"updated_at": datetime(2024, 5, 2)})
+        await feed.poll_once(db)
+        await db.berita.update_many({}, {"$set": {"updated_at": datetime(2024, 5, 3)}})  # matches nothing
+        await feed.poll_once(db)
+    asyncio.run(scenario())
+    assert invalidated == [("produk",)]
+    assert feed.stats()["polls"] == 3
@@ -0,0 +1,68 @@
+import gzip
+
+import pytest
+
+import compression
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from compression import CompressionMiddleware, choose_encoding, compress, encoded_etag, is_compressible
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # Negotiation only needs to know brotli is available, not the package itself
+    monkeypatch.setattr(compression, "supported_encodings", lambda: ("br", "gzip"))
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+def test_prefers_brotli_when_available(with_brotli):
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip;q=1.0") == "br"
+
+def test_zero_quality_excludes_an_encoding(with_brotli):
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("gzip;q=0, br;q=0") is None
+
+def test_wildcard_covers_unlisted_encodings(with_brotli):
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("br;q=0, *;q=0.1") == "gzip"
+    assert choose_encoding("*;q=0") is None
+
+def test_gzip_only_without_brotli(without_brotli):
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("br") is None
+
+@pytest.mark.parametrize("header", ["", "identity", "deflate", "gzip;q=abc"])
+def test_nothing_acceptable(header, without_brotli):
+    assert choose_encoding(header) is None
+
+def test_header_is_case_and_space_insensitive(without_brotli):
+    assert choose_encoding("  GZIP ; q=0.8 ") == "gzip"
+
+def test_gzip_output_is_deterministic():
+    body = b'{"items": []}' * 100
+    assert gzip.decompress(compress(body, "gzip")) == body
+    assert compress(body, "gzip") == compress(body, "gzip")
+
+def test_compressible_types():
+    assert is_compressible("application/json")
+    assert is_compressible("text/csv; charset=utf-8")
+    assert not is_compressible("application/pdf")
+    assert not is_compressible("image/webp")
+
+def test_encoded_etag_only_rewrites_strong_tags():
+    assert encoded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert encoded_etag('W/"abc"', "gzip") == 'W/"abc"'
+
+def test_middleware_gives_compressed_responses_their_own_etag(without_brotli):
+    def page(request):
+        return Response("x" * 1000, media_type="text/plain", headers={"ETag": '"page-1"'})
+    app = Starlette(routes=[Route("/", page)])
+    app.add_middleware(CompressionMiddleware)
+    client = TestClient(app)
+    assert client.get("/", headers={"Accept-Encoding": "gzip"}).headers["etag"] == '"page-1-gzip"'
+    assert client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"page-1"'
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import dashboard
+from dashboard import SNAPSHOT_ID, compute_dashboard_stats, load_dashboard_stats, refresh_dashboard_snapshot
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+class ListCursor:
+    def __init__(self, load):
+        self.load = load
+
+    async def to_list(self, length=None):
+        docs = await self.load()
+        return docs if length is None else docs[:length]
+
+class UnionCollection:
+    """mongomock has no $unionWith: run both branches and aggregate the rest over their union"""
+
+    def __init__(self, db, name, calls):
+        self.db, self.name, self.calls = db, name, calls
+
+    def __getattr__(self, attr):
+        return getattr(self.db[self.name], attr)
+
+    def aggregate(self, pipeline):
+        stages = [next(iter(stage)) for stage in pipeline]
+        if "$unionWith" not in stages:
+            return self.db[self.name].aggregate(pipeline)
+        self.calls.append(pipeline)
+        split = stages.index("$unionWith")
+        union = pipeline[split]["$unionWith"]
+
+        async def load():
+            docs = await self.db[self.name].aggregate(pipeline[:split]).to_list(None)
+            docs += await self.db[union["coll"]].aggregate(union["pipeline"]).to_list(None)
+            scratch = self.db["_union_scratch"]
+            await scratch.delete_many({})
+            if docs:
+                await scratch.insert_many([{k: v for k, v in doc.items() if k != "_id"} for doc in docs])
+            return await scratch.aggregate(pipeline[split + 1:]).to_list(None)
+        return ListCursor(load)
+
+class UnionDB:
+    def __init__(self, db):
+        self.db = db
+        self.union_calls = []
+
+    def __getattr__(self, name):
+        return UnionCollection(self.db, name, self.union_calls)
+
+    def __getitem__(self, name):
+        return UnionCollection(self.db, name, self.union_calls)
+
+def seeded_db() -> UnionDB:
+    db = mongomock_motor.AsyncMongoMockClient()["koperasi"]
+
+    async def seed():
+        await db.permodalan.insert_many([
+            {"phone": "0811", "status": "approved"},
+            {"phone": "0811", "status": "approved"},
+            {"phone": "0812", "status": "pending"},
+            {"phone": "0813", "status": "rejected"},
+        ])
+        await db.kontak.insert_many([
+            {"phone": "0811", "status": "new"},
+            {"phone": "0814", "status": "read"},
+        ])
+        await db.unit_usaha.insert_one({"status": "active"})
+        await db.transparansi.insert_one({"year": 2024, "quarter": 2, "income": 2500000})
+    asyncio.run(seed())
+    return UnionDB(db)
+
+@pytest.fixture
+def live_stats(monkeypatch):
+    monkeypatch.setattr(dashboard, "DASHBOARD_SNAPSHOT_ENABLED", False)
+
+def test_live_stats_skip_the_union_scan():
+    db = seeded_db()
+    stats = asyncio.run(compute_dashboard_stats(db))
+    assert db.union_calls == []
+    assert "citizens_served" not in stats
+    assert stats["partners"] == 1
+    assert stats["pending_applications"] == 1
+    assert stats["contact_messages"] == 1
+    assert stats["total_revenue"] == "Rp 2.5 Miliar"
+
+def test_refresh_counts_distinct_phones_across_collections():
+    db = seeded_db()
+    stats = asyncio.run(refresh_dashboard_snapshot(db))
+    assert stats["citizens_served"] == 4
+    assert len(db.union_calls) == 1
+    snapshot = asyncio.run(db.dashboard_snapshot.find_one({"_id": SNAPSHOT_ID}))
+    assert snapshot["citizens_served"] == 4
+
+def test_live_load_reuses_a_fresh_citizen_count(live_stats):
+    db = seeded_db()
+    first = asyncio.run(load_dashboard_stats(db))
+    second = asyncio.run(load_dashboard_stats(db))
+    assert first["citizens_served"] == second["citizens_served"] == 4
+    assert len(db.union_calls) == 1
+
+def test_live_load_recounts_a_stale_snapshot(live_stats):
+    db = seeded_db()
+    asyncio.run(refresh_dashboard_snapshot(db))
+    stale = datetime.utcnow() - timedelta(seconds=dashboard.DASHBOARD_REFRESH_INTERVAL + 1)
+    asyncio.run(db.dashboard_snapshot.update_one({"_id": SNAPSHOT_ID}, {"$set": {"refreshed_at": stale}}))
+    asyncio.run(load_dashboard_stats(db))
+    assert len(db.union_calls) == 2
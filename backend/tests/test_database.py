@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+import database
+from database import create_client, mongo_client_options, read_preference, routed_databases
+from metrics import mongo_command_listener
+
+MONGO_ENV = (
+    "MONGO_MAX_POOL_SIZE", "MONGO_MIN_POOL_SIZE", "MONGO_MAX_IDLE_TIME_MS", "MONGO_CONNECT_TIMEOUT_MS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS", "MONGO_SOCKET_TIMEOUT_MS", "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "MONGO_READ_PREFERENCE", "MONGO_COMPRESSORS",
+)
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    for name in MONGO_ENV:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+def test_unset_options_keep_driver_defaults(clean_env):
+    assert mongo_client_options() == {}
+
+def test_options_come_from_the_environment(clean_env):
+    clean_env.setenv("MONGO_MAX_POOL_SIZE", "50")
+    clean_env.setenv("MONGO_MIN_POOL_SIZE", "5")
+    clean_env.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+    clean_env.setenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+    clean_env.setenv("MONGO_COMPRESSORS", "zlib")
+    assert mongo_client_options() == {
+        "maxPoolSize": 50, "minPoolSize": 5, "serverSelectionTimeoutMS": 2000,
+        "readPreference": "secondaryPreferred", "compressors": "zlib",
+    }
+
+def test_client_applies_pool_options_and_listener(clean_env):
+    clean_env.setenv("MONGO_MAX_POOL_SIZE", "7")
+    # Motor connects lazily, so no server is needed to inspect the options
+    client = create_client("mongodb://localhost:27017", minPoolSize=0)
+    try:
+        options = client.delegate.options
+        assert options.pool_options.max_pool_size == 7
+        assert mongo_command_listener in options.event_listeners
+    finally:
+        client.close()
+
+def test_read_preferences_and_staleness():
+    assert isinstance(read_preference("primary", 120), Primary)
+    preference = read_preference("secondaryPreferred", 90)
+    assert isinstance(preference, SecondaryPreferred)
+    assert preference.max_staleness == 90
+    assert read_preference("nearest").max_staleness == -1
+    with pytest.raises(ValueError, match="Unknown read preference"):
+        read_preference("closest")
+
+def test_routed_databases_share_one_client(monkeypatch):
+    monkeypatch.setattr(database, "READ_POLICIES", {
+        "primary": ("primary", None), "public": ("secondaryPreferred", 90),
+    })
+    client = create_client("mongodb://localhost:27017")
+    try:
+        routed = routed_databases(client["koperasi"])
+        assert routed["primary"].read_preference == Primary()
+        assert routed["public"].read_preference == SecondaryPreferred(max_staleness=90)
+        assert all(db.client is client for db in routed.values())
+    finally:
+        client.close()
+
+def test_lifespan_opens_warms_and_closes_the_client(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    commands, closed = [], []
+    database_type = type(client.admin)
+    run_command = database_type.command
+
+    async def command(self, name, *args, **kwargs):
+        commands.append((self.name, name))
+        return await run_command(self, name, *args, **kwargs)
+    monkeypatch.setattr(database_type, "command", command)
+    monkeypatch.setattr(client, "close", lambda: closed.append(True), raising=False)
+    monkeypatch.setattr(server, "create_client", lambda: client)
+    monkeypatch.setenv("DB_NAME", "koperasi")
+    # The worker pools are shared with other tests; record their shutdown instead
+    stopped = []
+    for pool in (server.image_pool, server.password_hash_pool):
+        monkeypatch.setattr(pool, "shutdown", lambda pool=pool: stopped.append(pool))
+
+    with TestClient(server.app):
+        assert server.app.state.client is client
+        assert set(server.app.state.read_dbs) == set(database.READ_POLICIES)
+        assert ("admin", "ping") in commands
+        assert closed == []
+    assert closed == [True]
+    assert stopped == [server.password_hash_pool, server.image_pool]
@@ -0,0 +1,74 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import dependencies
+from cache import invalidate
+from models import User
+
+class FakeDatabase:
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, collection):
+        return (self.name, collection)
+
+    def __getitem__(self, collection):
+        return (self.name, collection)
+
+def make_request():
+    read_dbs = {"primary": FakeDatabase("primary"), "public": FakeDatabase("public")}
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(read_dbs=read_dbs)))
+
+@pytest.fixture(autouse=True)
+def no_recent_invalidations(monkeypatch):
+    # Invalidations from other tests would otherwise leak into the routing window
+    monkeypatch.setattr(dependencies, "_last_invalidation", {})
+
+def test_public_reads_use_the_policy_database_without_invalidations():
+    db = dependencies.read_db("public")(make_request())
+    assert db.name == "public"
+
+def test_only_invalidated_collections_read_from_the_primary(monkeypatch):
+    get_public_db = dependencies.read_db("public")
+    invalidate("berita")
+    db = get_public_db(make_request())
+    assert db.berita == ("primary", "berita")
+    assert db["berita"] == ("primary", "berita")
+    assert db.produk == ("public", "produk")
+
+    monkeypatch.setattr(dependencies, "PRIMARY_AFTER_INVALIDATION_SECONDS", 0)
+    assert get_public_db(make_request()).berita == ("public", "berita")
+
+def test_user_invalidations_leave_public_reads_on_secondaries():
+    invalidate("users")
+    db = dependencies.read_db("public")(make_request())
+    assert db.users == ("primary", "users")
+    assert db.unit_usaha == ("public", "unit_usaha")
+
+def test_namespaces_route_every_collection_they_are_built_from():
+    invalidate("shu_distribution")
+    db = dependencies.read_db("public")(make_request())
+    assert db.shu_distribution == ("primary", "shu_distribution")
+    assert db.shu_snapshots == ("primary", "shu_snapshots")
+    assert db.transparansi == ("public", "transparansi")
+
+def make_user(**overrides) -> User:
+    now = datetime.utcnow()
+    fields = {
+        "_id": "u1", "username": "operator", "email": "op@example.com", "full_name": "Operator", "phone": "0812",
+        "role": "operator", "created_at": now, "updated_at": now, **overrides,
+    }
+    return User(**fields)
+
+def test_user_writes_from_the_change_feed_clear_cached_users():
+    dependencies.user_cache.set(("operator", 1), make_user())
+    invalidate("users")
+    assert len(dependencies.user_cache) == 0
+
+def test_cached_inactive_user_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        dependencies.ensure_active(make_user(is_active=False))
+    assert exc_info.value.status_code == 403
@@ -0,0 +1,36 @@
+import pytest
+
+from documents import format_size, parse_range
+
+SIZE = 1000
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=999-999", (999, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes=0-0 ", (0, 0)),
+])
+def test_single_ranges(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+@pytest.mark.parametrize("header", [
+    None, "", "bytes=", "bytes=-", "items=0-10",
+    # Multiple ranges are answered with the whole file
+    "bytes=0-99,200-299",
+    # last-pos before first-pos makes the header invalid, not unsatisfiable
+    "bytes=500-100",
+])
+def test_headers_that_serve_the_whole_file(header):
+    assert parse_range(header, SIZE) is None
+
+@pytest.mark.parametrize("header, size", [("bytes=1000-", SIZE), ("bytes=5000-6000", SIZE), ("bytes=-0", SIZE), ("bytes=-10", 0)])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+@pytest.mark.parametrize("size, expected", [(512, "512 B"), (1536, "1.5 KB"), (1258291, "1.2 MB"), (3 * 1024 ** 3, "3.0 GB")])
+def test_format_size(size, expected):
+    assert format_size(size) == expected
@@ -0,0 +1,76 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from export import _cell, export_columns, stream_csv, stream_ndjson
+from models import ApplicationStatus, ContactMessage
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+async def aiter(docs):
+    for doc in docs:
+        yield doc
+
+def collect(stream) -> str:
+    async def run():
+        return b"".join([chunk async for chunk in stream]).decode("utf-8")
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("value", ['=HYPERLINK("http://x")', "+62812", "-1+1", "@SUM(A1)", "\tcmd", "\rcmd"])
+def test_formula_cells_are_neutralised(value):
+    assert _cell(value) == "'" + value
+
+@pytest.mark.parametrize("value, expected", [
+    (None, ""),
+    ("Budi", "Budi"),
+    (-5, -5),
+    (1.5, 1.5),
+    (datetime(2024, 1, 2, 3, 4), "2024-01-02T03:04:00"),
+    ({"id": "=x"}, '{"id": "=x"}'),
+])
+def test_other_cells(value, expected):
+    assert _cell(value) == expected
+
+def test_csv_rows_follow_model_columns():
+    oid = ObjectId()
+    doc = {
+        "_id": oid, "name": '=HYPERLINK("http://x")', "email": "a@example.com", "phone": "0812",
+        "subject": "Halo, apa kabar", "message": "baris\nkedua", "status": "new",
+        "submitted_at": datetime(2024, 5, 1),
+    }
+    columns = export_columns(ContactMessage)
+    rows = list(csv.reader(io.StringIO(collect(stream_csv(aiter([doc]), columns)))))
+
+    assert rows[0] == columns
+    row = dict(zip(rows[0], rows[1]))
+    assert row["_id"] == str(oid)
+    assert row["name"] == '\'=HYPERLINK("http://x")'
+    assert row["message"] == "baris\nkedua"
+    assert row["submitted_at"] == "2024-05-01T00:00:00"
+
+def test_ndjson_keeps_raw_values():
+    lines = collect(stream_ndjson(aiter([{"_id": ObjectId(), "name": "=1+1"}]))).splitlines()
+    assert json.loads(lines[0])["name"] == "=1+1"
+
+def test_permodalan_export_applies_list_filters():
+    from routes_admin import export_applications
+
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    asyncio.run(db.permodalan.insert_many([
+        {"applicant_name": "a", "status": "pending", "loan_amount_idr": 5_000_000, "submitted_at": datetime(2024, 1, 1)},
+        {"applicant_name": "b", "status": "pending", "loan_amount_idr": 50_000_000, "submitted_at": datetime(2024, 1, 2)},
+        {"applicant_name": "c", "status": "approved", "loan_amount_idr": 5_000_000, "submitted_at": datetime(2024, 1, 3)},
+    ]))
+
+    response = asyncio.run(export_applications(
+        format="ndjson", status=ApplicationStatus.PENDING, date_from=None, date_to=None,
+        min_loan=None, max_loan=10_000_000, current_user=None, db=db,
+    ))
+    lines = collect(response.body_iterator).splitlines()
+
+    assert [json.loads(line)["applicant_name"] for line in lines] == ["a"]
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+from bson import Int64, ObjectId
+from pydantic import ValidationError
+
+from bench_serialization import model_path, sample_docs
+from fastjson import dump_doc, dump_docs
+from models import FinancialReport, News, Product
+
+def image(width=1600):
+    return {
+        "hash": "ab" * 32, "url": "/media/images/ab/x/1600.jpg", "width": width, "height": 900,
+        "variants": [
+            {"width": 320, "height": 180, "format": "webp", "url": "/media/images/ab/x/320.webp", "bytes": 5120},
+            {"width": 1600.0, "height": Int64(900), "format": "jpg", "url": "/media/images/ab/x/1600.jpg",
+             "bytes": 80000, "legacy": True},
+        ],
+        "srcset": {"webp": "/media/images/ab/x/320.webp 320w"},
+        "types": {"webp": "image/webp"},
+    }
+
+def product(**overrides):
+    now = datetime(2024, 5, 1, 8, 30)
+    doc = {
+        "_id": ObjectId(), "name": {"id": "Keripik", "en": "Chips"}, "category": "Pangan", "price": "Rp 15.000",
+        "created_at": now, "updated_at": now, "unknown": "dropped",
+    }
+    return {**doc, **overrides}
+
+@pytest.mark.parametrize("model", list(sample_docs(1)))
+def test_matches_the_model_path_for_every_public_model(model):
+    docs = sample_docs(3)[model]
+    assert dump_docs(docs, model) == model_path(docs, model)
+
+@pytest.mark.parametrize("doc", [
+    product(image=image()),
+    product(image=None, price_idr=15000.0),
+    product(price_idr=Int64(15000), stock_status="Habis"),
+    product(description=None),
+], ids=["nested-variants", "whole-float-int", "int64", "null-optional"])
+def test_edge_cases_match_the_model_path(doc):
+    assert dump_doc(doc, Product) == model_path([doc], Product)[1:-1]
+
+def test_nested_list_models_are_shaped_like_the_model():
+    rendered = dump_doc(product(image=image()), Product)
+    assert b'"legacy"' not in rendered
+    assert b'"width":1600,' in rendered
+
+@pytest.mark.parametrize("doc, model", [
+    (product(price_idr=15000.5), Product),
+    (product(image=image(width=1600.5)), Product),
+    ({**sample_docs(1)[FinancialReport][0], "quarter": 2.5}, FinancialReport),
+], ids=["fractional-int", "fractional-nested-int", "fractional-quarter"])
+def test_values_the_model_rejects_are_rejected(doc, model):
+    with pytest.raises(ValidationError):
+        model_path([doc], model)
+    with pytest.raises(ValidationError):
+        dump_doc(doc, model)
+
+def test_numeric_strings_follow_pydantic():
+    doc = {**sample_docs(1)[FinancialReport][0], "income": "450000000", "year": "2024"}
+    assert dump_doc(doc, FinancialReport) == model_path([doc], FinancialReport)[1:-1]
+
+def test_news_defaults_are_filled():
+    doc = sample_docs(1)[News][0]
+    doc.pop("is_published")
+    assert dump_doc(doc, News) == model_path([doc], News)[1:-1]
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+import localization
+from cache import render_json
+from localization import response_shapes, shape_doc, shape_docs, shape_model, shape_projection
+from models import BusinessUnit, Language, ListView, News, Product, StockStatus
+
+def product_doc() -> dict:
+    # Stored documents predate the optional fields and carry keys outside the model
+    return {
+        "_id": ObjectId(),
+        "name": {"id": "Keripik Pisang", "en": "Banana Chips"},
+        "category": "makanan",
+        "price": "Rp 15.000",
+        "price_idr": 15000,
+        "legacy_sku": "KP-01",
+        "created_at": datetime(2024, 5, 1, 8, 30),
+        "updated_at": datetime(2024, 5, 2, 9, 0),
+    }
+
+def news_doc() -> dict:
+    return {
+        "_id": ObjectId(),
+        "title": {"id": "Panen Raya", "en": "Harvest"},
+        "excerpt": {"id": "Ringkas", "en": "Short"},
+        "content": {"id": "Isi", "en": "Body"},
+        "category": "kegiatan",
+        "author": "Admin",
+        "published_at": datetime(2024, 5, 1),
+        "is_published": True,
+        "created_at": datetime(2024, 5, 1),
+        "updated_at": datetime(2024, 5, 1),
+    }
+
+def project(doc: dict, collection: str, lang, view=ListView.FULL) -> dict:
+    """Apply the exclusion projection the way Mongo would"""
+    for path in shape_projection(collection, lang, view) or {}:
+        head, _, tail = path.partition(".")
+        if tail:
+            doc.get(head, {}).pop(tail, None)
+        else:
+            doc.pop(head, None)
+    return doc
+
+def rendered(content) -> object:
+    return json.loads(render_json(content))
+
+@pytest.fixture(params=[False, True], ids=["model", "fastjson"])
+def fast_json(request, monkeypatch):
+    monkeypatch.setattr(localization, "FAST_JSON_ENABLED", request.param)
+    return request.param
+
+def test_full_shape_is_the_model_itself():
+    assert shape_model(Product, None) is Product
+
+def test_localized_model_keeps_field_order_aliases_and_defaults():
+    shaped = shape_model(Product, Language.EN)
+    assert list(shaped.model_fields) == list(Product.model_fields)
+    assert shaped.model_fields["id"].alias == "_id"
+    assert shaped.model_fields["stock_status"].default == Product.model_fields["stock_status"].default
+    assert shaped.model_fields["name"].annotation is str
+    assert shape_model(Product, Language.EN) is shaped
+
+def test_summary_model_drops_content_only():
+    shaped = shape_model(News, None, ListView.SUMMARY)
+    assert "content" not in shaped.model_fields
+    assert "excerpt" in shaped.model_fields
+
+def test_localized_product_fills_defaults_and_drops_unknown_keys(fast_json):
+    doc = project(product_doc(), "produk", Language.EN)
+    body = rendered(shape_doc(doc, Product, "produk", Language.EN))
+    assert list(body) == [field.alias or name for name, field in Product.model_fields.items()]
+    assert body["name"] == "Banana Chips"
+    assert body["description"] is None
+    assert body["stock_status"] == StockStatus.AVAILABLE.value
+    assert body["image_url"] is None and body["image"] is None
+    assert "legacy_sku" not in body
+
+def test_summary_list_omits_content(fast_json):
+    docs = [project(news_doc(), "berita", Language.ID, ListView.SUMMARY)]
+    body = rendered(shape_docs(docs, News, "berita", Language.ID, ListView.SUMMARY))
+    assert "content" not in body[0]
+    assert body[0]["title"] == "Panen Raya"
+
+@pytest.mark.parametrize("lang", [None, Language.ID, Language.EN])
+@pytest.mark.parametrize("view", list(ListView))
+def test_fast_json_matches_model_rendering(monkeypatch, lang, view):
+    outputs = []
+    for enabled in (False, True):
+        monkeypatch.setattr(localization, "FAST_JSON_ENABLED", enabled)
+        doc = news_doc()
+        doc["_id"] = ObjectId("65f000000000000000000001")
+        outputs.append(render_json(shape_docs([project(doc, "berita", lang, view)], News, "berita", lang, view)))
+    assert outputs[0] == outputs[1]
+
+def test_response_shapes_cover_every_variant():
+    shapes = response_shapes(BusinessUnit).__args__
+    assert BusinessUnit in shapes
+    assert shape_model(BusinessUnit, Language.ID, ListView.SUMMARY) in shapes
+    assert len(shapes) == 4
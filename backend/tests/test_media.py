@@ -0,0 +1,126 @@
+import io
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+import media
+import server
+from dependencies import get_current_admin
+from media import image_dir, modern_formats, with_image_metadata
+from models import User, UserRole
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "MEDIA_ROOT", tmp_path)
+    monkeypatch.setattr(media, "IMAGE_ROOT", tmp_path / "images")
+    mount = next(route for route in server.app.routes if route.path == media.IMAGE_URL_PREFIX)
+    monkeypatch.setattr(mount.app, "directory", str(tmp_path / "images"))
+    monkeypatch.setattr(mount.app, "all_directories", [str(tmp_path / "images")])
+    return tmp_path
+
+@pytest.fixture
+def client(media_root):
+    admin = User(
+        _id="65f000000000000000000001", username="admin", email="admin@example.com", full_name="Admin",
+        phone="0811", role=UserRole.ADMIN, created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1),
+    )
+    server.app.dependency_overrides[get_current_admin] = lambda: admin
+    yield TestClient(server.app)
+    server.app.dependency_overrides.clear()
+
+def png(width=800, height=600, mode="RGB") -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), "teal").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def multipart(payload: bytes, boundary: str = "testboundary") -> bytes:
+    return (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="photo.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+
+def test_upload_renders_every_width_and_format(client, media_root):
+    response = client.post("/api/admin/media/images", files={"file": ("photo.png", png(), "image/png")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["deduplicated"] is False
+    assert (body["width"], body["height"]) == (800, 600)
+    widths = [w for w in media.IMAGE_WIDTHS if w < 800] + [800]
+    formats = modern_formats() + ["jpg"]
+    assert {(v["width"], v["format"]) for v in body["variants"]} == {(w, f) for w in widths for f in formats}
+    for variant in body["variants"]:
+        assert (image_dir(body["hash"]) / variant["url"].rsplit("/", 1)[1]).stat().st_size == variant["bytes"]
+    assert body["url"].endswith("/800.jpg")
+    assert set(body["srcset"]) == set(formats)
+    assert list((media_root / "tmp").iterdir()) == []
+
+def test_transparent_images_fall_back_to_png(client):
+    body = client.post("/api/admin/media/images", files={"file": ("logo.png", png(400, 400, "RGBA"), "image/png")}).json()
+    assert body["url"].endswith("/400.png")
+    assert "jpg" not in body["srcset"]
+
+def test_second_upload_reuses_the_manifest(client):
+    payload = png()
+    first = client.post("/api/admin/media/images", files={"file": ("a.png", payload, "image/png")}).json()
+    second = client.post("/api/admin/media/images", files={"file": ("b.png", payload, "image/png")}).json()
+    assert second["deduplicated"] is True
+    assert second["variants"] == first["variants"]
+
+def test_non_images_are_rejected(client, media_root):
+    response = client.post("/api/admin/media/images", files={"file": ("notes.txt", b"hello", "text/plain")})
+    assert response.status_code == 400
+    assert not (media_root / "images").exists()
+
+def test_declared_oversized_upload_is_refused_before_reading(client):
+    received = []
+
+    async def upload_app(scope, receive, send):
+        received.append(await receive())
+
+    app = media.UploadLimitMiddleware(upload_app, {"/api/admin/media/images": 1024})
+    response = TestClient(app).post(
+        "/api/admin/media/images",
+        content=multipart(b"x" * (1024 + media.MULTIPART_OVERHEAD_BYTES)),
+        headers={"Content-Type": "multipart/form-data; boundary=testboundary"},
+    )
+    assert response.status_code == 413
+    assert received == []
+
+def test_uploads_within_the_limit_pass(client):
+    app = media.UploadLimitMiddleware(server.app, {"/api/admin/media/images": 1024 * 1024})
+    response = TestClient(app).post("/api/admin/media/images", files={"file": ("photo.png", png(), "image/png")})
+    assert response.status_code == 200
+
+def test_streamed_upload_is_cut_off_at_the_limit(client, monkeypatch):
+    monkeypatch.setattr(media, "MULTIPART_OVERHEAD_BYTES", 0)
+    limit = 64 * 1024
+    app = media.UploadLimitMiddleware(server.app, {"/api/admin/media/images": limit})
+    body = multipart(b"x" * (limit * 2))
+    chunks = (body[i:i + 8192] for i in range(0, len(body), 8192))
+    response = TestClient(app).post(
+        "/api/admin/media/images", content=chunks,
+        headers={"Content-Type": "multipart/form-data; boundary=testboundary"},
+    )
+    assert response.status_code == 413
+
+def test_with_image_metadata_attaches_stored_manifest(client):
+    uploaded = client.post("/api/admin/media/images", files={"file": ("photo.png", png(), "image/png")}).json()
+    doc = with_image_metadata({"image_url": uploaded["url"]})
+    assert doc["image"]["hash"] == uploaded["hash"]
+    assert with_image_metadata({"image_url": "https://example.com/photo.jpg"})["image"] is None
+    assert "image" not in with_image_metadata({"title": "no image field"})
+
+def test_only_the_image_tree_is_served(client, media_root):
+    uploaded = client.post("/api/admin/media/images", files={"file": ("photo.png", png(), "image/png")}).json()
+    response = client.get(uploaded["url"])
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == media.IMMUTABLE_CACHE_CONTROL
+    (media_root / "tmp").mkdir(exist_ok=True)
+    (media_root / "tmp" / "upload.bin").write_bytes(b"secret")
+    assert client.get("/media/tmp/upload.bin").status_code == 404
+    assert client.get("/media/images/../tmp/upload.bin").status_code == 404
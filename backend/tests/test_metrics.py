@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import (
+    Counter, Histogram, MetricsMiddleware, MetricsRegistry, MongoCommandListener, _labels, register_stats,
+)
+
+def value(metric, **labels):
+    series = metric._values.get(_labels(labels))
+    if isinstance(metric, Histogram):
+        return series[-1] if series else 0
+    return series or 0
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app, raise_server_exceptions=False)
+
+def test_requests_are_labelled_by_route_template(client):
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = value(metrics.http_requests_total, **labels)
+    timed = value(metrics.http_request_duration_seconds, **labels)
+    client.get("/items/1")
+    client.get("/items/2")
+    assert value(metrics.http_requests_total, **labels) == before + 2
+    assert value(metrics.http_request_duration_seconds, **labels) == timed + 2
+    assert metrics.http_requests_in_flight._values[()] == 0
+
+def test_error_statuses_and_unmatched_paths(client):
+    not_found = {"method": "GET", "route": "/items/{item_id}", "status": "404"}
+    unmatched = {"method": "GET", "route": "<unmatched>", "status": "404"}
+    failed = {"method": "GET", "route": "/boom", "status": "500"}
+    before = [value(metrics.http_requests_total, **labels) for labels in (not_found, unmatched, failed)]
+    client.get("/items/0")
+    client.get("/nowhere")
+    assert client.get("/boom").status_code == 500
+    after = [value(metrics.http_requests_total, **labels) for labels in (not_found, unmatched, failed)]
+    assert after == [count + 1 for count in before]
+    assert metrics.http_requests_in_flight._values[()] == 0
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency", "test", buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 5.0):
+        histogram.observe(seconds, route="/x")
+    assert list(histogram.samples()) == [
+        'latency_bucket{route="/x",le="0.1"} 1.0',
+        'latency_bucket{route="/x",le="1.0"} 2.0',
+        'latency_bucket{route="/x",le="+Inf"} 3.0',
+        'latency_sum{route="/x"} 5.55',
+        'latency_count{route="/x"} 3.0',
+    ]
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("hits", "Hits"))
+    counter.inc(route='/a"b\\c')
+    assert registry.render() == '# HELP hits Hits\n# TYPE hits counter\nhits{route="/a\\"b\\\\c"} 1.0\n'
+
+def test_register_stats_exposes_numeric_values_only(monkeypatch):
+    monkeypatch.setattr(metrics, "registry", MetricsRegistry())
+    gauge = register_stats("pool", "Pool", lambda: {"queued": 3, "active": 1.5, "name": "bcrypt"})
+    assert sorted(gauge.samples()) == ['pool{stat="active"} 1.5', 'pool{stat="queued"} 3.0']
+
+def test_mongo_listener_times_commands_per_collection():
+    listener = MongoCommandListener()
+    seen = []
+    listener.on_command(lambda *args: seen.append(args))
+
+    def event(name, command, request_id, micros=0):
+        return SimpleNamespace(command_name=name, command=command, connection_id=("db", 27017),
+                               request_id=request_id, duration_micros=micros)
+    labels = {"collection": "produk_metrics_test", "command": "find", "outcome": "success"}
+    before = value(metrics.mongo_commands_total, **labels)
+    listener.started(event("find", {"find": "produk_metrics_test"}, 1))
+    listener.succeeded(event("find", {}, 1, micros=2500))
+    listener.started(event("getMore", {"getMore": 123, "collection": "produk_metrics_test"}, 2))
+    listener.failed(event("getMore", {}, 2, micros=1000))
+    assert seen == [
+        ("produk_metrics_test", "find", 0.0025, "success"),
+        ("produk_metrics_test", "getMore", 0.001, "failure"),
+    ]
+    assert value(metrics.mongo_commands_total, **labels) == before + 1
+    assert listener._pending == {}
@@ -0,0 +1,31 @@
+import pytest
+
+from money import parse_rupiah, with_money_fields
+
+@pytest.mark.parametrize("text, expected", [
+    ("Rp 15.000/kg", 15_000),
+    ("Rp 1.250.000", 1_250_000),
+    ("Rp 2.500 Juta", 2_500_000_000),
+    ("Rp 450 Juta", 450_000_000),
+    ("Rp 1,5 Juta", 1_500_000),
+    ("Rp 1.5 Juta", 1_500_000),
+    ("Rp 1,25 M", 1_250_000_000),
+    ("Rp 12.5", 12),
+    ("Rp 12,75", 13),
+    ("Rp 25rb", 25_000),
+    ("Rp 10-50 Juta", 10_000_000),
+    ("Rp 10 - 50 Juta", 10_000_000),
+    ("Rp 5.000.000,75", 5_000_001),
+    ("Rp 500.", 500),
+])
+def test_parse_rupiah(text, expected):
+    assert parse_rupiah(text) == expected
+
+@pytest.mark.parametrize("text", [None, "", "Hubungi kami", "Rp -"])
+def test_parse_rupiah_without_amount(text):
+    assert parse_rupiah(text) is None
+
+def test_with_money_fields_only_sets_known_fields():
+    assert with_money_fields("produk", {"price": "Rp 15.000"})["price_idr"] == 15_000
+    assert "price_idr" not in with_money_fields("produk", {"name": "Kopi"})
+    assert with_money_fields("berita", {"price": "Rp 15.000"}) == {"price": "Rp 15.000"}
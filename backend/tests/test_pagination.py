@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from pagination import paginate
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+def collect_pages(collection, query, sort_field, limit):
+    async def run():
+        pages, after = [], None
+        while True:
+            docs, after = await paginate(collection, query, sort_field, limit=limit, after=after)
+            pages.append(docs)
+            if after is None:
+                return pages
+    return asyncio.run(run())
+
+def test_null_and_missing_sort_values_page_last():
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["permodalan"]
+    amounts = [5, 4, 3, None, None]
+
+    async def seed():
+        await collection.insert_many([{"status": "pending", "loan_amount_idr": a} for a in amounts])
+        await collection.insert_one({"status": "pending"})
+        await collection.insert_one({"status": "approved", "loan_amount_idr": 9})
+    asyncio.run(seed())
+
+    pages = collect_pages(collection, {"status": "pending"}, "loan_amount_idr", limit=2)
+    docs = [doc for page in pages for doc in page]
+
+    assert len(docs) == 6
+    assert len({doc["_id"] for doc in docs}) == 6
+    assert [doc.get("loan_amount_idr") for doc in docs[:3]] == [5, 4, 3]
+    assert all(doc.get("loan_amount_idr") is None for doc in docs[3:])
+
+def test_pages_through_equal_values_by_id():
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["produk"]
+    asyncio.run(collection.insert_many([{"price_idr": 100} for _ in range(5)]))
+
+    pages = collect_pages(collection, {}, "price_idr", limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    ids = [doc["_id"] for page in pages for doc in page]
+    assert ids == sorted(ids, reverse=True)
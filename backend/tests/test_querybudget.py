@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.concurrency import run_in_threadpool
+
+import querybudget
+from querybudget import QueryBudgetMiddleware, RequestQueries, record_command
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(querybudget, "QUERY_BUDGET_MAX_COMMANDS", 3)
+    monkeypatch.setattr(querybudget, "QUERY_BUDGET_MAX_MS", 50)
+    monkeypatch.setattr(querybudget, "QUERY_BUDGET_REPEAT_THRESHOLD", 3)
+    app = FastAPI()
+
+    @app.get("/lean")
+    async def lean():
+        record_command("produk", "find", 0.002, "success")
+        return {}
+
+    @app.get("/n-plus-one")
+    async def n_plus_one():
+        record_command("berita", "find", 0.001, "success")
+        for _ in range(4):
+            # Listener callbacks arrive on driver threads carrying the request's context
+            await run_in_threadpool(record_command, "users", "find", 0.001, "success")
+        return {}
+
+    @app.get("/slow")
+    async def slow():
+        record_command("transparansi", "aggregate", 0.08, "success")
+        return {}
+
+    app.add_middleware(QueryBudgetMiddleware)
+    return TestClient(app)
+
+def test_headers_report_commands_and_time(client, caplog):
+    with caplog.at_level(logging.WARNING, logger="querybudget"):
+        response = client.get("/lean")
+    assert response.headers["x-query-budget"] == "commands=1; time_ms=2.0; over_budget=0"
+    assert response.headers["server-timing"] == 'mongo;dur=2.0;desc="1 commands"'
+    assert caplog.records == []
+
+def test_repeated_queries_are_reported_as_n_plus_one(client, caplog):
+    with caplog.at_level(logging.WARNING, logger="querybudget"):
+        response = client.get("/n-plus-one")
+    assert response.headers["x-query-budget"] == "commands=5; time_ms=5.0; over_budget=1"
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(m.startswith("Query budget exceeded on GET /n-plus-one") for m in messages)
+    assert "Possible N+1 on GET /n-plus-one: find users issued 4 times" in messages
+
+def test_slow_requests_exceed_the_time_budget(client, caplog):
+    with caplog.at_level(logging.WARNING, logger="querybudget"):
+        response = client.get("/slow")
+    assert response.headers["x-query-budget"].endswith("over_budget=1")
+    assert len(caplog.records) == 1
+
+def test_commands_outside_a_request_are_ignored():
+    record_command("produk", "find", 0.001, "success")
+    assert querybudget._current.get() is None
+
+def test_repeated_counts_per_collection_and_command(monkeypatch):
+    monkeypatch.setattr(querybudget, "QUERY_BUDGET_REPEAT_THRESHOLD", 2)
+    queries = RequestQueries()
+    for collection, command in [("a", "find"), ("a", "find"), ("a", "count"), ("b", "find")]:
+        queries.record(collection, command, 0.0, "success")
+    assert queries.repeated() == [(("a", "find"), 2)]
@@ -0,0 +1,23 @@
+from starlette.requests import Request
+
+from ratelimit import client_ip
+
+def make_request(*forwarded: str, peer: str = "10.0.0.1") -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+def test_forwarded_for_ignored_without_trusted_hops():
+    assert client_ip(make_request("1.2.3.4"), trusted_hops=0) == "10.0.0.1"
+
+def test_client_supplied_entries_cannot_pick_the_key():
+    # The client sent "6.6.6.6"; the proxy appended the address it saw
+    assert client_ip(make_request("6.6.6.6, 203.0.113.7"), trusted_hops=1) == "203.0.113.7"
+    assert client_ip(make_request("7.7.7.7, 203.0.113.7"), trusted_hops=1) == "203.0.113.7"
+
+def test_multiple_proxies_and_header_lines():
+    request = make_request("6.6.6.6, 203.0.113.7", "172.16.0.2")
+    assert client_ip(request, trusted_hops=2) == "203.0.113.7"
+
+def test_short_chain_falls_back_to_peer():
+    assert client_ip(make_request("203.0.113.7"), trusted_hops=2) == "10.0.0.1"
+    assert client_ip(make_request(), trusted_hops=1) == "10.0.0.1"
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from search import SearchIndex, highlight
+
+def test_highlight_escapes_stored_markup():
+    text = 'Panen <script>alert("x")</script> kopi & teh'
+    snippet = highlight(text, {"kopi"})
+    assert snippet == 'Panen &lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; <mark>kopi</mark> &amp; teh'
+
+def test_highlight_escapes_snippet_without_matches():
+    assert highlight("<b>bold</b>", {"kopi"}) == "&lt;b&gt;bold&lt;/b&gt;"
+
+def test_highlight_marks_every_match_in_window():
+    assert highlight("Kopi dan kopi", {"kopi"}) == "<mark>Kopi</mark> dan <mark>kopi</mark>"
+
+def test_failed_reload_keeps_collection_stale():
+    index = SearchIndex()
+    index._stale = {"berita"}
+
+    async def failing_reload(db, collection):
+        raise ConnectionError("mongo down")
+    index._reload = failing_reload
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(index.refresh(db=None))
+    assert index._stale == {"berita"}
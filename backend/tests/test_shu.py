@@ -0,0 +1,148 @@
+import asyncio
+
+import numpy as np
+import pytest
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from shu import allocation_policy, apportion, calculate_shu, compute_shu
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+# apportion / compute_shu
+
+def test_apportion_sums_exactly_with_largest_remainders():
+    shares = apportion(100, np.array([1.0, 1.0, 1.0]))
+    assert shares.sum() == 100
+    assert sorted(shares.tolist()) == [33, 33, 34]
+    # The leftover rupiah goes to the largest fractional part
+    assert apportion(10, np.array([0.33, 0.33, 0.34])).tolist() == [3, 3, 4]
+
+def test_apportion_ties_are_stable():
+    assert apportion(2, np.array([1.0, 1.0, 1.0])).tolist() == [1, 1, 0]
+
+@pytest.mark.parametrize("total, weights", [(0, [1.0, 2.0]), (-5, [1.0]), (100, [0.0, 0.0]), (100, [])])
+def test_apportion_without_anything_to_split(total, weights):
+    shares = apportion(total, np.array(weights))
+    assert shares.tolist() == [0] * len(weights)
+
+def test_compute_shu_allocates_every_member_rupiah():
+    members = [
+        {"member_id": "a", "capital": 1_000_000, "transactions": 0},
+        {"member_id": "b", "capital": 2_000_000, "transactions": 500_000},
+        {"member_id": "c", "capital": 0, "transactions": 1_500_001},
+    ]
+    result = compute_shu(10_000_001, members, allocation_policy())
+    assert result["reserve_amount"] + result["member_amount"] + result["village_amount"] == 10_000_001
+    assert sum(a["total"] for a in result["allocations"]) == result["member_amount"]
+    assert result["allocations"][0]["transaction_service"] == 0
+
+@pytest.mark.parametrize("members", [
+    [],
+    [{"member_id": "a", "capital": 0, "transactions": 0}, {"member_id": "b"}],
+])
+def test_compute_shu_refuses_a_member_share_nobody_can_take(members):
+    with pytest.raises(ValueError, match="no capital or transactions"):
+        compute_shu(10_000_000, members, allocation_policy())
+
+def test_compute_shu_without_a_member_share_accepts_an_empty_ledger():
+    result = compute_shu(10_000_000, [], allocation_policy(reserve_pct=50, member_pct=0, village_pct=50))
+    assert result["reserve_amount"] + result["village_amount"] == 10_000_000
+    assert result["member_amount"] == 0
+
+@pytest.mark.parametrize("basis, other", [("capital", "transactions"), ("transactions", "capital")])
+def test_compute_shu_moves_an_empty_basis_to_the_other(basis, other):
+    members = [{"member_id": "a", basis: 0, other: 300}, {"member_id": "b", basis: 0, other: 100}]
+    result = compute_shu(10_000_000, members, allocation_policy())
+    assert result["reserve_amount"] + result["member_amount"] + result["village_amount"] == 10_000_000
+    assert [a["total"] for a in result["allocations"]] == [3_000_000, 1_000_000]
+
+def test_allocation_policy_must_add_up():
+    with pytest.raises(ValueError):
+        allocation_policy(reserve_pct=50, member_pct=40, village_pct=40)
+
+# calculate_shu
+
+class Proxy:
+    """Database stand-in overriding individual collections"""
+
+    def __init__(self, db, **collections):
+        self._db = db
+        self._collections = collections
+
+    def __getattr__(self, name):
+        return self._collections.get(name) or getattr(self._db, name)
+
+class FailingAllocations:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def insert_many(self, docs, ordered=True):
+        await self._collection.insert_many(docs[:1])
+        raise PyMongoError("connection reset")
+
+class RacingSnapshots:
+    """Loses the first version to a concurrent calculation"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.lost = False
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def insert_one(self, doc):
+        if not self.lost:
+            self.lost = True
+            await self._collection.insert_one({"year": doc["year"], "version": doc["version"], "is_current": False})
+            raise DuplicateKeyError("year_version_unique")
+        return await self._collection.insert_one(doc)
+
+def seeded_db():
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+
+    async def seed():
+        await db.shu_snapshots.create_index([("year", 1), ("version", -1)], unique=True)
+        await db.transparansi.insert_one({"year": 2024, "quarter": 1, "profit": 1_000_000})
+        await db.shu_members.insert_many([
+            {"year": 2024, "member_id": f"m{i}", "capital": 100 * i, "transactions": 10 * i} for i in range(1, 4)
+        ])
+    asyncio.run(seed())
+    return db
+
+def current_versions(db):
+    async def load():
+        return [s["version"] async for s in db.shu_snapshots.find({"year": 2024, "is_current": True})]
+    return asyncio.run(load())
+
+def test_recalculation_replaces_the_current_snapshot():
+    db = seeded_db()
+    asyncio.run(calculate_shu(db, 2024, allocation_policy(), "admin"))
+    snapshot = asyncio.run(calculate_shu(db, 2024, allocation_policy(), "admin"))
+
+    assert snapshot["version"] == 2 and snapshot["is_current"]
+    assert current_versions(db) == [2]
+    assert asyncio.run(db.shu_allocations.count_documents({"snapshot_id": snapshot["_id"]})) == 3
+
+def test_failed_allocation_write_leaves_previous_snapshot_current():
+    db = seeded_db()
+    asyncio.run(calculate_shu(db, 2024, allocation_policy(), "admin"))
+    failing = Proxy(db, shu_allocations=FailingAllocations(db.shu_allocations))
+
+    with pytest.raises(PyMongoError):
+        asyncio.run(calculate_shu(failing, 2024, allocation_policy(), "admin"))
+
+    assert current_versions(db) == [1]
+    assert asyncio.run(db.shu_snapshots.count_documents({})) == 1
+    assert asyncio.run(db.shu_allocations.count_documents({})) == 3
+
+def test_version_conflict_is_retried():
+    db = seeded_db()
+    racing = Proxy(db, shu_snapshots=RacingSnapshots(db.shu_snapshots))
+
+    snapshot = asyncio.run(calculate_shu(racing, 2024, allocation_policy(), "admin"))
+
+    assert snapshot["version"] == 2
+    assert current_versions(db) == [2]
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from workers import WorkerPool
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+def test_runs_blocking_work_off_the_loop_thread():
+    pool = WorkerPool(2, "test")
+
+    async def run():
+        return await pool.run(threading.current_thread), threading.current_thread()
+    try:
+        worker, loop_thread = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert worker is not loop_thread
+    assert worker.name.startswith("test")
+
+def test_concurrency_is_capped_and_queueing_is_measured():
+    pool = WorkerPool(2, "test")
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(pool.run(job) for _ in range(6)))
+        # Counters are updated through call_soon_threadsafe; let them land
+        await asyncio.sleep(0)
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert peak[0] == 2
+    assert stats["completed"] == 6
+    assert stats["queued"] == stats["active"] == 0
+    assert stats["max_queued"] == 6
+    assert stats["avg_wait_seconds"] > 0
+    assert stats["avg_run_seconds"] >= 0.05
+
+def test_errors_propagate_and_still_count():
+    pool = WorkerPool(1, "test")
+
+    def fail():
+        raise ValueError("bad image")
+
+    async def run():
+        with pytest.raises(ValueError, match="bad image"):
+            await pool.run(fail)
+        await asyncio.sleep(0)
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["active"] == 0
+
+def test_bcrypt_rounds_come_from_the_environment():
+    # auth reads BCRYPT_ROUNDS at import time, so check it in a fresh interpreter
+    script = (
+        "from auth import get_password_hash, verify_password, password_hash_pool\n"
+        "hashed = get_password_hash('rahasia')\n"
+        "print(hashed.split('$')[2], verify_password('rahasia', hashed), password_hash_pool.stats()['rounds'])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={**os.environ, "BCRYPT_ROUNDS": "5"},
+    )
+    assert result.stdout.split()[-3:] == ["05", "True", "5"]
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from bson import json_util
+from pymongo.errors import BulkWriteError, DocumentTooLarge, ServerSelectionTimeoutError
+
+import writebehind
+from writebehind import WriteBehindQueue
+
+class UnreachableCollection:
+    async def insert_many(self, docs, ordered=True):
+        raise ServerSelectionTimeoutError("no servers")
+
+class UnreachableDB:
+    def __getitem__(self, name):
+        return UnreachableCollection()
+
+class RecordingCollection:
+    """Accepts documents except those flagged as invalid or oversized, like a validating server"""
+
+    def __init__(self, inserted):
+        self.inserted = inserted
+
+    async def insert_many(self, docs, ordered=True):
+        if any(doc.get("oversized") for doc in docs):
+            raise DocumentTooLarge("document too large")
+        errors = [
+            {"index": i, "code": 121, "errmsg": "Document failed validation"}
+            for i, doc in enumerate(docs) if doc.get("invalid")
+        ]
+        self.inserted.extend(doc for doc in docs if not doc.get("invalid"))
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": []})
+
+class RecordingDB:
+    def __init__(self):
+        self.inserted = []
+
+    def __getitem__(self, name):
+        return RecordingCollection(self.inserted)
+
+def test_rejected_documents_are_dead_lettered_and_later_segments_flush(tmp_path):
+    queue = WriteBehindQueue(spill_dir=tmp_path, batch_size=10, fsync=False)
+    queue.db = RecordingDB()
+
+    async def run():
+        await queue.enqueue("kontak", {"name": "a"})
+        await queue.enqueue("kontak", {"name": "bad", "invalid": True})
+        await queue._rotate()
+        await queue.enqueue("kontak", {"name": "big", "oversized": True})
+        await queue.enqueue("kontak", {"name": "c"})
+        await queue._rotate()
+        await queue.enqueue("permodalan", {"name": "d"})
+        await queue.flush()
+    asyncio.run(run())
+
+    assert sorted(doc["name"] for doc in queue.db.inserted) == ["a", "c", "d"]
+    assert list(tmp_path.glob("*.jsonl")) == []
+    dead = [json_util.loads(line) for line in (tmp_path / "dead-letter" / "kontak.jsonl").read_text().splitlines()]
+    assert sorted(entry["doc"]["name"] for entry in dead) == ["bad", "big"]
+    stats = queue.stats()
+    assert stats["pending"] == 0
+    assert stats["flushed"] == 3
+    assert stats["dead_lettered"] == 2
+
+def test_unavailable_mongo_keeps_every_segment(tmp_path):
+    queue = WriteBehindQueue(spill_dir=tmp_path, fsync=False)
+    queue.db = UnreachableDB()
+
+    async def run():
+        for name in ("a", "b"):
+            await queue.enqueue("kontak", {"name": name})
+            await queue._rotate()
+        await queue.flush()
+    asyncio.run(run())
+
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) == 2
+    assert queue.stats()["flush_failures"] == 1
+
+def test_enqueue_rejects_when_mongo_cannot_drain_the_queue(tmp_path):
+    queue = WriteBehindQueue(spill_dir=tmp_path, max_pending=2, fsync=False)
+    queue.db = UnreachableDB()
+
+    async def run():
+        await queue.enqueue("kontak", {"name": "a"})
+        await queue.enqueue("kontak", {"name": "b"})
+        with pytest.raises(HTTPException) as exc_info:
+            await queue.enqueue("kontak", {"name": "c"})
+        return exc_info.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503
+    assert "Retry-After" in error.headers
+    stats = queue.stats()
+    assert stats["pending"] == 2
+    assert stats["rejected"] == 1
+    # Nothing was lost: both accepted documents are still spilled
+    assert sum(len(p.read_text().splitlines()) for p in tmp_path.glob("*.jsonl")) == 2
+
+def test_recover_skips_segments_adopted_by_another_worker(tmp_path, monkeypatch):
+    # A spill file left by a process that is no longer running
+    (tmp_path / "segment-999999999-1-1.jsonl").write_text("")
+    monkeypatch.setattr(writebehind, "_pid_alive", lambda pid: False)
+
+    def adopted_elsewhere(src, dst):
+        raise FileNotFoundError(src)
+    monkeypatch.setattr(writebehind.os, "replace", adopted_elsewhere)
+
+    queue = WriteBehindQueue(spill_dir=tmp_path, fsync=False)
+    asyncio.run(queue._recover())
+    assert queue.stats()["recovered"] == 0
@@ -0,0 +1,60 @@
+"""
+Bounded worker pools that keep blocking work off the event loop
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class WorkerPool:
+    """Bounded thread pool for blocking, CPU-heavy work with queueing metrics"""
+
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+
+        def job():
+            started = time.perf_counter()
+            # Counters are only touched from the loop thread
+            loop.call_soon_threadsafe(self._started, started - submitted)
+            try:
+                return func(*args)
+            finally:
+                loop.call_soon_threadsafe(self._finished, time.perf_counter() - started)
+
+        return await loop.run_in_executor(self._executor, job)
+
+    def _started(self, waited: float) -> None:
+        self.queued -= 1
+        self.active += 1
+        self.total_wait_seconds += waited
+
+    def _finished(self, ran: float) -> None:
+        self.active -= 1
+        self.completed += 1
+        self.total_run_seconds += ran
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "queued": self.queued,
+            "active": self.active,
+            "completed": self.completed,
+            "max_queued": self.max_queued,
+            "avg_wait_seconds": self.total_wait_seconds / self.completed if self.completed else 0.0,
+            "avg_run_seconds": self.total_run_seconds / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
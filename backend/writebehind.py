@@ -0,0 +1,272 @@
+"""
+Write-behind queue for anonymous submissions (kontak, permodalan)
+
+Documents get their ObjectId locally, are appended to a spill file on disk
+and acknowledged; a background task then inserts them in batches. Spill
+segments are deleted only after Mongo accepts the batch, and any left over
+after a crash are replayed on startup. Replays are idempotent because the
+_id is assigned before the first attempt. Documents Mongo rejects for good
+(validation, size) go to a dead-letter file so they cannot block the queue.
+"""
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, ExecutionTimeout, WTimeoutError
+
+from dashboard import mark_dashboard_dirty
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "100"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))  # seconds
+# Above this many unflushed documents, submitters wait for a flush; if Mongo still has
+# not taken them, new submissions are rejected with 503 rather than queued without bound
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "5000"))
+WRITE_BEHIND_SPILL_DIR = Path(os.environ.get("WRITE_BEHIND_SPILL_DIR", Path(__file__).parent / "spill"))
+WRITE_BEHIND_FSYNC = os.environ.get("WRITE_BEHIND_FSYNC", "true").lower() in ("1", "true", "yes")
+
+DUPLICATE_KEY = 11000
+DEAD_LETTER_DIR = "dead-letter"
+
+# Errors that mean Mongo cannot take writes right now, so every later segment would fail too
+RETRYABLE_ERRORS = (ConnectionFailure, ExecutionTimeout, WTimeoutError)
+
+# _insert_segment outcomes
+FLUSHED, RETRY, UNAVAILABLE = "flushed", "retry", "unavailable"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        spill_dir: Path = WRITE_BEHIND_SPILL_DIR,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        fsync: bool = WRITE_BEHIND_FSYNC,
+    ):
+        self.spill_dir = Path(spill_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.db = None
+        # Unflushed documents by _id, so status lookups can see queued submissions
+        self._pending: Dict[ObjectId, Tuple[str, dict, float]] = {}
+        self._unspilled = 0  # documents in the current spill file
+        self._fd: Optional[int] = None
+        self._segment = 0
+        self._file_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "enqueued": 0, "flushed": 0, "batches": 0, "flush_failures": 0,
+            "backpressure_waits": 0, "rejected": 0, "dead_lettered": 0, "recovered": 0, "last_flush_seconds": 0.0,
+        }
+
+    # Spill files: current-<pid>.jsonl is appended to, then renamed to a segment when flushed
+
+    def _current_path(self) -> Path:
+        return self.spill_dir / f"current-{os.getpid()}.jsonl"
+
+    def _append(self, line: bytes) -> None:
+        if self._fd is None:
+            self._fd = os.open(self._current_path(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        os.write(self._fd, line)
+        if self.fsync:
+            os.fsync(self._fd)
+
+    async def _rotate(self) -> None:
+        """Close the current spill file and turn it into a segment awaiting insertion"""
+        async with self._file_lock:
+            if self._fd is None:
+                return
+            os.close(self._fd)
+            self._fd = None
+            self._segment += 1
+            os.replace(self._current_path(), self.spill_dir / f"segment-{os.getpid()}-{time.time_ns()}-{self._segment}.jsonl")
+            self._unspilled = 0
+
+    # Producer side
+
+    async def enqueue(self, collection: str, doc: dict) -> ObjectId:
+        """Durably queue `doc` for insertion, assigning its _id; returns the id"""
+        if len(self._pending) >= self.max_pending:
+            self._stats["backpressure_waits"] += 1
+            await self.flush()
+            if len(self._pending) >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many submissions are waiting to be saved; please try again shortly",
+                    headers={"Retry-After": str(max(1, round(self.flush_interval * 5)))},
+                )
+        doc = {**doc, "_id": doc.get("_id") or ObjectId()}
+        line = json_util.dumps({"collection": collection, "doc": doc}).encode() + b"\n"
+        async with self._file_lock:
+            await asyncio.to_thread(self._append, line)
+            self._unspilled += 1
+        self._pending[doc["_id"]] = (collection, doc, time.monotonic())
+        self._stats["enqueued"] += 1
+        if self._unspilled >= self.batch_size:
+            self._wakeup.set()
+        return doc["_id"]
+
+    def pending_document(self, collection: str, doc_id: ObjectId) -> Optional[dict]:
+        """A queued document that has not reached Mongo yet"""
+        entry = self._pending.get(doc_id)
+        if entry is None or entry[0] != collection:
+            return None
+        return dict(entry[1])
+
+    # Consumer side
+
+    async def flush(self) -> None:
+        """Insert everything spilled so far; failed segments stay on disk for the next attempt"""
+        async with self._flush_lock:
+            await self._rotate()
+            for segment in sorted(self.spill_dir.glob(f"segment-{os.getpid()}-*.jsonl")):
+                if await self._insert_segment(segment) == UNAVAILABLE:
+                    # Later segments would fail the same way
+                    break
+
+    async def _insert_segment(self, segment: Path) -> str:
+        """Insert one segment; returns FLUSHED, RETRY (kept on disk) or UNAVAILABLE (kept, stop flushing)"""
+        records = [json_util.loads(line) for line in segment.read_text().splitlines() if line.strip()]
+        by_collection: Dict[str, List[dict]] = {}
+        for record in records:
+            by_collection.setdefault(record["collection"], []).append(record["doc"])
+        started = time.perf_counter()
+        rejected: List[Tuple[str, dict, str]] = []
+        try:
+            for collection, docs in by_collection.items():
+                for i in range(0, len(docs), self.batch_size):
+                    for doc, error in await self._insert_many(collection, docs[i:i + self.batch_size]):
+                        rejected.append((collection, doc, error))
+        except RETRYABLE_ERRORS as exc:
+            self._stats["flush_failures"] += 1
+            logger.warning("Write-behind flush of %s failed, Mongo unavailable, will retry: %s", segment.name, exc)
+            return UNAVAILABLE
+        except Exception as exc:
+            self._stats["flush_failures"] += 1
+            logger.warning("Write-behind flush of %s failed, will retry: %s", segment.name, exc)
+            return RETRY
+        if rejected:
+            self._dead_letter(rejected)
+        segment.unlink()
+        for record in records:
+            self._pending.pop(record["doc"]["_id"], None)
+        self._stats["flushed"] += len(records) - len(rejected)
+        self._stats["batches"] += 1
+        self._stats["last_flush_seconds"] = time.perf_counter() - started
+        mark_dashboard_dirty()
+        return FLUSHED
+
+    async def _insert_many(self, collection: str, docs: List[dict]) -> List[Tuple[dict, str]]:
+        """Insert a batch; returns the documents Mongo rejected for good, with the reason"""
+        try:
+            await self.db[collection].insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            if exc.details.get("writeConcernErrors"):
+                raise
+            # Duplicate keys are documents inserted by an earlier, interrupted attempt
+            return [
+                (docs[error["index"]], error.get("errmsg", f"code {error.get('code')}"))
+                for error in exc.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY
+            ]
+        except InvalidDocument as exc:
+            # Raised client-side (e.g. DocumentTooLarge) for the whole batch; find the culprits
+            if len(docs) == 1:
+                return [(docs[0], str(exc))]
+            rejected = []
+            for doc in docs:
+                rejected += await self._insert_many(collection, [doc])
+            return rejected
+        return []
+
+    def _dead_letter(self, rejected: List[Tuple[str, dict, str]]) -> None:
+        """Keep rejected documents out of the queue, in dead-letter/<collection>.jsonl for inspection"""
+        dead_dir = self.spill_dir / DEAD_LETTER_DIR
+        dead_dir.mkdir(exist_ok=True)
+        for collection, doc, error in rejected:
+            logger.error("Write-behind rejected %s %s: %s", collection, doc.get("_id"), error)
+            line = json_util.dumps({"collection": collection, "doc": doc, "error": error, "rejected_at": time.time()})
+            with open(dead_dir / f"{collection}.jsonl", "a") as handle:
+                handle.write(line + "\n")
+        self._stats["dead_lettered"] += len(rejected)
+
+    async def _recover(self) -> None:
+        """Replay spill files left behind by processes that are no longer running"""
+        for path in sorted(self.spill_dir.glob("*.jsonl")):
+            parts = path.stem.split("-")
+            owner = parts[1] if len(parts) > 1 else ""
+            if owner.isdigit() and int(owner) != os.getpid() and _pid_alive(int(owner)):
+                continue
+            # Sorts ahead of this process's own segments
+            adopted = self.spill_dir / f"segment-{os.getpid()}-0-{path.stem}.jsonl"
+            try:
+                os.replace(path, adopted)
+            except FileNotFoundError:
+                # Another worker starting at the same time adopted it first
+                continue
+            count = sum(1 for line in adopted.read_text().splitlines() if line.strip())
+            if await self._insert_segment(adopted) == FLUSHED:
+                self._stats["recovered"] += count
+                logger.info("Write-behind recovered %d documents from %s", count, path.name)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as exc:
+                logger.error("Write-behind flusher error: %s", exc)
+
+    async def start(self, db) -> None:
+        self.db = db
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        await self._recover()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and insert whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        oldest = min((queued_at for _, _, queued_at in self._pending.values()), default=None)
+        return {
+            **self._stats,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "oldest_pending_seconds": time.monotonic() - oldest if oldest is not None else 0.0,
+        }
+
+write_behind = WriteBehindQueue()